@@ -1,13 +1,24 @@
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-from lightgbm import LGBMClassifier
-from scripts.Data_Cleaning_Pipeline import clean_and_engineer_features
-import pickle
+
+# Pipeline modules import each other by bare name, as when run from scripts/
+sys.path.append(str(Path(__file__).parent / "scripts"))
+from Data_Cleaning_Pipeline import clean_and_engineer_features
+from model_bundle import ModelBundle
+from model_run import ROW_ID
+from ingest import MODEL_COLUMNS, read_listings
+from explain import ExplanationService, format_reasons
+from profiling import StepProfiler
+from validation import validate_csv
 
 # Establishing constants
 TARGETS = ["ATTACHD", "CONDO", "DETACHD"]
-CITIES = ["Portland", "Beaverton", "Hillsboro", "Lake Oswego", "West Link"]
 #COMPANY_LOGO = st.image("logo.png") Company logo was removed for privacy reasons
 
 st.header("Predict Property Type")
@@ -24,107 +35,189 @@ st.write(
         '# Garage', '# Fireplaces', 'Terms'
     """
 )
-# Loading model and transformers
-with open("./model_artifacts.pkl", 'rb') as f:
-    model_artifacts = pickle.load(f)
 
-encoder = EncodingPipeline()
-with open("./ohe.pkl", 'rb') as f:
-    ohe = pickle.load(f)
+@st.cache_resource
+def load_model(bundle_dir: str = "./model_bundle"):
+    """
+    Load the model bundle and build the encoder once per process.
+
+    Streamlit reruns this script on every interaction; the cached resource is
+    shared by all sessions and reruns, so artifacts are only read on first use.
+    """
+    bundle = ModelBundle(bundle_dir)
+    # Sparse output: the one-hot block goes to LightGBM as CSR, never as a dense frame;
+    # native-categorical bundles take integer category codes instead
+    encoder = bundle.build_encoder(sparse_output=bundle.encoding == "onehot", label_encode=False)
+    bundle.booster  # parse the model now rather than on the first prediction
+    return bundle, encoder
+
+
+@st.cache_resource
+def load_explainer(bundle_dir: str = "./model_bundle"):
+    """
+    Background workers for prediction reasons, shared by all sessions.
+
+    Worker processes start on the first request and cache reasons per
+    listing, so pages already explained come back at once. Bundles without
+    frozen cleaning statistics are explained without the cache. Workers are
+    spawned, not forked, since the Streamlit server runs many threads.
+    """
+    cache = 100_000 if ModelBundle(bundle_dir).cleaning_state is not None else None
+    return ExplanationService(bundle_dir, top_k=3, cache=cache, mp_context=multiprocessing.get_context("spawn"))
+
+
+# Loading model and transformers from a single bundle so they always match
+start = time.perf_counter()
+bundle, encoder = load_model()
+load_ms = (time.perf_counter() - start) * 1000
+
+le = bundle.label_encoder
+
+# Uploads are read, checked and scored CHUNK_ROWS rows at a time; tables show PAGE_ROWS rows per page
+CHUNK_ROWS = 50_000
+PAGE_ROWS = 100
+RESULT_COLUMNS = ["Address", "City", "Zip", "Area", "BD", "Baths", "Predicted Type"]
+
+
+def read_page(file, page: int) -> pd.DataFrame:
+    """Rows of one preview page, parsed on their own instead of loading the whole upload."""
+    frame = pd.read_csv(file, skiprows=range(1, 1 + (page - 1) * PAGE_ROWS), nrows=PAGE_ROWS)
+    file.seek(0)
+    return frame
+
+
+def score_chunk(chunk: pd.DataFrame, profiler) -> tuple:
+    """Clean, encode and predict one chunk; returns (surviving rows with predictions, stage timings in ms)."""
+    timings = {}
+    # Cleaning and engineering features with the frozen training statistics;
+    # a row id tracks which uploaded rows survive cleaning
+    start = time.perf_counter()
+    X = clean_and_engineer_features(chunk.assign(**{ROW_ID: np.arange(len(chunk))}), state=bundle.cleaning_state,
+                                    profiler=profiler)
+    row_ids = X.pop(ROW_ID).to_numpy()
+    timings["clean"] = (time.perf_counter() - start) * 1000
+
+    # Transforming features
+    start = time.perf_counter()
+    X = bundle.align_features(encoder.transform(X)) # trained model column order and dtypes
+    timings["transform"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    pred = bundle.predict(X) if X.shape[0] > 0 else np.empty(0, dtype="int64")
+    timings["predict"] = (time.perf_counter() - start) * 1000
+
+    scored = chunk.iloc[row_ids].copy()
+    scored["Predicted Type"] = le.inverse_transform(pred) # Decoding results for readability
+    return scored, timings
+
 
-with open("./scaler.pkl", 'rb') as f:
-    scaler = pickle.load(f)
+def result_csv(run: dict) -> str:
+    """A run's results as CSV, serialised on the first download and kept for later ones."""
+    if run.get("csv") is None:
+        run["csv"] = run["frame"].to_csv(index=False)
+    return run["csv"]
 
-with open("./label_encoder.pkl", 'rb') as f:
-    le = pickle.load(f)
 
-num_cols = model_artifacts["numeric_features"]
-cat_cols = model_artifacts["categorical_features"]
-feature_order = model_artifacts["feature_names"]
+def show_page(frame: pd.DataFrame, key: str, columns: list, explainer=None):
+    """
+    One page of a large frame, with a page selector.
+
+    With an explainer, the page is shown at once and its 'Top Reasons'
+    column is added when the background workers return.
+    """
+    pages = max(1, -(-len(frame) // PAGE_ROWS))
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=key)
+    shown = frame.iloc[(page - 1) * PAGE_ROWS:page * PAGE_ROWS]
+    table = st.empty()
+    table.dataframe(shown[columns])
+    if explainer is not None:
+        future = explainer.submit(shown[[col for col in MODEL_COLUMNS if col in shown.columns]])
+        with st.spinner("Explaining the predictions on this page..."):
+            reasons = future.result()
+        table.dataframe(shown[columns].assign(**{"Top Reasons": [format_reasons(r) for r in reasons]}))
+
 
 file = st.file_uploader(".csv file with property data", type="csv")
 
 if file is not None:
-    df = pd.read_csv(file)
-    st.dataframe(df)
-    
-    unknown_cities = df.query("City not in @CITIES")["City"]
-    if unknown_cities.count() > 0:
-        st.warning(
-            f"Found City values not recognized by model. Removing row as consequence.\nCities found: {unknown_cities}",
-            icon = "⚠️",
-            width = "stretch"
-        )
-    if df["City"].isna().sum() > 0:
-        st.warning(
-            "City data is missing values. Rows with missing 'City' values will be removed.",
-            icon = "⚠️",
-            width="stretch"
-        )
-    if df["Zip"].isna().sum() > 0:
-        st.warning(
-            "Zip Code data is missing values. Rows with missing 'Zip' values will be removed.",
-            icon = "⚠️",
-            width="stretch"
-        )
-    if df["Area"].isna().sum() > 0:
-        st.warning(
-            "Area data is missing values. Rows with missing 'Area' values will be removed.",
-            icon = "⚠️",
-            width="stretch"
-        )
-    if df["Yr. Built"].isna().sum() > 0:
-        st.warning(
-            "Year built data is missing values. Rows with missing 'Yr. Built' values will be removed.",
-            icon = "⚠️",
-            width="stretch"
-        )
-    if df["Prop. Cond."].isna().sum() > 0:
-        st.markdown(
-            ":orange-badge[⚠️ Prop. Cond. is missing values can negatively affect model accuracy. Please fill in values if possible.]"
-        )
-    if df["Tax"].isna().sum() > 0:
-        st.markdown(
-            ":orange-badge[⚠️ Tax data is missing values can negatively affect model accuracy. Please fill in values if possible.]"
-        )
-    if df["Apx Sqft"].isna().sum() > 0:
-        st.markdown(
-            ":orange-badge[⚠️ Aprox. sq footage data is missing values can negatively affect model accuracy. Please fill in values if possible.]"
-        )
-    if df["HOA Dues"].isna().sum() > 0:
-        st.markdown(
-            ":orange-badge[⚠️ HOA Dues missing values can negatively affect model accuracy. Please fill in values if possible.]"
-        )
+    # Per-upload results survive reruns (page changes, a cancelled run) in the session state
+    if st.session_state.get("file_id") != file.file_id:
+        st.session_state.clear()
+        st.session_state["file_id"] = file.file_id
+        # One chunked scan checks every column against the schema in validation.py
+        st.session_state["report"] = validate_csv(file, chunksize=CHUNK_ROWS)
+    report = st.session_state["report"]
+
+    st.write(f"{report.rows:,} rows uploaded")
+    page = st.number_input(f"Preview page (of {max(1, -(-report.rows // PAGE_ROWS)):,})", min_value=1,
+                           max_value=max(1, -(-report.rows // PAGE_ROWS)), value=1)
+    st.dataframe(read_page(file, page))
+
+    for issue in report.issues():
+        if issue["severity"] == "error":
+            st.error(issue["message"], icon = "🚫", width = "stretch")
+        elif issue["severity"] == "warning":
+            st.warning(issue["message"], icon = "⚠️", width = "stretch")
+        else:
+            st.markdown(f":orange-badge[⚠️ {issue['message']}]")
+    with st.expander("Data quality by column"):
+        st.dataframe(report.summary())
     
+    show_profile = st.checkbox("Show cleaning step profile")
+    trace_memory = show_profile and st.checkbox("Include peak memory per step (slower)")
+
     if st.button("Run Predictions"):
-        st.write("Loading Model...")
-        # Asigning model to variable from aodel artifacts
-        model = model_artifacts["model"]
-
-        # Cleaning and engineering fewatures
-        X = clean_and_engineer_features(df)
-
-        # Transforming features
-        X[num_cols] = scaler.transform(X[num_cols])
-        ohe_feat = ohe.transform(X[cat_cols])
-        ohe_cols = ohe.get_feature_names_out()
-        ohe_df = pd.DataFrame(ohe_feat, columns=ohe_cols, index=X.index)
-        X = pd.concat([X.drop(cat_cols, axis=1), ohe_df], axis=1)
-        X = X.reindex(columns=feature_order) # Re-ordering columns to match trained model column 
-        st.write("Running Predictions...")
-        st.success("Prediction Probabilities by Property Type")
-        df["Predicted Type"] = le.inverse_transform(model.predict(X)) # Decoding results for readability
-        st.dataframe(df[["Address", "City", "Zip", "Area", "BD", "Baths", "Predicted Type"]])
-
-        # Download dataframe with predictions to csv
-        csv = df.to_csv(index=False) # Converting dataframe to csv for download
+        profiler = StepProfiler(trace_memory=trace_memory) if show_profile else None
+        run = st.session_state["run"] = {"chunks": [], "frame": None, "rows_read": 0, "done": False,
+                                         "profiler": profiler,
+                                         "timings": {"clean": 0.0, "transform": 0.0, "predict": 0.0}}
+        # Any widget interaction reruns the script, which stops this loop; finished chunks stay in the session
+        st.button("Cancel")
+        progress = st.progress(0.0, text="Running Predictions...")
+        partial = st.empty()
+        for chunk in read_listings(file, chunksize=CHUNK_ROWS, all_columns=True):
+            scored, timings = score_chunk(chunk, profiler)
+            run["chunks"].append(scored)
+            run["rows_read"] += len(chunk)
+            for stage, ms in timings.items():
+                run["timings"][stage] += ms
+            progress.progress(min(run["rows_read"] / max(report.rows, 1), 1.0),
+                              text=f"Scored {run['rows_read']:,} of {report.rows:,} rows")
+            with partial.container():
+                st.dataframe(scored[RESULT_COLUMNS].head(PAGE_ROWS))
+        run["done"] = True
+        progress.empty()
+        partial.empty()
+
+    run = st.session_state.get("run")
+    if run is not None and run["chunks"]:
+        if run["frame"] is None:
+            # Once per run (when it finishes, or on the first rerun after a cancel), not on every interaction;
+            # the chunks are released, so only the combined frame is kept
+            run["frame"] = pd.concat(run["chunks"])
+            run["chunks"] = [run["frame"]]
+        df = run["frame"]
+        if run["done"]:
+            st.success("Prediction Probabilities by Property Type")
+        else:
+            st.warning(f"Cancelled after {run['rows_read']:,} of {report.rows:,} rows; showing the rows scored so far.",
+                       icon="⚠️")
+        explain = st.checkbox("Show the top reasons for each prediction")
+        show_page(df, key="results_page", columns=RESULT_COLUMNS, explainer=load_explainer() if explain else None)
+        st.caption(
+            f"⏱️ load {load_ms:.1f} ms · clean {run['timings']['clean']:.1f} ms · "
+            f"transform {run['timings']['transform']:.1f} ms · predict {run['timings']['predict']:.1f} ms"
+        )
+        if run["profiler"] is not None:
+            with st.expander("Cleaning steps"):
+                st.dataframe(run["profiler"].summary())
+
+        # Download dataframe with predictions to csv, converted only when the button is clicked
         st.download_button(
             label = "Download CSV",
-            data = csv,
+            data = lambda: result_csv(run),
             file_name = "Dataset_Predictions.csv",
             mime = "text/csv",
             on_click = "ignore",
             icon = ":material/download:"
         )
-
-
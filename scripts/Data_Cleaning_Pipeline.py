@@ -1,9 +1,54 @@
 import pandas as pd
 import numpy as np
 import re
+from sklearn.base import BaseEstimator, TransformerMixin
+from profiling import NULL_PROFILER
+import parsers
+
+# Rows with these (lowercased) property types and cities are removed in steps 16 and 17
+REMOVED_PROPERTY_TYPES = ["in-park", "flthome", "res-mfg", "plncomm"]
+REMOVED_CITIES = [
+    "forest grove", "cornelius", "aloha", "gaston",
+    "tualatin", "gresham", "gales creek", "milwaukie", "newberg"
+]
+
+def _lowercase_strings(data):
+    """
+    Column-wise equivalent of ``data.map(lambda x: x.lower() if isinstance(x, str) else x)``.
+
+    Only text-like columns (object, string, category) can hold strings, so
+    numeric columns are left untouched. Categoricals are lowered on their
+    categories only; other text columns come back as object dtype, as they
+    do with ``DataFrame.map``.
+    """
+    data = data.copy()
+    for col in data.columns:
+        dtype_name = data[col].dtype.name
+        if dtype_name == "category":
+            data[col] = data[col].map(lambda x: x.lower() if isinstance(x, str) else x)
+            continue
+        if dtype_name not in ("object", "string"):
+            continue
+        values = data[col].astype(object)
+        if pd.api.types.infer_dtype(values, skipna=True) not in ("string", "mixed", "mixed-integer"):
+            # No strings to lower; only mirror DataFrame.map's dtype inference
+            data[col] = values.infer_objects()
+            continue
+        lowered = values.str.lower()
+        # .str.lower() yields NaN for non-string cells; restore the originals
+        data[col] = lowered.where(lowered.notna(), values)
+    return data
+
+
+def _to_nullable_int(values, dtype):
+    """Cast to a nullable integer dtype; Int32 falls back to Int64 for values outside the int32 range."""
+    if dtype == "Int32" and values.abs().max() > np.iinfo(np.int32).max:
+        dtype = "Int64"
+    return values.astype(dtype)
+
 
 # Data cleaning and feature-engineering pipeline
-def clean_and_engineer_features(df):
+def clean_and_engineer_features(df, vectorized=True, state=None, profiler=None, compact=False):
     """
     Comprehensive data cleaning and feature engineering pipeline for real estate data.
     
@@ -11,16 +56,37 @@ def clean_and_engineer_features(df):
     -----------
     df : pandas.DataFrame
         Raw real estate dataframe with original column names
+    vectorized : bool, default True
+        Use column-wise operations for lowercasing (step 6) and HOA imputation
+        (step 8) instead of per-cell / per-row Python lambdas, and the
+        single-pass field parsers in ``parsers`` (steps 3, 4, 8, 11, 15, 20)
+        instead of chained ``.str`` operations. Both modes produce identical
+        output; the row-wise mode is kept for benchmarking.
+    state : CleaningState, optional
+        Batch-level statistics to use instead of recomputing them from `df`.
+        An unfitted state learns them from this batch; a fitted state is
+        applied as-is, making the output independent of how rows are batched.
+    profiler : profiling.StepProfiler, optional
+        Records wall time, rows in/out and column changes of each numbered
+        step. When omitted, a no-op profiler is used and nothing is measured.
+    compact : bool, default False
+        Store the integer columns of steps 11-13 (and the zip code) as nullable
+        ``Int32`` instead of ``Int64``: int32 values plus a boolean missing mask,
+        about half the memory. Values are unchanged, so encoded output matches.
         
     Returns:
     --------
     pandas.DataFrame
         Cleaned and feature-engineered dataframe
     """
+    profiler = profiler or NULL_PROFILER
+    int_dtype = "Int32" if compact else "Int64"
+
     # Create a copy to avoid modifying the original
     data = df.copy()
     
     # ========== STEP 1: DROP UNNECESSARY COLUMNS ==========
+    profiler.step("drop_columns", data)
     cols_to_drop = ['MLS#', 'Prop. Cat.', 'Tax', 'Address', 'Price SqFt',
                     'Sld Price Sqft', 'Lot Size', 'Pend. Date', 'List Date', 
                     'CDOM', 'Sold Date', 'Terms']
@@ -30,6 +96,7 @@ def clean_and_engineer_features(df):
     data = data.drop(columns=cols_to_drop)
     
     # ========== STEP 2: RENAME COLUMNS ==========
+    profiler.step("rename_columns", data)
     rename_mapping = {
         "Type": "property_type",
         "Prop. Cond.": "property_condition",
@@ -54,58 +121,62 @@ def clean_and_engineer_features(df):
     data = data.rename(columns=rename_mapping)
     
     # ========== STEP 3: CLEAN AREA COLUMN ==========
+    profiler.step("clean_area", data)
     if 'area' in data.columns:
-        data['area'] = (
-            data['area']
-            .astype(str)
-            .str.replace("$", " ", regex=False)
-            .str.strip()
-            .str.normalize('NFKC')
-            .str.replace(".00", "", regex=False)
-        )
+        data['area'] = parsers.parse_area(data['area']) if vectorized else parsers.area_chain(data['area'])
     
     # ========== STEP 4: CLEAN PRICE COLUMNS ==========
+    profiler.step("clean_prices", data)
+    # The vectorized parser already returns numbers (steps 6 and 12 leave them as they are)
     for col in ['list_price', 'price']:
         if col in data.columns:
-            data[col] = (
-                data[col]
-                .astype(str)
-                .str.replace("$", "", regex=False)
-                .str.replace(",", "", regex=False)
-                .str.replace(".00", "", regex=False)
-            )
+            data[col] = parsers.parse_price(data[col]) if vectorized else parsers.price_chain(data[col])
     
     # ========== STEP 5: REMOVE OUTLIERS ==========
+    profiler.step("remove_outliers", data)
     # Remove rows where num_garage == 14
     if 'num_garage' in data.columns:
         data = data[data["num_garage"] != 14].reset_index(drop=True)
     
     # ========== STEP 6: APPLY LOWERCASE TO STRING COLUMNS ==========
-    data = data.map(lambda x: x.lower() if isinstance(x, str) else x)
+    profiler.step("lowercase_strings", data)
+    if vectorized:
+        data = _lowercase_strings(data)
+    else:
+        data = data.map(lambda x: x.lower() if isinstance(x, str) else x)
     
     # ========== STEP 7: NORMALIZE PROPERTY TYPE ==========
+    profiler.step("normalize_property_type", data)
     if 'property_type' in data.columns:
         data['property_type'] = data['property_type'].astype(str).str.strip().str.lower()
     
     # ========== STEP 8: CLEAN AND IMPUTE HOA DUES ==========
+    profiler.step("clean_hoa_dues", data)
     if 'hoa_dues' in data.columns:
         # Robust numeric parse
-        data['hoa_dues'] = (
-            data['hoa_dues'].astype(str)
-            .str.replace(r'(?i)\$|,|usd|/mo|per\s*month|monthly', '', regex=True)
-            .str.extract(r'(-?\d+(?:\.\d+)?)', expand=False)
-            .pipe(pd.to_numeric, errors='coerce')
-        )
+        data['hoa_dues'] = parsers.parse_hoa(data['hoa_dues']) if vectorized else parsers.hoa_chain(data['hoa_dues'])
         
-        # Compute median per property_type and impute
+        # Median per property_type: frozen from training if available, else from this batch
         if 'property_type' in data.columns:
-            medians = data.groupby('property_type')['hoa_dues'].median()
-            data['hoa_dues'] = data.apply(
-                lambda row: medians.get(row['property_type'], 0) if pd.isna(row['hoa_dues']) else row['hoa_dues'],
-                axis=1
-            )
+            if state is not None and state.hoa_medians_ is not None:
+                medians = pd.Series(state.hoa_medians_, dtype='float64')
+            else:
+                medians = data.groupby('property_type')['hoa_dues'].median()
+                if state is not None:
+                    state.hoa_medians_ = medians.to_dict()
+
+            if vectorized:
+                # Mapped rather than groupby().transform so frozen training medians can fill any batch;
+                # types without a median stay NaN here and get step 9's 0, like the row-wise default
+                data['hoa_dues'] = data['hoa_dues'].fillna(data['property_type'].map(medians))
+            else:
+                data['hoa_dues'] = data.apply(
+                    lambda row: medians.get(row['property_type'], 0) if pd.isna(row['hoa_dues']) else row['hoa_dues'],
+                    axis=1
+                )
     
     # ========== STEP 9: FILL MISSING VALUES ==========
+    profiler.step("fill_missing", data)
     if 'num_fireplaces' in data.columns:
         data['num_fireplaces'] = data['num_fireplaces'].fillna(0)
 
@@ -119,6 +190,7 @@ def clean_and_engineer_features(df):
         data['num_levels'] = data['num_levels'].fillna(1)
     
     # ========== STEP 10: DROP ROWS WITH MISSING CRITICAL DATA ==========
+    profiler.step("drop_missing_critical", data)
     if 'approx_sqft' in data.columns:
         data = data.dropna(subset=['approx_sqft'])
     
@@ -127,13 +199,16 @@ def clean_and_engineer_features(df):
         data = data[~data['bedrooms'].astype(str).str.contains(r'\bbd\b', case=False, na=False)]
     
     # ========== STEP 11: SPLIT BATHROOMS INTO FULL AND HALF ==========
+    profiler.step("split_bathrooms", data)
     if 'bathrooms' in data.columns:
-        bath_split = data['bathrooms'].astype(str).str.split('.', expand=True)
-        data['full_bath'] = pd.to_numeric(bath_split[0], errors='coerce').astype("Int64")
-        data['half_bath'] = pd.to_numeric(bath_split[1], errors='coerce').fillna(0).astype("Int64")
+        split = parsers.split_baths if vectorized else parsers.bath_chain
+        full_bath, half_bath = split(data['bathrooms'])
+        data['full_bath'] = _to_nullable_int(full_bath, int_dtype)
+        data['half_bath'] = _to_nullable_int(half_bath, int_dtype)
         data = data.drop(columns=['bathrooms'])
     
     # ========== STEP 12: CONVERT COLUMNS TO INTEGER ==========
+    profiler.step("convert_integers", data)
     cols_to_int = [
         'bedrooms', 'num_levels', 'approx_sqft', 'days_on_market', 'list_price', 
         'price', 'num_garage', 'num_fireplaces'
@@ -141,41 +216,42 @@ def clean_and_engineer_features(df):
     
     for col in cols_to_int:
         if col in data.columns:
-            data[col] = pd.to_numeric(data[col], errors="coerce").astype("Int64")
+            data[col] = _to_nullable_int(pd.to_numeric(data[col], errors="coerce"), int_dtype)
     
     # ========== STEP 13: CONVERT YEAR BUILT ==========
+    profiler.step("convert_year_built", data)
     if 'year_built' in data.columns:
-        data['year_built'] = pd.to_numeric(data['year_built'], errors='coerce').astype('Int64')
+        data['year_built'] = _to_nullable_int(pd.to_numeric(data['year_built'], errors='coerce'), int_dtype)
     
     # ========== STEP 14: CONVERT TO CATEGORICAL ==========
+    profiler.step("convert_categorical", data)
     categorical_cols = ["property_type", "property_condition", "city", "area"]
     for col in categorical_cols:
         if col in data.columns:
             data[col] = data[col].astype("category")
     
     # ========== STEP 15: NORMALIZE ZIP CODE ==========
+    profiler.step("normalize_zip", data)
     if "zip_code" in data.columns:
-        zip_num = pd.to_numeric(data["zip_code"], errors="coerce").round().astype("Int64")
-        data["zip_code"] = zip_num.astype("string").str.zfill(5).astype("category")
+        normalize = parsers.normalize_zip if vectorized else parsers.zip_chain
+        data["zip_code"] = normalize(data["zip_code"], int_dtype)
     
     # ========== STEP 16: REMOVE UNWANTED PROPERTY TYPES ==========
+    profiler.step("remove_property_types", data)
     if 'property_type' in data.columns:
-        types_to_remove = ["in-park", "flthome", "res-mfg", "plncomm"]
-        data = data.loc[~data["property_type"].isin(types_to_remove)].copy()
+        data = data.loc[~data["property_type"].isin(REMOVED_PROPERTY_TYPES)].copy()
         data["property_type"] = data["property_type"].cat.remove_unused_categories()
     
     # ========== STEP 17: CLEAN CITY COLUMN ==========
+    profiler.step("clean_city", data)
     if 'city' in data.columns:
         data['city'] = data['city'].str.strip().str.lower()
         
         # Remove specific cities
-        cities_to_drop = [
-            "forest grove", "cornelius", "aloha", "gaston",
-            "tualatin", "gresham", "gales creek", "milwaukie", "newberg"
-        ]
-        data = data[~data['city'].isin(cities_to_drop)].reset_index(drop=True)
+        data = data[~data['city'].isin(REMOVED_CITIES)].reset_index(drop=True)
     
     # ========== STEP 18: FEATURE ENGINEERING - BATH TO BED RATIO ==========
+    profiler.step("bath_to_bed_ratio", data)
     if 'full_bath' in data.columns and 'half_bath' in data.columns and 'bedrooms' in data.columns:
         total_bathrooms = data['full_bath'] + 0.5 * data['half_bath']
         data['bath_to_bed_ratio'] = np.where(
@@ -186,34 +262,50 @@ def clean_and_engineer_features(df):
         data['bath_to_bed_ratio'] = data['bath_to_bed_ratio'].round(2)
     
     # ========== STEP 19: FEATURE ENGINEERING - PROPERTY AGE ==========
+    profiler.step("property_age", data)
     if 'year_built' in data.columns:
         data['property_age'] = 2025 - data['year_built']
         data['property_age'] = data['property_age'].astype('category')
     
     # ========== STEP 20: FEATURE ENGINEERING - ZIP PREFIX GROUPS ==========
+    profiler.step("zip_prefix_groups", data)
     if 'zip_code' in data.columns:
-        # Convert zip_code to numeric for prefix extraction
-        zip_numeric = pd.to_numeric(data['zip_code'], errors='coerce')
-        zip_prefix = zip_numeric.dropna().astype(int).astype(str).str[:3]
-        
-        # Classify by prefix
-        def classify_zip_prefix(prefix):
-            if pd.isna(prefix):
-                return 'other'
-            elif prefix == '972':
-                return 'urban_portland'
-            elif prefix == '970':
-                return 'suburban_west_south'
-            elif prefix == '971':
-                return 'suburban_northwest'
-            else:
-                return 'other'
-        
-        data['zip_prefix_group'] = zip_prefix.apply(classify_zip_prefix)
-        data['zip_prefix_group'] = data['zip_prefix_group'].astype('category')
+        classify = parsers.zip_prefix_groups if vectorized else parsers.zip_group_chain
+        data['zip_prefix_group'] = classify(data['zip_code'])
     
+    profiler.finish(data)
     return data
 
 
+class CleaningState(BaseEstimator, TransformerMixin):
+    """
+    Frozen cleaning statistics, learned once on training data.
+    - `hoa_medians_`: median HOA dues per property_type, used to impute missing dues (step 8).
+    Passing a fitted state to `clean_and_engineer_features` makes each row's
+    output independent of the other rows in its batch, so scoring can be split
+    across chunks or processes and still match a single pass.
+    """
+    def __init__(self, vectorized=True):
+        self.vectorized = vectorized
+        self.hoa_medians_ = None         # {property_type: median hoa_dues}
+
+    def fit(self, X: pd.DataFrame, y=None, profiler=None):
+        self.fit_transform(X, profiler=profiler)
+        return self
+
+    def fit_transform(self, X: pd.DataFrame, y=None, profiler=None):
+        # Clean once, recording the statistics on the way through
+        self.hoa_medians_ = None
+        cleaned = clean_and_engineer_features(X, vectorized=self.vectorized, state=self, profiler=profiler)
+        if self.hoa_medians_ is None:    # no HOA / property type columns to learn from
+            self.hoa_medians_ = {}
+        return cleaned
+
+    def transform(self, X: pd.DataFrame, profiler=None):
+        if self.hoa_medians_ is None:
+            raise ValueError("CleaningState is not fitted; call fit() on training data first")
+        return clean_and_engineer_features(X, vectorized=self.vectorized, state=self, profiler=profiler)
+
+
 # === USAGE ===
 #Dataset_New = clean_and_engineer_features(Dataset_New)
\ No newline at end of file
@@ -1,24 +1,146 @@
+import copy
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import OneHotEncoder, LabelEncoder, StandardScaler
 
+def _category_positions(values: pd.Series, categories: pd.Index, lookup: dict, missing: int = -1) -> np.ndarray:
+    """
+    Position of each value in `categories` (-1 if unseen).
+
+    Categorical input (what cleaning produces) is matched through its own few
+    categories with the precomputed `lookup` ({category: position}) and
+    broadcast by code, instead of hashing every row; missing values get `missing`.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        array = values.array
+        table = np.array([lookup.get(v, -1) for v in array.categories.tolist()] + [missing], dtype=np.intp)
+        return table[array.codes]
+    return categories.get_indexer(values)
+
+
+class TransformPlan:
+    """
+    Frozen recipe for writing model input straight into one float32 array.
+
+    Built once per fitted encoder and feature order (`EncodingPipeline.compile`):
+    every output position, scaler mean/scale and category lookup table is
+    resolved up front, so `execute` only reads each input column once and
+    stores into a preallocated array, with no frames, name lookups or
+    per-call encoder introspection.
+    """
+
+    def __init__(self, encoder, feature_names):
+        self.feature_names = tuple(feature_names)
+        position = {c: i for i, c in enumerate(self.feature_names)}
+
+        scaling = {}
+        if encoder.scaler_ is not None:
+            for i, c in enumerate(encoder.scaler_.get_feature_names_out()):
+                scaling[c] = (float(encoder.scaler_.mean_[i]), float(encoder.scaler_.scale_[i]))
+
+        # (column, categories, {category: index}, output position per category or -1,
+        #  index of a NaN category or -1)
+        onehot = []
+        if not encoder.native_categorical and encoder.ohe_ is not None:
+            for c, cats, names in zip(encoder.cat_cols_, encoder.ohe_.categories_, encoder._ohe_names_by_column()):
+                cats = pd.Index(cats)
+                columns = np.array([position.get(n, -1) for n in names], dtype=np.intp)
+                nan_position = cats.get_indexer([np.nan])[0] if cats.hasnans else -1
+                lookup = {v: i for i, v in enumerate(cats.tolist()) if not pd.isna(v)}
+                onehot.append((c, cats, lookup, columns, nan_position))
+        ohe_names = {n for names in (encoder._ohe_names_by_column() if onehot else []) for n in names}
+
+        native, scaled, passthrough = [], [], []
+        for c in self.feature_names:
+            j = position[c]
+            if c in ohe_names:
+                continue
+            if encoder.native_categorical and c in encoder.categories_:
+                cats = pd.Index(encoder.categories_[c])
+                native.append((c, j, cats, {v: i for i, v in enumerate(cats.tolist())}))
+            elif c in scaling:
+                scaled.append((c, j) + scaling[c])
+            else:
+                passthrough.append((c, j))
+
+        self.onehot = tuple(onehot)
+        self.native = tuple(native)
+        self.scaled = tuple(scaled)
+        self.passthrough = tuple(passthrough)
+        self.n_features = len(self.feature_names)
+
+    def execute(self, X: pd.DataFrame, out: np.ndarray = None) -> np.ndarray:
+        """
+        Encode `X` into `out` (allocated when not given) and return it.
+
+        Args:
+            X: Cleaned frame; columns absent from it encode as NaN (-1 for native categoricals)
+            out: Optional C-contiguous float32 array of shape (len(X), n_features) to
+                reuse across calls; it is fully overwritten
+        """
+        if out is None:
+            out = np.zeros((len(X), self.n_features), dtype=np.float32)
+        else:
+            if out.shape != (len(X), self.n_features) or out.dtype != np.float32:
+                raise ValueError(f"out must be float32 with shape {(len(X), self.n_features)}, got "
+                                 f"{out.dtype} {out.shape}")
+            out.fill(0)
+        columns = X.columns
+
+        for c, j, mean, scale in self.scaled:
+            if c in columns:
+                out[:, j] = (X[c].to_numpy(dtype=np.float64, na_value=np.nan) - mean) / scale
+            else:
+                out[:, j] = np.nan
+        for c, j in self.passthrough:
+            out[:, j] = X[c].to_numpy(dtype=np.float32, na_value=np.nan) if c in columns else np.nan
+        for c, j, categories, lookup in self.native:
+            out[:, j] = _category_positions(X[c], categories, lookup) if c in columns else -1
+
+        if self.onehot and len(X):
+            rows = np.arange(len(X))
+            for c, categories, lookup, positions, nan_position in self.onehot:
+                if c not in columns:
+                    continue
+                idx = _category_positions(X[c], categories, lookup, nan_position)
+                hit = idx >= 0
+                cols = positions[idx[hit]]
+                keep = cols >= 0    # categories whose column is not in `feature_names`
+                out[rows[hit][keep], cols[keep]] = 1
+        return out
+
+
+
 class EncodingPipeline(BaseEstimator, TransformerMixin):
     """
     - OneHotEncodes all categorical dtype columns except `property_type`.
     - If `property_type` exists, label-encodes it and stores class mapping.
     - Ignores missing columns at transform-time (adds NaNs for fitted OHE columns that are absent).
+    - With `sparse_output=True`, `transform` returns a CSR model-input matrix (see `transform_sparse`).
+    - `transform_array` writes the model input straight into one C-contiguous float32 array,
+      following a `TransformPlan` compiled once per feature order (see `compile`).
+    - With `native_categorical=True`, categoricals are not one-hot expanded; each becomes an
+      int32 code column locked to the training vocabulary (-1 = missing/unseen), for
+      LightGBM's native categorical handling.
     """
-    def __init__(self, property_col="property_type", verbose=True, ohe_dtype="uint8"):
+    def __init__(self, property_col="property_type", verbose=True, ohe_dtype="uint8", sparse_output=False,
+                 native_categorical=False):
         self.property_col = property_col
         self.verbose = verbose
         self.ohe_dtype = ohe_dtype
+        self.sparse_output = sparse_output
+        self.native_categorical = native_categorical
         self.cat_cols_ = None            # categorical columns (excluding property_col)
         self.ohe_ = None
         self.scaler_ = None                 # OneHotEncoder
         self.le_ = None                  # LabelEncoder for property_col (optional)
         self.prop_classes_ = None        # classes_ for property_col
         self.prop_class_mapping_ = None  # {class_name: encoded_int}
+        self.feature_names_out_ = None   # model input columns (transform output minus property_col)
+        self.categories_ = None          # {cat_col: training vocabulary} in native categorical mode
+        self._plans = {}                 # {feature_names: TransformPlan}, filled by `compile`
 
     # ---------- helpers ----------
     def _is_categorical(self, s: pd.Series) -> bool:
@@ -31,11 +153,12 @@ class EncodingPipeline(BaseEstimator, TransformerMixin):
     # ---------- sklearn API ----------
     def fit(self, X: pd.DataFrame, y=None):
         X = X.copy()
+        self._plans = {}
 
         # Detect categorical columns (object/string/category) and exclude property_col
         cat_candidates = [c for c in X.columns if self._is_categorical(X[c])]
         self.cat_cols_ = [c for c in cat_candidates if c != self.property_col]
-        self.numeric_cols_ = X.select_dtypes(include=["Int64", "float64"]).columns.to_list()
+        self.numeric_cols_ = X.select_dtypes(include=["Int64", "Int32", "float64", "float32"]).columns.to_list()
 
         # Fit Standard Scaler for numeric columns if any present
         if len(self.numeric_cols_) > 0:
@@ -44,8 +167,12 @@ class EncodingPipeline(BaseEstimator, TransformerMixin):
         else:
             self.scaler_ = None
 
+        # Native mode: lock each categorical column to its training vocabulary instead of fitting OHE
+        if self.native_categorical:
+            self.categories_ = {c: X[c].astype("category").cat.categories for c in self.cat_cols_}
+            self.ohe_ = None
         # Fit OHE if any categorical columns to encode
-        if len(self.cat_cols_) > 0:
+        elif len(self.cat_cols_) > 0:
             self.ohe_ = OneHotEncoder(
                 handle_unknown="ignore",
                 sparse_output=False,
@@ -71,9 +198,121 @@ class EncodingPipeline(BaseEstimator, TransformerMixin):
             self.prop_classes_ = None
             self.prop_class_mapping_ = None
 
+        # Model input layout: passthrough/numeric columns in input order, then one-hot columns
+        # (native mode keeps every column in input order, categoricals as codes)
+        if self.native_categorical:
+            self.feature_names_out_ = [c for c in X.columns if c != self.property_col]
+        else:
+            self.feature_names_out_ = [
+                c for c in X.columns if c not in self.cat_cols_ and c != self.property_col
+            ] + self._ohe_feature_names()
+
+        self.compile()
         return self
 
+    def compile(self, feature_names=None) -> TransformPlan:
+        """
+        Precompute (once) and cache the array-encoding plan for a feature order.
+
+        Called by `fit` for `feature_names_out_`; encoders assembled from stored
+        components compile on first use. The plan is reused by every
+        `transform_array` call with the same feature order.
+        """
+        key = tuple(feature_names if feature_names is not None else self.feature_names_out_)
+        plans = getattr(self, "_plans", None)
+        if plans is None:    # encoders pickled before plans existed
+            plans = self._plans = {}
+        if key not in plans:
+            plans[key] = TransformPlan(self, key)
+        return plans[key]
+
+    def _ohe_feature_names(self) -> list:
+        if self.ohe_ is None or not self.cat_cols_:
+            return []
+        return self.ohe_.get_feature_names_out(self.cat_cols_).tolist()
+
+    def transform_sparse(self, X: pd.DataFrame, feature_names=None) -> sparse.csr_matrix:
+        """
+        Build the model input as a CSR matrix without a dense one-hot frame.
+        - Numeric/passthrough columns are scaled exactly as in `transform`.
+        - The one-hot block stays sparse and is hstacked onto the numeric block.
+        - `property_col` is not included; columns follow `feature_names`
+          (default: `feature_names_out_` from fit), missing columns are NaN.
+        """
+        feature_names = list(feature_names if feature_names is not None else self.feature_names_out_)
+        ohe_cols = self._ohe_feature_names()
+        ohe_set = set(ohe_cols)
+        dense_cols = [c for c in feature_names if c not in ohe_set]
+
+        X_dense = X.reindex(columns=dense_cols)
+        if self.scaler_ is not None and len(X) > 0:
+            numeric_cols = self.scaler_.get_feature_names_out().tolist()
+            X_dense[numeric_cols] = self.scaler_.transform(X.reindex(columns=numeric_cols))
+        blocks = [sparse.csr_matrix(X_dense.to_numpy(dtype="float64", na_value=np.nan))]
+
+        if ohe_cols:
+            if len(X) > 0:
+                ohe = copy.copy(self.ohe_)
+                ohe.sparse_output = True
+                blocks.append(ohe.transform(X.reindex(columns=self.cat_cols_)))
+            else:
+                blocks.append(sparse.csr_matrix((0, len(ohe_cols)), dtype=self.ohe_.dtype))
+
+        out = sparse.hstack(blocks, format="csr")
+
+        # Reorder only if feature_names interleaves one-hot and numeric columns
+        layout = dense_cols + ohe_cols
+        if layout != feature_names:
+            position = {c: i for i, c in enumerate(layout)}
+            out = out[:, [position[c] for c in feature_names]]
+
+        if self.verbose:
+            print(f"[EncodingPipeline] Sparse output shape: {out.shape}, stored values: {out.nnz}")
+
+        return out
+
+    def transform_array(self, X: pd.DataFrame, feature_names=None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Build the model input as one C-contiguous float32 array, without intermediate frames.
+        - Each column is read once as float (missing values -> NaN via the column's mask);
+          numeric columns are scaled in float64, as in `transform`, before the float32 store.
+        - One-hot columns are set from each categorical's position in the fitted categories
+          (unseen values leave the row all zero, like `handle_unknown="ignore"`).
+        - Native mode stores category codes (-1 = missing/unseen).
+        - `property_col` is not included; columns follow `feature_names`
+          (default: `feature_names_out_` from fit), missing columns are NaN.
+        - `out` can be a preallocated float32 array of the output shape to fill in place.
+        The result equals `transform` followed by a float32 cast, in feature order.
+        """
+        out = self.compile(feature_names).execute(X, out)
+
+        if self.verbose:
+            print(f"[EncodingPipeline] Array output shape: {out.shape}")
+
+        return out
+
+    def _ohe_names_by_column(self) -> list:
+        """Fitted one-hot output names, grouped per categorical column."""
+        names, start = [], 0
+        all_names = self._ohe_feature_names()
+        for cats in self.ohe_.categories_:
+            names.append(all_names[start:start + len(cats)])
+            start += len(cats)
+        return names
+
+    def encode_categories(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Replace each categorical column with int32 codes into its training vocabulary (-1 if unseen)."""
+        for c, categories in self.categories_.items():
+            values = X[c] if c in X.columns else pd.Series(pd.NA, index=X.index, dtype="object")
+            X[c] = pd.Categorical(values, categories=categories).codes.astype("int32")
+        return X
+
     def transform(self, X: pd.DataFrame):
+        if self.sparse_output:
+            if self.native_categorical:
+                raise ValueError("sparse_output applies to one-hot encoding only, not native_categorical")
+            return self.transform_sparse(X)
+
         X = X.copy()
 
         if self.scaler_ is not None:
@@ -82,20 +321,30 @@ class EncodingPipeline(BaseEstimator, TransformerMixin):
             for m in missing:
                 X[m] = pd.NA
             # X_num = X[self.numeric_cols_] 
-            X[self.numeric_cols_] = self.scaler_.transform(X[self.numeric_cols_]) 
+            if len(X) > 0:
+                X[self.numeric_cols_] = self.scaler_.transform(X[self.numeric_cols_]) 
+            else:
+                # sklearn rejects empty input; keep the scaled dtype so batches concat cleanly
+                X[self.numeric_cols_] = X[self.numeric_cols_].astype("float64")
             scaled_cols = self.scaler_.get_feature_names_out(self.numeric_cols_).tolist()
             # X = pd.concat([X.drop(scaled_cols, axis=1),pd.DataFrame(X_scaled, columns=scaled_cols, index=X.index)], axis=1)
 
+        if self.native_categorical:
+            X = self.encode_categories(X)
+
         # Ensure all fitted OHE columns exist; add missing columns as NA so encoder input shape matches
-        if self.ohe_ is not None and self.cat_cols_:
+        elif self.ohe_ is not None and self.cat_cols_:
             missing = [c for c in self.cat_cols_ if c not in X.columns]
             for m in missing:
                 X[m] = pd.NA
             # Order columns exactly as fitted
             X_cat = X[self.cat_cols_]
             # Transform -> numpy
-            ohe_arr = self.ohe_.transform(X_cat)
             ohe_cols = self.ohe_.get_feature_names_out(self.cat_cols_).tolist()
+            if len(X) > 0:
+                ohe_arr = self.ohe_.transform(X_cat)
+            else:
+                ohe_arr = np.zeros((0, len(ohe_cols)), dtype=self.ohe_.dtype)
             ohe_df = pd.DataFrame(ohe_arr, columns=ohe_cols, index=X.index)
 
             # Drop original categorical cols (except property_col) and concat OHE
@@ -111,9 +360,9 @@ class EncodingPipeline(BaseEstimator, TransformerMixin):
         if self.verbose:
             print(f"[EncodingPipeline] Output shape: {X.shape}")
             if self.ohe_ is not None:
-                print(f"[EncodingPipeline] One-hot columns added: {len(self.ohe_.get_feature_names_out(self.cat_cols_))}")
-                sample_cols = self.ohe_.get_feature_names_out(self.cat_cols_)[:12]
-                print(f"[EncodingPipeline] Sample OHE columns: {list(sample_cols)}")
+                ohe_names = self._ohe_feature_names()
+                print(f"[EncodingPipeline] One-hot columns added: {len(ohe_names)}")
+                print(f"[EncodingPipeline] Sample OHE columns: {ohe_names[:12]}")
             if self.prop_class_mapping_ is not None:
                 print(f"[EncodingPipeline] '{self.property_col}' class mapping: {self.prop_class_mapping_}")
             if self.scaler_ is not None:
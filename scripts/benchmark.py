@@ -0,0 +1,720 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.model_selection import train_test_split
+from Data_Cleaning_Pipeline import CleaningState, clean_and_engineer_features
+from Data_Encoding_Pipeline import EncodingPipeline
+from ingest import read_listings
+import parsers
+from model_run import ROW_ID, RunModel
+from synthetic_data import generate_listings, listings_path, parse_size, write_listings_csv
+
+
+def bootstrap_dataset(path: str = "../Dataset.csv", n_rows: int = 1_000_000, random_state: int = 42) -> pd.DataFrame:
+    """
+    Build a synthetic batch by resampling rows of the sample dataset with replacement.
+
+    Args:
+        path: CSV file to resample
+        n_rows: Number of rows in the synthetic batch
+        random_state: Seed for reproducible sampling
+
+    Returns:
+        DataFrame with the raw MLS columns and `n_rows` rows
+    """
+    df = pd.read_csv(path)
+    return df.sample(n_rows, replace=True, random_state=random_state).reset_index(drop=True)
+
+
+def bench_cleaning(df: pd.DataFrame, repeats: int = 1) -> dict:
+    """
+    Time `clean_and_engineer_features` in row-wise and vectorized mode.
+
+    Args:
+        df: Raw input dataframe
+        repeats: Number of timed runs per mode (best run is reported)
+
+    Returns:
+        Dict with rows/sec per mode, speedup and whether the outputs match
+    """
+    results, outputs = {}, {}
+    for mode, vectorized in [("row_wise", False), ("vectorized", True)]:
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs[mode] = clean_and_engineer_features(df, vectorized=vectorized)
+            best = min(best, time.perf_counter() - start)
+        results[mode] = {"seconds": best, "rows_per_sec": len(df) / best}
+
+    results["speedup"] = results["row_wise"]["seconds"] / results["vectorized"]["seconds"]
+    results["identical"] = outputs["row_wise"].equals(outputs["vectorized"]) and \
+        outputs["row_wise"].dtypes.equals(outputs["vectorized"].dtypes)
+    return results
+
+
+def bench_ingest(df: pd.DataFrame, repeats: int = 1) -> dict:
+    """
+    Time and trace reading a raw CSV with plain `pd.read_csv` and with the typed ingest layer.
+
+    Args:
+        df: Raw input dataframe, written to a temporary CSV first
+        repeats: Number of timed runs per reader (best run is reported)
+
+    Returns:
+        Dict per reader with seconds, rows/sec, traced peak MB and in-memory frame MB,
+        plus whether the typed readers clean to the same output as plain `read_csv`
+    """
+    readers = {
+        "read_csv": lambda path: pd.read_csv(path),
+        "typed_c": lambda path: read_listings(path),
+        "typed_pyarrow": lambda path: read_listings(path, engine="pyarrow"),
+    }
+    results, frames = {}, {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/raw.csv"
+        df.to_csv(path, index=False)
+        for name, read in readers.items():
+            best = float("inf")
+            for _ in range(repeats):
+                tracemalloc.start()
+                start = time.perf_counter()
+                frames[name] = read(path)
+                best = min(best, time.perf_counter() - start)
+                # Arrow's own buffers are not traced, so the pyarrow peak is a lower bound
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            results[name] = {
+                "seconds": best,
+                "rows_per_sec": len(frames[name]) / best,
+                "peak_mb": peak / 1e6,
+                "frame_mb": frames[name].memory_usage(deep=True).sum() / 1e6,
+            }
+
+    state = CleaningState().fit(frames["read_csv"])
+    baseline = clean_and_engineer_features(frames.pop("read_csv"), state=state)
+    for name, frame in frames.items():
+        results[name]["identical"] = clean_and_engineer_features(frame, state=state).equals(baseline)
+    return results
+
+
+# field -> (raw column, reference chain, single-pass parser); the chains run as cleaning steps 3-20 did
+PARSER_FIELDS = {
+    "area": ("Area", parsers.area_chain, parsers.parse_area),
+    "price": ("Price", lambda v: pd.to_numeric(parsers.price_chain(v).str.lower(), errors="coerce"),
+              parsers.parse_price),
+    "hoa_dues": ("HOA Dues", parsers.hoa_chain, parsers.parse_hoa),
+    "bathrooms": ("Baths", parsers.bath_chain, parsers.split_baths),
+    "zip_code": ("Zip", parsers.zip_chain, parsers.normalize_zip),
+    "zip_prefix_group": ("Zip", parsers.zip_group_chain, parsers.zip_prefix_groups),
+}
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, tuple):
+        return all(_same(x, y) for x, y in zip(a, b))
+    return a.equals(b) and a.dtype == b.dtype
+
+
+def bench_parsers(df: pd.DataFrame, repeats: int = 1) -> dict:
+    """
+    Micro-benchmark each field parser against the chained `.str` operations it replaces.
+
+    Args:
+        df: Raw input dataframe (dirty values included, e.g. from `generate_listings`)
+        repeats: Number of timed runs per implementation (best run is reported)
+
+    Returns:
+        Dict per field with chain and parser seconds, speedup, distinct input
+        values and whether both produce the same values and dtype
+    """
+    results = {}
+    for field, (column, chain, parse) in PARSER_FIELDS.items():
+        values = df[column]
+        if field == "zip_prefix_group":    # step 20 reads step 15's output
+            values = parsers.normalize_zip(values)
+        timings, outputs = {}, {}
+        for name, fn in (("chain", chain), ("parser", parse)):
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                outputs[name] = fn(values)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+        results[field] = {
+            "chain_seconds": timings["chain"],
+            "parser_seconds": timings["parser"],
+            "speedup": timings["chain"] / timings["parser"],
+            "distinct_values": int(values.nunique(dropna=False)),
+            "identical": _same(outputs["chain"], outputs["parser"]),
+        }
+    return results
+
+
+def bench_parallel(df: pd.DataFrame, model_dir: str, n_jobs_list=(1, 2, 4, 8), num_threads: int = None) -> dict:
+    """
+    Time `RunModel.score` for several process counts and check output against serial.
+
+    Args:
+        df: Raw input dataframe
+        model_dir: Model bundle directory
+        n_jobs_list: Process counts to try; the first is the baseline
+        num_threads: LightGBM prediction threads
+
+    Returns:
+        Dict keyed by n_jobs with seconds, rows/sec, speedup and whether output matches the baseline
+    """
+    results, baseline = {}, None
+    for n_jobs in n_jobs_list:
+        runner = RunModel(model_dir, n_jobs=n_jobs, num_threads=num_threads)
+        if n_jobs > 1:
+            runner.score(df.head(n_jobs))    # start workers outside the timed run
+        start = time.perf_counter()
+        scored = runner.score(df)
+        elapsed = time.perf_counter() - start
+        runner.close()
+
+        if baseline is None:
+            baseline = (scored, elapsed)
+        results[n_jobs] = {
+            "seconds": elapsed,
+            "rows_per_sec": len(df) / elapsed,
+            "speedup": baseline[1] / elapsed,
+            "identical": scored.equals(baseline[0]),
+        }
+    return results
+
+
+def bench_sparse(df: pd.DataFrame, model_dir: str) -> dict:
+    """
+    Compare dense and sparse encoding + prediction on one cleaned batch.
+
+    Args:
+        df: Raw input dataframe
+        model_dir: Model bundle directory
+
+    Returns:
+        Dict per mode with encode/predict seconds, peak traced memory (MB) and
+        model-input size (MB), plus whether predictions match
+    """
+    results, preds = {}, {}
+    for mode, use_sparse in [("dense", False), ("sparse", True)]:
+        runner = RunModel(model_dir, sparse=use_sparse)
+        cleaned = clean_and_engineer_features(df, state=runner.cleaning_state)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        X = runner._align_features(runner.encoder.transform(cleaned))
+        encode_s = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        preds[mode] = runner._model_predict(X)
+        predict_s = time.perf_counter() - start
+
+        if use_sparse:
+            input_bytes = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+        else:
+            input_bytes = X.memory_usage(deep=True).sum()
+        results[mode] = {
+            "encode_seconds": encode_s,
+            "predict_seconds": predict_s,
+            "peak_encode_mb": peak / 1e6,
+            "input_mb": input_bytes / 1e6,
+        }
+    results["identical"] = bool(np.array_equal(preds["dense"], preds["sparse"]))
+    return results
+
+
+def bench_encodings(df: pd.DataFrame, n_predict_rows: int = 1_000_000, params: dict = None,
+                    num_threads: int = None, random_state: int = 42) -> dict:
+    """
+    Train one-hot and native-categorical LightGBM models on the same split and compare them.
+
+    The split is made on the raw sample before any resampling, so accuracy is
+    measured on unseen rows; throughput uses the test rows resampled to
+    `n_predict_rows`.
+
+    Args:
+        df: Raw labelled dataframe (not bootstrapped)
+        n_predict_rows: Rows in the resampled batch used to time prediction
+        params: LGBMClassifier parameters shared by both models
+        num_threads: LightGBM training and prediction threads
+        random_state: Seed for the split and the resampling
+
+    Returns:
+        Dict per encoding with feature count, training seconds, prediction rows/sec
+        and held-out accuracy
+    """
+    params = dict(params or {}, random_state=random_state, verbose=-1)
+    if num_threads is not None:
+        params["n_jobs"] = num_threads
+
+    train_raw, test_raw = train_test_split(df, test_size=0.25, random_state=random_state, stratify=df["Type"])
+    cleaning_state = CleaningState()
+    train = cleaning_state.fit_transform(train_raw)
+    test = cleaning_state.transform(test_raw)
+    test_big = test.sample(n_predict_rows, replace=True, random_state=random_state)
+
+    results = {}
+    for mode in ("onehot", "native"):
+        encoder = EncodingPipeline(verbose=False, native_categorical=mode == "native")
+        encoder.fit(train)
+        X_train = encoder.transform(train)
+        y_train = X_train.pop("property_type")
+        X_test = encoder.transform(test)
+        y_test = X_test.pop("property_type")
+        X_big = encoder.transform(test_big).reindex(columns=X_train.columns)
+
+        model = LGBMClassifier(**params)
+        fit_kwargs = {"categorical_feature": encoder.cat_cols_} if mode == "native" else {}
+        start = time.perf_counter()
+        model.fit(X_train, y_train, **fit_kwargs)
+        train_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model.predict(X_big)
+        predict_s = time.perf_counter() - start
+
+        results[mode] = {
+            "n_features": X_train.shape[1],
+            "train_seconds": train_s,
+            "predict_rows_per_sec": len(X_big) / predict_s,
+            "accuracy": float((model.predict(X_test.reindex(columns=X_train.columns)) == y_test).mean()),
+        }
+    return results
+
+
+def bench_backends(df: pd.DataFrame, model_dir: str, batch_sizes=(1, 10, 100, 1000), min_seconds: float = 0.5) -> dict:
+    """
+    Time alignment + prediction per batch size for the LightGBM and NumPy backends.
+
+    Args:
+        df: Raw input dataframe
+        model_dir: Model bundle directory
+        batch_sizes: Encoded rows per request
+        min_seconds: Minimum timing window per batch size and backend
+
+    Returns:
+        Dict keyed by batch size with milliseconds per batch for each backend and the
+        NumPy backend's speedup, plus the maximum probability difference on the full batch
+    """
+    runners = {backend: RunModel(model_dir, backend=backend) for backend in ("lightgbm", "numpy")}
+    X, _ = runners["lightgbm"]._clean_and_encode(df)
+
+    results = {}
+    for n in batch_sizes:
+        X_n = X.iloc[:n]
+        results[n] = {}
+        for backend, runner in runners.items():
+            runner._model_predict(runner._align_features(X_n))    # warm up lazy loading
+            start, calls = time.perf_counter(), 0
+            while time.perf_counter() - start < min_seconds:
+                runner._model_predict(runner._align_features(X_n))
+                calls += 1
+            results[n][backend] = (time.perf_counter() - start) / calls * 1000
+        results[n]["speedup"] = results[n]["lightgbm"] / results[n]["numpy"]
+
+    bundle = runners["lightgbm"].bundle
+    lgb_proba = bundle.predict_proba(runners["lightgbm"]._align_features(X))
+    np_proba = bundle.predict_proba(bundle.to_array(X), backend="numpy")
+    results["max_abs_diff"] = float(np.abs(lgb_proba - np_proba).max())
+    return results
+
+
+def bench_serve(df: pd.DataFrame, model_dir: str, concurrency: int = 16, requests_per_client: int = 50,
+                batch_sizes=(1, 64), max_wait_ms: float = 5.0) -> dict:
+    """
+    Load-test the HTTP scoring service locally with concurrent single-listing requests.
+
+    Args:
+        df: Raw input dataframe; rows are sent one per request
+        model_dir: Model bundle directory
+        concurrency: Client threads sending requests back to back
+        requests_per_client: Requests sent by each client
+        batch_sizes: `max_batch_size` settings to compare (1 disables micro-batching)
+        max_wait_ms: Micro-batch collection window
+
+    Returns:
+        Dict keyed by max_batch_size with requests/sec, client latency percentiles (ms),
+        mean rows per batch and error count
+    """
+    from serve import make_server
+
+    records = json.loads(df.to_json(orient="records"))
+    results = {}
+    for max_batch_size in batch_sizes:
+        server = make_server(model_dir, port=0, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/predict"
+        latencies, errors = [], []
+
+        def client(worker: int):
+            for i in range(requests_per_client):
+                body = json.dumps(records[(worker * requests_per_client + i) % len(records)]).encode()
+                request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+                start = time.perf_counter()
+                try:
+                    urllib.request.urlopen(request).read()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except Exception as exc:
+                    errors.append(exc)
+
+        clients = [threading.Thread(target=client, args=(w,)) for w in range(concurrency)]
+        start = time.perf_counter()
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        snapshot = server.batcher.metrics.snapshot()
+        server.shutdown()
+        server.server_close()
+        server.batcher.close()
+        results[max_batch_size] = {
+            "requests_per_sec": len(latencies) / elapsed,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "mean_batch_rows": snapshot["batches"]["mean_rows"],
+            "errors": len(errors),
+        }
+    return results
+
+
+PIPELINE_STAGES = ("ingest", "clean", "encode", "predict", "export")
+
+
+def _timed(stage: str, timings: dict, fn, *args, **kwargs):
+    """Call `fn`, adding its wall time to `timings[stage]`."""
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    timings[stage] += time.perf_counter() - start
+    return out
+
+
+def _score_chunk(runner: RunModel, chunk: pd.DataFrame, output_path, header: bool, timings: dict) -> dict:
+    """Run one raw chunk through every stage after ingest; returns the rows leaving each stage."""
+    tagged = chunk.assign(**{ROW_ID: np.arange(len(chunk))})
+    cleaned = _timed("clean", timings, clean_and_engineer_features, tagged, state=runner.cleaning_state,
+                     compact=runner.compact)
+    row_ids = cleaned.pop(ROW_ID).to_numpy()
+    encode = runner.encoder.transform_array if runner.compact else runner.encoder.transform
+    X = _timed("encode", timings, encode, cleaned)
+    pred = _timed("predict", timings, lambda: runner.label_encoder.inverse_transform(
+        runner._model_predict(runner._align_features(X))))
+
+    def export():
+        scored = chunk.iloc[row_ids].copy()
+        scored["Predicted Type"] = pred
+        scored.to_csv(output_path, mode="a", header=header, index=False)
+
+    _timed("export", timings, export)
+    return {"ingest": len(chunk), "clean": len(cleaned), "encode": X.shape[0], "predict": len(pred),
+            "export": len(pred)}
+
+
+def _stage_peaks(path, runner: RunModel, chunk_rows: int, model_columns: bool) -> dict:
+    """Peak traced memory (MB) of each stage on the first chunk; tracing runs apart from the timed pass."""
+    peaks = {}
+
+    def traced(stage, fn, *args, **kwargs):
+        tracemalloc.start()
+        out = fn(*args, **kwargs)
+        peaks[stage] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        return out
+
+    chunk = traced("ingest", lambda: next(iter(read_listings(path, chunksize=chunk_rows,
+                                                              extra_columns=("MLS#",), all_columns=not model_columns))))
+    tagged = chunk.assign(**{ROW_ID: np.arange(len(chunk))})
+    cleaned = traced("clean", clean_and_engineer_features, tagged, state=runner.cleaning_state,
+                     compact=runner.compact)
+    row_ids = cleaned.pop(ROW_ID).to_numpy()
+    X = traced("encode", runner.encoder.transform_array if runner.compact else runner.encoder.transform, cleaned)
+    pred = traced("predict", lambda: runner.label_encoder.inverse_transform(
+        runner._model_predict(runner._align_features(X))))
+    traced("export", lambda: chunk.iloc[row_ids].assign(**{"Predicted Type": pred}).to_csv(index=False))
+    return peaks
+
+
+def bench_pipeline(path, model_dir: str, chunk_rows: int = 1_000_000, backend: str = "lightgbm",
+                   model_columns: bool = False, trace_memory: bool = True, compact: bool = False) -> dict:
+    """
+    Time every stage of chunked batch scoring on one raw CSV, as `score.py` runs it.
+
+    Stages: ingest (typed CSV read), clean (`clean_and_engineer_features`),
+    encode (`EncodingPipeline.transform`), predict (alignment, model and label
+    decoding) and export (CSV write). Files larger than `chunk_rows` are processed
+    chunk by chunk and stage times are summed, so memory stays bounded at 10M rows.
+
+    Args:
+        path: Raw MLS CSV
+        model_dir: Model bundle directory
+        chunk_rows: Rows per chunk
+        backend: Prediction backend passed to RunModel
+        model_columns: Read only MLS# and the model's input columns
+        trace_memory: Also record each stage's peak traced memory on the first chunk
+        compact: Run RunModel in compact mode (Int32 cleaning, float32 array encoding)
+
+    Returns:
+        Dict per stage with seconds, rows out and (if traced) peak MB per chunk,
+        plus total seconds and end-to-end rows/sec
+    """
+    runner = RunModel(model_dir, backend=backend, compact=compact)
+    timings = dict.fromkeys(PIPELINE_STAGES, 0.0)
+    rows = dict.fromkeys(PIPELINE_STAGES, 0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = f"{tmp}/scored.csv"
+        chunks = read_listings(path, chunksize=chunk_rows, extra_columns=("MLS#",), all_columns=not model_columns)
+        first = True
+        while True:
+            chunk = _timed("ingest", timings, next, chunks, None)
+            if chunk is None:
+                break
+            for stage, n in _score_chunk(runner, chunk, output_path, first, timings).items():
+                rows[stage] += n
+            first = False
+
+    peaks = _stage_peaks(path, runner, chunk_rows, model_columns) if trace_memory else {}
+    total = sum(timings.values())
+    results = {
+        stage: {"seconds": timings[stage], "rows_out": rows[stage], **({"peak_mb": peaks[stage]} if peaks else {})}
+        for stage in PIPELINE_STAGES
+    }
+    results["total_seconds"] = total
+    results["rows_per_sec"] = rows["ingest"] / total if total > 0 else 0.0
+    return results
+
+
+def run_metadata() -> dict:
+    """Commit, library versions and machine details stored with benchmark results."""
+    import lightgbm
+    import sklearn
+
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True))
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty_tree": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "lightgbm": lightgbm.__version__,
+        "scikit-learn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare_runs(baseline: dict, current: dict) -> dict:
+    """
+    Stage-by-stage time ratios (current / baseline) for sizes present in both runs.
+
+    Ratios above 1 mean the current run is slower.
+    """
+    ratios = {}
+    for size, res in current["results"].items():
+        base = baseline["results"].get(size)
+        if base is None:
+            continue
+        ratios[size] = {
+            stage: res[stage]["seconds"] / base[stage]["seconds"]
+            for stage in PIPELINE_STAGES if base[stage]["seconds"] > 0
+        }
+        ratios[size]["total"] = res["total_seconds"] / base["total_seconds"]
+    return ratios
+
+
+# Loader snippets timed in a fresh interpreter; libraries are imported before the clock starts
+_COLD_START_SNIPPETS = {
+    "pickles": (
+        "import pickle, lightgbm, sklearn.preprocessing, Data_Cleaning_Pipeline",
+        "for name in ('model_artifacts', 'ohe', 'scaler', 'label_encoder'):\n"
+        "    with open(f'{path}/{name}.pkl', 'rb') as f: pickle.load(f)",
+    ),
+    "bundle": (
+        "import model_bundle",
+        "b = model_bundle.ModelBundle('{path}')\n"
+        "b.ohe; b.scaler; b.label_encoder; b.cleaning_state; b.booster",
+    ),
+    # NumPy prediction backend: memory-mapped forest arrays instead of parsing the booster
+    "bundle_numpy": (
+        "import model_bundle",
+        "b = model_bundle.ModelBundle('{path}')\n"
+        "b.ohe; b.scaler; b.label_encoder; b.cleaning_state; b.tree_engine",
+    ),
+    # What a clean/encode worker needs: everything but the booster
+    "bundle_encode_only": (
+        "import model_bundle",
+        "b = model_bundle.ModelBundle('{path}')\n"
+        "b.ohe; b.scaler; b.label_encoder; b.cleaning_state",
+    ),
+}
+
+
+def bench_cold_start(pickle_dir: str, bundle_dir: str, repeats: int = 5) -> dict:
+    """
+    Time artifact loading for the legacy pickles and the model bundle in fresh processes.
+
+    Args:
+        pickle_dir: Directory with the four legacy pickles
+        bundle_dir: Model bundle directory
+        repeats: Fresh processes per loader (best run is reported)
+
+    Returns:
+        Dict with best load milliseconds per loader and the full-load speedup
+    """
+    results = {}
+    for name, path in [("pickles", pickle_dir), ("bundle", bundle_dir), ("bundle_numpy", bundle_dir),
+                       ("bundle_encode_only", bundle_dir)]:
+        setup, load = _COLD_START_SNIPPETS[name]
+        code = (
+            f"{setup}\nimport time\nstart = time.perf_counter()\n"
+            f"{load.replace('{path}', str(path))}\nprint((time.perf_counter() - start) * 1000)"
+        )
+        runs = [float(subprocess.check_output([sys.executable, "-c", code], text=True)) for _ in range(repeats)]
+        results[name] = {"load_ms": min(runs)}
+    results["speedup"] = results["pickles"]["load_ms"] / results["bundle"]["load_ms"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on a bootstrapped dataset")
+    parser.add_argument(
+        "benchmark",
+        choices=["pipeline", "cleaning", "parsers", "ingest", "parallel", "coldstart", "sparse", "encodings", "backends", "serve"],
+        help="Benchmark to run",
+    )
+    parser.add_argument("--data", default="../Dataset.csv", help="Sample CSV to bootstrap from (labelled training data for encodings)")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of synthetic rows")
+    parser.add_argument("--repeats", type=int, default=1, help="Timed runs per mode")
+    parser.add_argument("--model-dir", default="../pickle/model_bundle", help="Model bundle directory")
+    parser.add_argument("--pickle-dir", default="../pickle", help="Legacy pickle directory (coldstart only)")
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, 2, 4, 8], help="Process counts to compare")
+    parser.add_argument("--num-threads", type=int, default=None, help="LightGBM prediction threads")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k", "1m"],
+                        help="Generated file sizes for the pipeline suite (10k, 100k, 1m, 10m or row counts)")
+    parser.add_argument("--data-dir", default="../.cache/synthetic", help="Where generated pipeline inputs are kept")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="Rows per chunk in the pipeline suite")
+    parser.add_argument("--backend", choices=["lightgbm", "numpy"], default="lightgbm", help="Prediction backend")
+    parser.add_argument("--compact", action="store_true", help="Pipeline suite in RunModel's compact mode")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced-memory pass of the pipeline suite")
+    parser.add_argument("--output", default=None, help="Write pipeline suite results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Earlier pipeline suite JSON to compare against")
+    args = parser.parse_args()
+
+    if args.benchmark == "pipeline":
+        run = {"meta": run_metadata(), "results": {}}
+        run["meta"].update(model_dir=args.model_dir, backend=args.backend, chunk_rows=args.chunk_rows,
+                           compact=args.compact)
+        for size in args.sizes:
+            n_rows = parse_size(size)
+            # Generated inputs are deterministic, so they are reused across runs and commits
+            path = listings_path(args.data_dir, n_rows)
+            if not path.exists():
+                write_listings_csv(path, n_rows, args.data)
+            res = bench_pipeline(path, args.model_dir, args.chunk_rows, args.backend, trace_memory=not args.no_memory,
+                                 compact=args.compact)
+            run["results"][size] = res
+            print(f"{n_rows:,} rows: {res['total_seconds']:.2f}s ({res['rows_per_sec']:,.0f} rows/sec)")
+            for stage in PIPELINE_STAGES:
+                peak = f"  peak {res[stage]['peak_mb']:.0f} MB" if "peak_mb" in res[stage] else ""
+                print(f"  {stage:>7}: {res[stage]['seconds']:.2f}s  {res[stage]['rows_out']:,} rows{peak}")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(run, f, indent=2)
+        if args.compare:
+            with open(args.compare) as f:
+                for size, ratios in compare_runs(json.load(f), run).items():
+                    print(f"{size} vs baseline: " + "  ".join(f"{k} {v:.2f}x" for k, v in ratios.items()))
+        sys.exit(0)
+
+    if args.benchmark == "coldstart":
+        results = bench_cold_start(args.pickle_dir, args.model_dir, repeats=max(args.repeats, 3))
+        print(f"Four pickles: {results['pickles']['load_ms']:.1f} ms")
+        print(f"Bundle:       {results['bundle']['load_ms']:.1f} ms")
+        print(f"Bundle, NumPy backend: {results['bundle_numpy']['load_ms']:.1f} ms")
+        print(f"Bundle without booster: {results['bundle_encode_only']['load_ms']:.1f} ms")
+        print(f"Speedup: {results['speedup']:.1f}x")
+        sys.exit(0)
+
+    if args.benchmark == "encodings":
+        results = bench_encodings(pd.read_csv(args.data), n_predict_rows=args.rows, num_threads=args.num_threads)
+        for mode in ("onehot", "native"):
+            res = results[mode]
+            print(f"{mode:>6}: {res['n_features']} features  train {res['train_seconds']:.2f}s  "
+                  f"predict {res['predict_rows_per_sec']:,.0f} rows/sec  accuracy {res['accuracy']:.4f}")
+        sys.exit(0)
+
+    if args.benchmark == "parsers":
+        df = generate_listings(args.rows, args.data)
+        print(f"Rows: {len(df):,} (with injected dirty values)")
+        for field, res in bench_parsers(df, repeats=args.repeats).items():
+            print(f"{field:>16}: chain {res['chain_seconds']:.3f}s  parser {res['parser_seconds']:.3f}s  "
+                  f"{res['speedup']:.1f}x  ({res['distinct_values']:,} distinct)  identical: {res['identical']}")
+        sys.exit(0)
+
+    df = bootstrap_dataset(args.data, args.rows)
+    print(f"Rows: {len(df):,}")
+
+    if args.benchmark == "cleaning":
+        results = bench_cleaning(df, repeats=args.repeats)
+        for mode in ("row_wise", "vectorized"):
+            print(f"{mode:>10}: {results[mode]['seconds']:.2f}s  ({results[mode]['rows_per_sec']:,.0f} rows/sec)")
+        print(f"Speedup: {results['speedup']:.1f}x")
+        print(f"Identical output: {results['identical']}")
+
+    elif args.benchmark == "ingest":
+        results = bench_ingest(df, repeats=args.repeats)
+        for name, res in results.items():
+            same = f"  identical after cleaning: {res['identical']}" if "identical" in res else ""
+            print(f"{name:>13}: {res['seconds']:.2f}s  ({res['rows_per_sec']:,.0f} rows/sec)  "
+                  f"peak {res['peak_mb']:.0f} MB  frame {res['frame_mb']:.0f} MB{same}")
+
+    elif args.benchmark == "sparse":
+        results = bench_sparse(df, args.model_dir)
+        for mode in ("dense", "sparse"):
+            res = results[mode]
+            print(f"{mode:>6}: encode {res['encode_seconds']:.2f}s  predict {res['predict_seconds']:.2f}s  "
+                  f"peak {res['peak_encode_mb']:.0f} MB  model input {res['input_mb']:.0f} MB")
+        print(f"Identical predictions: {results['identical']}")
+
+    elif args.benchmark == "backends":
+        results = bench_backends(df, args.model_dir)
+        for n, res in results.items():
+            if n != "max_abs_diff":
+                print(f"{n:>5} rows: lightgbm {res['lightgbm']:.2f} ms  numpy {res['numpy']:.2f} ms  "
+                      f"speedup {res['speedup']:.1f}x")
+        print(f"Max probability difference: {results['max_abs_diff']:.2e}")
+
+    elif args.benchmark == "serve":
+        results = bench_serve(df, args.model_dir)
+        for max_batch_size, res in results.items():
+            print(f"max_batch_size={max_batch_size:<3} {res['requests_per_sec']:,.0f} req/sec  "
+                  f"p50 {res['p50_ms']:.1f} ms  p95 {res['p95_ms']:.1f} ms  p99 {res['p99_ms']:.1f} ms  "
+                  f"mean batch {res['mean_batch_rows']:.1f} rows  errors {res['errors']}")
+
+    elif args.benchmark == "parallel":
+        results = bench_parallel(df, args.model_dir, args.n_jobs, args.num_threads)
+        for n_jobs, res in results.items():
+            print(f"n_jobs={n_jobs:<3} {res['seconds']:.2f}s  ({res['rows_per_sec']:,.0f} rows/sec)  "
+                  f"speedup {res['speedup']:.2f}x  identical: {res['identical']}")
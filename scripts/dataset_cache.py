@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+
+# Bump to invalidate every cache entry when the cached layout or semantics change
+PIPELINE_VERSION = 1
+
+# Modules whose source is part of the cache key: editing them invalidates entries automatically
+PIPELINE_MODULES = ("ingest.py", "parsers.py", "Data_Cleaning_Pipeline.py", "Data_Encoding_Pipeline.py")
+
+META = "meta.json"
+
+
+def _file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def pipeline_fingerprint() -> str:
+    """Hash of PIPELINE_VERSION and the ingest/cleaning/encoding module sources."""
+    h = hashlib.sha256(str(PIPELINE_VERSION).encode())
+    here = Path(__file__).parent
+    for name in PIPELINE_MODULES:
+        h.update((here / name).read_bytes())
+    return h.hexdigest()
+
+
+def _category_schema(df: pd.DataFrame) -> dict:
+    """Categories of each category column; Parquet does not round-trip every category dtype."""
+    return {
+        col: {
+            "dtype": df[col].cat.categories.dtype.name,
+            "values": df[col].cat.categories.tolist(),
+            "ordered": bool(df[col].cat.ordered),
+        }
+        for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)
+    }
+
+
+def _restore_categories(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    for col, c in schema.items():
+        dtype = pd.CategoricalDtype(pd.Index(c["values"], dtype=c["dtype"]), ordered=c["ordered"])
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+class DatasetCache:
+    """
+    Content-addressed on-disk cache of cleaned and encoded training data.
+
+    Entries are keyed by the SHA-256 of the raw input file, the pipeline
+    fingerprint (PIPELINE_VERSION plus the ingest/cleaning/encoding source) and any
+    extra parameters that change the output (e.g. the encoding mode). Each
+    entry is a directory holding:
+    - cleaned.parquet: output of the cleaning pipeline (category dtypes restored on read)
+    - encoded.parquet: output of `EncodingPipeline.transform`
+    - artifacts.pkl: fitted objects needed alongside the data (cleaning state, encoder)
+    - meta.json: key inputs, category schema, sizes and last access time
+
+    After every write, least recently used entries are removed until the
+    cache fits in `max_bytes`; the entry just written is always kept.
+    """
+
+    def __init__(self, cache_dir: str = "../.cache/datasets", max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def key(self, input_path: str, **params) -> str:
+        """Cache key for a raw input file and the parameters that affect the cached output."""
+        parts = {
+            "input_sha256": _file_sha256(input_path),
+            "pipeline": pipeline_fingerprint(),
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Load a cached entry.
+
+        Returns:
+            Dict with 'cleaned' and 'encoded' DataFrames and 'artifacts', or None on a miss
+        """
+        entry = self.cache_dir / key
+        try:
+            with open(entry / META) as f:
+                meta = json.load(f)
+            cleaned = _restore_categories(pd.read_parquet(entry / "cleaned.parquet"), meta["categories"])
+            encoded = pd.read_parquet(entry / "encoded.parquet")
+            with open(entry / "artifacts.pkl", "rb") as f:
+                artifacts = pickle.load(f)
+        except (FileNotFoundError, OSError, ValueError):    # missing, partly evicted or unreadable
+            return None
+
+        os.utime(entry / META)    # record the access for LRU eviction
+        return {"cleaned": cleaned, "encoded": encoded, "artifacts": artifacts}
+
+    def put(self, key: str, cleaned: pd.DataFrame, encoded: pd.DataFrame, artifacts: dict,
+            meta: Optional[dict] = None) -> Path:
+        """Write an entry atomically, then evict old entries down to the size budget."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self.cache_dir / key
+        tmp = self.cache_dir / f".{key}.tmp-{uuid.uuid4().hex[:8]}"
+        tmp.mkdir()
+
+        cleaned.to_parquet(tmp / "cleaned.parquet", index=False)
+        encoded.to_parquet(tmp / "encoded.parquet", index=False)
+        with open(tmp / "artifacts.pkl", "wb") as f:
+            pickle.dump(artifacts, f)
+        info = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "rows": len(cleaned),
+            "categories": _category_schema(cleaned),
+            "bytes": sum(p.stat().st_size for p in tmp.iterdir()),
+            **(meta or {}),
+        }
+        with open(tmp / META, "w") as f:
+            json.dump(info, f, indent=2, default=str)
+
+        if entry.exists():
+            shutil.rmtree(entry)
+        os.replace(tmp, entry)
+        self.evict(keep=key)
+        return entry
+
+    def entries(self) -> list:
+        """(last access time, bytes, path) of every complete entry, oldest first."""
+        found = []
+        for entry in self.cache_dir.glob("*"):
+            meta_path = entry / META
+            if entry.name.startswith(".") or not meta_path.exists():
+                continue
+            size = sum(p.stat().st_size for p in entry.iterdir())
+            found.append((meta_path.stat().st_mtime, size, entry))
+        return sorted(found)
+
+    def evict(self, keep: Optional[str] = None) -> list:
+        """Remove least recently used entries until the cache fits in `max_bytes`; returns removed keys."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed.append(entry.name)
+        return removed
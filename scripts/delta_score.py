@@ -0,0 +1,197 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from ingest import read_listings
+from model_run import RunModel
+from prediction_cache import listing_fingerprints
+
+
+ID_COLUMN = "MLS#"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    mls TEXT PRIMARY KEY,
+    fingerprint INTEGER NOT NULL,
+    prediction TEXT,
+    bundle_id TEXT NOT NULL,
+    scored_at TEXT NOT NULL
+)
+"""
+
+
+class ListingIndex:
+    """
+    Persistent MLS# -> (fingerprint, last prediction) index in a SQLite file.
+
+    Fingerprints are `listing_fingerprints` of the model-relevant fields, stored
+    as signed 64-bit integers. A NULL prediction records a listing that
+    cleaning removed, so it is not re-cleaned either while it stays unchanged.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def load(self) -> pd.DataFrame:
+        """Whole index as a DataFrame indexed by MLS#."""
+        return pd.read_sql("SELECT mls, fingerprint, prediction, bundle_id FROM listings", self.conn,
+                           index_col="mls")
+
+    def upsert(self, mls, fingerprints: np.ndarray, predictions, bundle_id: str):
+        scored_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        rows = zip(mls, fingerprints.view(np.int64).tolist(), predictions)
+        self.conn.executemany(
+            "INSERT INTO listings (mls, fingerprint, prediction, bundle_id, scored_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(mls) DO UPDATE SET fingerprint = excluded.fingerprint, "
+            "prediction = excluded.prediction, bundle_id = excluded.bundle_id, scored_at = excluded.scored_at",
+            ((m, f, p, bundle_id, scored_at) for m, f, p in rows),
+        )
+        self.conn.commit()
+
+    def remove_missing(self, seen) -> int:
+        """Delete listings not in `seen` (withdrawn from the export); returns how many were removed."""
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (mls TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM seen")
+            self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((m,) for m in seen))
+            removed = self.conn.execute("DELETE FROM listings WHERE mls NOT IN (SELECT mls FROM seen)").rowcount
+        return removed
+
+
+def score_delta(input_path: str, output_path: str, index_path: str = "../.cache/listings.sqlite",
+                model_dir: str = "../pickle/model_bundle", chunksize: int = 50_000, backend: str = "lightgbm",
+                compact: bool = False, model_columns: bool = False, prune: bool = True) -> dict:
+    """
+    Score a full MLS export, re-running the pipeline only for new or changed listings.
+
+    Each listing's fingerprint is compared with the index. Listings that are
+    unchanged and were scored by the same bundle reuse their stored prediction;
+    the rest (new MLS#, changed model fields, another bundle, or no MLS#) go
+    through cleaning, encoding and prediction and are written back to the index.
+    The output holds every surviving row in input order, exactly as
+    `score.score_csv` would write it.
+
+    Args:
+        input_path: Full raw MLS export with an 'MLS#' column
+        output_path: CSV to write; scored rows keep their raw columns plus 'Predicted Type'
+        index_path: SQLite file holding the listing index (created if missing)
+        model_dir: Model bundle directory
+        chunksize: Number of raw rows read per chunk
+        backend: 'lightgbm' or 'numpy'
+        compact: Int32 cleaning and a single float32 model-input array (see RunModel)
+        model_columns: Parse and write only 'MLS#' and the columns the model uses
+        prune: Remove listings missing from this export from the index
+
+    Returns:
+        Summary dict with row counts (new, changed, unchanged, rescored, scored,
+        dropped), listings removed from the index, elapsed seconds and rows/sec
+    """
+    runner = RunModel(model_dir, backend=backend, compact=compact)
+    if runner.cleaning_state is None:
+        # Per-batch statistics would make stored predictions depend on the batch they came from
+        raise ValueError(f"delta scoring needs a frozen cleaning state; {model_dir} has none")
+    bundle_id = runner.bundle.bundle_id
+    index = ListingIndex(index_path)
+    known = index.load()
+    known_fingerprints = known["fingerprint"].to_numpy(dtype=np.int64)
+    known_predictions = known["prediction"].to_numpy(dtype=object)
+    known_bundles = known["bundle_id"].to_numpy(dtype=object)
+    output_path = Path(output_path)
+    output_path.unlink(missing_ok=True)
+
+    counts = dict.fromkeys(("rows_read", "rows_new", "rows_changed", "rows_unchanged", "rows_scored"), 0)
+    seen = set()
+    start = time.perf_counter()
+    chunks = read_listings(input_path, chunksize=chunksize, extra_columns=(ID_COLUMN,),
+                           all_columns=not model_columns)
+    for i, chunk in enumerate(chunks):
+        if ID_COLUMN not in chunk.columns:
+            raise ValueError(f"{input_path} has no '{ID_COLUMN}' column to key listings by")
+        mls = chunk[ID_COLUMN].astype(str).str.strip().where(chunk[ID_COLUMN].notna(), None)
+        fingerprints = listing_fingerprints(chunk)
+
+        # Position of each listing in the index, -1 for listings it has not seen
+        position = known.index.get_indexer(mls.fillna(""))
+        is_new = position < 0
+        unchanged = np.zeros(len(chunk), dtype=bool)
+        found = np.flatnonzero(~is_new)
+        unchanged[found] = (
+            (known_fingerprints[position[found]] == fingerprints.view(np.int64)[found])
+            & (known_bundles[position[found]] == bundle_id)
+        )
+
+        labels = np.empty(len(chunk), dtype=object)
+        labels[unchanged] = known_predictions[position[unchanged]]
+        todo = np.flatnonzero(~unchanged)
+        if len(todo):
+            scored = runner.score(chunk.iloc[todo])
+            computed = pd.Series(None, index=chunk.index[todo], dtype=object)
+            computed[scored.index] = scored["Predicted Type"].to_numpy()
+            labels[todo] = computed.to_numpy()
+            keyed = mls.iloc[todo].notna().to_numpy()
+            index.upsert(mls.iloc[todo][keyed], fingerprints[todo][keyed], computed.to_numpy()[keyed], bundle_id)
+
+        keep = np.flatnonzero(pd.notna(labels))
+        result = chunk.iloc[keep].copy()
+        result["Predicted Type"] = labels[keep]
+        result.to_csv(output_path, mode="a", header=i == 0, index=False)
+
+        seen.update(mls.dropna())
+        counts["rows_read"] += len(chunk)
+        counts["rows_new"] += int(is_new.sum())
+        counts["rows_changed"] += int((~is_new & ~unchanged).sum())
+        counts["rows_unchanged"] += int(unchanged.sum())
+        counts["rows_scored"] += len(result)
+
+    removed = index.remove_missing(seen) if prune else 0
+    elapsed = time.perf_counter() - start
+    index.close()
+    runner.close()
+
+    return {
+        **counts,
+        "rows_rescored": counts["rows_new"] + counts["rows_changed"],
+        "rows_dropped": counts["rows_read"] - counts["rows_scored"],
+        "removed_from_index": removed,
+        "seconds": elapsed,
+        "rows_per_sec": counts["rows_read"] / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score an MLS export, re-scoring only new or changed listings")
+    parser.add_argument("input", help="Full raw MLS export with an MLS# column")
+    parser.add_argument("output", help="Destination CSV for predictions")
+    parser.add_argument("--index", default="../.cache/listings.sqlite", help="SQLite listing index")
+    parser.add_argument("--model-dir", default="../pickle/model_bundle", help="Model bundle directory")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Rows per chunk")
+    parser.add_argument("--backend", choices=["lightgbm", "numpy"], default="lightgbm", help="Prediction backend")
+    parser.add_argument("--compact", action="store_true", help="Encode into one float32 array (less memory)")
+    parser.add_argument("--model-columns", action="store_true",
+                        help="Read and write only MLS# and the model's input columns")
+    parser.add_argument("--keep-missing", action="store_true",
+                        help="Keep listings absent from this export in the index")
+    args = parser.parse_args()
+
+    summary = score_delta(args.input, args.output, args.index, args.model_dir, args.chunksize, args.backend,
+                          args.compact, args.model_columns, prune=not args.keep_missing)
+    print(f"Rows read:      {summary['rows_read']:,}")
+    print(f"New / changed:  {summary['rows_new']:,} / {summary['rows_changed']:,} (re-scored)")
+    print(f"Unchanged:      {summary['rows_unchanged']:,} (from the index)")
+    print(f"Rows scored:    {summary['rows_scored']:,}")
+    print(f"Removed:        {summary['removed_from_index']:,} listings no longer in the export")
+    print(f"Elapsed:        {summary['seconds']:.2f}s ({summary['rows_per_sec']:,.0f} rows/sec)")
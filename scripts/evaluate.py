@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from lightgbm import LGBMClassifier
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, confusion_matrix, f1_score
+from model_bundle import ModelBundle
+from tune import FOLD_META, build_folds
+
+
+def _class_metrics(matrix: np.ndarray, classes: list) -> dict:
+    """Precision, recall, F1 and support per class from a confusion matrix (rows: true, columns: predicted)."""
+    tp = np.diag(matrix).astype(float)
+    predicted, actual = matrix.sum(axis=0), matrix.sum(axis=1)
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, actual, out=np.zeros_like(tp), where=actual > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(tp),
+                   where=precision + recall > 0)
+    return {
+        cls: {"precision": float(p), "recall": float(r), "f1": float(f), "support": int(n)}
+        for cls, p, r, f, n in zip(classes, precision, recall, f1, actual)
+    }
+
+
+def evaluate_fold(fold_dir: str, k: int, params: dict, num_threads: int) -> dict:
+    """
+    Train on one cached fold, score its held-out rows and measure both.
+
+    The fold's matrices are memory-mapped from `tune.build_folds` output, so
+    no cleaning or encoding runs here.
+
+    Returns:
+        Dict with the fold's accuracy, balanced accuracy, macro F1, per-class
+        precision/recall/F1/support, confusion matrix and train/score timings
+    """
+    with open(Path(fold_dir) / FOLD_META) as f:
+        info = json.load(f)["folds"][k]
+    arrays = {
+        name: np.load(Path(fold_dir) / f"fold{k}_{name}.npy", mmap_mode="r")
+        for name in ("X_train", "y_train", "X_valid", "y_valid")
+    }
+    classes = info["classes"]
+    labels = np.arange(len(classes))
+
+    model = LGBMClassifier(**{**params, "n_jobs": num_threads, "verbose": -1})
+    start = time.perf_counter()
+    # Column positions, not names: the held-out matrix is scored as a plain array too
+    model.fit(arrays["X_train"], arrays["y_train"], categorical_feature=info["categorical"] or "auto")
+    train_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pred = model.predict(arrays["X_valid"])
+    score_seconds = time.perf_counter() - start
+
+    y_valid = np.asarray(arrays["y_valid"])
+    matrix = confusion_matrix(y_valid, pred, labels=labels)
+    return {
+        "fold": k,
+        "train_rows": info["train_rows"],
+        "valid_rows": info["valid_rows"],
+        "accuracy": float(accuracy_score(y_valid, pred)),
+        "balanced_accuracy": float(balanced_accuracy_score(y_valid, pred)),
+        "macro_f1": float(f1_score(y_valid, pred, labels=labels, average="macro", zero_division=0)),
+        "per_class": _class_metrics(matrix, classes),
+        "confusion_matrix": matrix.tolist(),
+        "train_seconds": train_seconds,
+        "train_rows_per_sec": info["train_rows"] / train_seconds if train_seconds > 0 else 0.0,
+        "score_seconds": score_seconds,
+        "score_rows_per_sec": info["valid_rows"] / score_seconds if score_seconds > 0 else 0.0,
+    }
+
+
+def evaluate(data_path: str, params: dict, n_folds: int = 5, n_jobs: int = 1, encoding: str = "onehot",
+             cache_dir: str = "../.cache/tune", seed: int = 42, csv_engine: str = "c") -> dict:
+    """
+    Stratified k-fold evaluation of LightGBM with the full cleaning and encoding pipeline.
+
+    Folds come from `tune.build_folds`: each fold fits `CleaningState` and
+    `EncodingPipeline` on its training rows only, and the encoded matrices are
+    cached, so repeated evaluations (and tuning runs on the same split) skip
+    the pipeline entirely. Folds are then trained and scored in parallel
+    worker processes, each with `cpu_count // n_jobs` LightGBM threads.
+
+    Args:
+        data_path: Labelled raw MLS CSV
+        params: LGBMClassifier parameters
+        n_folds: Cross-validation folds
+        n_jobs: Worker processes (at most one per fold)
+        encoding: 'onehot' or 'native'
+        cache_dir: Directory for cached fold encodings (shared with tune.py)
+        seed: Seed for the fold split
+        csv_engine: CSV parser passed to `read_listings`
+
+    Returns:
+        Dict with the settings, per-fold results (see `evaluate_fold`), the
+        confusion matrix and per-class metrics pooled over all folds, the
+        mean and standard deviation of each fold metric, and timings
+    """
+    start = time.perf_counter()
+    fold_dir = build_folds(data_path, cache_dir, n_folds, encoding, seed, csv_engine)
+    fold_seconds = time.perf_counter() - start
+
+    n_jobs = max(1, min(n_jobs, n_folds))
+    num_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+    start = time.perf_counter()
+    if n_jobs == 1:
+        folds = [evaluate_fold(str(fold_dir), k, params, num_threads) for k in range(n_folds)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            folds = list(pool.map(evaluate_fold, [str(fold_dir)] * n_folds, range(n_folds),
+                                  [params] * n_folds, [num_threads] * n_folds))
+    eval_seconds = time.perf_counter() - start
+
+    with open(fold_dir / FOLD_META) as f:
+        classes = json.load(f)["folds"][0]["classes"]
+    pooled = np.sum([fold["confusion_matrix"] for fold in folds], axis=0)
+    summary = {}
+    for metric in ("accuracy", "balanced_accuracy", "macro_f1", "train_rows_per_sec", "score_rows_per_sec"):
+        values = [fold[metric] for fold in folds]
+        summary[metric] = {"mean": float(np.mean(values)), "std": float(np.std(values))}
+
+    return {
+        "input": str(data_path),
+        "encoding": encoding,
+        "n_folds": n_folds,
+        "seed": seed,
+        "params": params,
+        "classes": classes,
+        "folds": folds,
+        "summary": summary,
+        "pooled": {
+            "accuracy": float(np.trace(pooled) / pooled.sum()),
+            "per_class": _class_metrics(pooled, classes),
+            "confusion_matrix": pooled.tolist(),
+        },
+        "fold_dir": str(fold_dir),
+        "fold_seconds": fold_seconds,
+        "eval_seconds": eval_seconds,
+        "completed": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stratified k-fold evaluation with per-class metrics")
+    parser.add_argument("--data", default="../sample_data/raw_minus_sample.csv", help="Labelled raw MLS CSV")
+    parser.add_argument("--params", choices=["pickle", "tuned"], default="pickle",
+                        help="Hyperparameters from pickle/model.pkl, or with the best params tune.py recorded")
+    parser.add_argument("--bundle-dir", default="../pickle/model_bundle", help="Bundle holding tuned params")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--encoding", choices=["onehot", "native"], default="onehot", help="Categorical encoding")
+    parser.add_argument("--cache-dir", default="../.cache/tune", help="Cached fold encodings")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the fold split")
+    parser.add_argument("--output", default=None, help="Write the JSON result here instead of stdout")
+    args = parser.parse_args()
+
+    # Same hyperparameters model_train.py would use
+    with open("../pickle/model.pkl", "rb") as f:
+        params = pickle.load(f).get_params()
+    if args.params == "tuned":
+        params.update(ModelBundle(args.bundle_dir).tuned_params)
+
+    result = evaluate(args.data, params, args.folds, args.n_jobs, args.encoding, args.cache_dir, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Accuracy {result['summary']['accuracy']['mean']:.4f} "
+              f"(± {result['summary']['accuracy']['std']:.4f}) over {args.folds} folds; "
+              f"result written to {args.output}")
+    else:
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,208 @@
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from model_bundle import ModelBundle
+from model_run import RunModel
+from prediction_cache import PredictionCache, listing_fingerprints
+
+
+# Per-process runner and explainer, set once by the pool initializer
+_WORKER = {}
+
+
+class ContributionExplainer:
+    """
+    Exact TreeSHAP contributions of a bundle's booster, per source feature.
+
+    LightGBM computes the SHAP values itself (`predict(pred_contrib=True)`),
+    batched over the whole encoded matrix. One-hot columns such as
+    'city_portland' are summed back into their source feature ('city'), so a
+    listing's reasons name the fields of the listing rather than encoder columns.
+
+    Args:
+        bundle: Model bundle whose booster and feature names are explained
+        num_threads: LightGBM threads per call (default: LightGBM's own default)
+    """
+
+    def __init__(self, bundle: ModelBundle, num_threads: Optional[int] = None):
+        self.bundle = bundle
+        self.num_threads = num_threads
+        names = bundle.feature_names
+        cat_cols = bundle.metadata["cat_cols"] if bundle.encoding == "onehot" else []
+        sources = []
+        for name in names:
+            # Longest prefix wins, so 'zip_prefix_group_other' is not read as a 'zip_code' level
+            owners = [col for col in cat_cols if name.startswith(col + "_")]
+            sources.append(max(owners, key=len) if owners else name)
+        self.source_features: List[str] = list(dict.fromkeys(sources))
+        # Feature -> source indicator; contributions @ this sums each one-hot block
+        self._collapse = np.zeros((len(names), len(self.source_features)), dtype=np.float64)
+        self._collapse[np.arange(len(names)), [self.source_features.index(s) for s in sources]] = 1.0
+
+    def contributions(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        SHAP values of aligned model input, collapsed to source features.
+
+        Returns:
+            Tuple of (contributions of shape (n_rows, n_classes, n_sources), expected
+            values of shape (n_rows, n_classes)); the raw score of each class is
+            their sum. Binary models get both classes, class 0 as the negation
+        """
+        n_features = len(self.bundle.feature_names)
+        kwargs = {} if self.num_threads is None else {"num_threads": self.num_threads}
+        raw = np.asarray(self.bundle.booster.predict(X, pred_contrib=True, **kwargs))
+        raw = raw.reshape(raw.shape[0], -1, n_features + 1)
+        if raw.shape[1] == 1:
+            raw = np.concatenate([-raw, raw], axis=1)
+        return raw[..., :n_features] @ self._collapse, raw[..., n_features]
+
+    def top_reasons(self, X, top_k: int = 3) -> List[List[Tuple[str, float]]]:
+        """
+        The features that pushed each row most towards its predicted class.
+
+        Returns:
+            One list per row of up to `top_k` (source feature, contribution) pairs,
+            largest first; only features that raised the predicted class's score count
+        """
+        if X.shape[0] == 0:
+            return []
+        contrib, bias = self.contributions(X)
+        predicted = (contrib.sum(axis=2) + bias).argmax(axis=1)
+        scores = contrib[np.arange(len(predicted)), predicted]
+        top_k = min(top_k, scores.shape[1])
+        order = np.argsort(-scores, axis=1)[:, :top_k]
+        return [
+            [(self.source_features[j], round(float(row[j]), 4)) for j in idx if row[j] > 0]
+            for row, idx in zip(scores, order)
+        ]
+
+
+def format_reasons(reasons) -> Optional[str]:
+    """One-line text of a row's reasons, e.g. 'city (+0.84), approx_sqft (+0.51)'; None stays None."""
+    if reasons is None:
+        return None
+    return ", ".join(f"{feature} ({value:+.2f})" for feature, value in reasons)
+
+
+def _init_worker(model_dir: str, num_threads: Optional[int]):
+    runner = RunModel(model_dir, compact=True)
+    _WORKER["runner"] = runner
+    _WORKER["explainer"] = ContributionExplainer(runner.bundle, num_threads=num_threads)
+
+
+def _explain_rows(data: pd.DataFrame, top_k: int) -> np.ndarray:
+    """Clean, encode and explain raw rows inside a worker; None for rows removed during cleaning."""
+    runner = _WORKER["runner"]
+    X = runner.preprocess(data)
+    reasons = np.empty(len(data), dtype=object)
+    explained = _WORKER["explainer"].top_reasons(X, top_k)
+    for row_id, row_reasons in zip(runner.row_ids, explained):
+        reasons[row_id] = row_reasons
+    return reasons
+
+
+class ExplanationService:
+    """
+    Top-k prediction reasons computed in background worker processes.
+
+    `submit` returns at once with a Future, so callers keep scoring while
+    explanations are computed. Workers clean and encode the rows themselves
+    (compact float32 arrays) and run batched TreeSHAP through
+    `ContributionExplainer`. Results are cached per listing fingerprint like
+    predictions are (see `prediction_cache.PredictionCache`), so a listing
+    seen before is answered without reaching a worker.
+
+    TreeSHAP costs far more than prediction (milliseconds per row rather
+    than microseconds), so request explanations for the rows you show or
+    export, not for every row scored.
+
+    Args:
+        model_dir: Model bundle directory
+        top_k: Reasons kept per listing
+        n_workers: Worker processes
+        num_threads: LightGBM threads per worker (default 1, workers are the parallelism)
+        cache: Size of the explanation cache, or a PredictionCache to use; 0 or None
+            disables it. Needs a bundle with a frozen cleaning state
+        mp_context: multiprocessing context for the workers (default: the platform's);
+            pass `multiprocessing.get_context("spawn")` from multi-threaded hosts such
+            as a web server, where forking can copy locks held by other threads
+    """
+
+    def __init__(self, model_dir: str = "../pickle/model_bundle", top_k: int = 3, n_workers: int = 1,
+                 num_threads: Optional[int] = 1, cache: Union[int, PredictionCache, None] = 100_000,
+                 mp_context: Optional[BaseContext] = None):
+        self.bundle = ModelBundle(model_dir)
+        self.top_k = top_k
+        if isinstance(cache, int):
+            cache = PredictionCache(cache) if cache > 0 else None
+        if cache is not None and self.bundle.cleaning_state is None:
+            # Per-batch statistics make a row's explanation depend on its batch
+            raise ValueError(f"explanation caching needs a frozen cleaning state; {model_dir} has none")
+        self.cache = cache
+        self._pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=mp_context, initializer=_init_worker,
+                                         initargs=(model_dir, num_threads))
+        self._lock = threading.Lock()
+        self.rows_explained = 0
+
+    def close(self):
+        """Shut down the workers, waiting for explanations already submitted."""
+        self._pool.shutdown()
+
+    def submit(self, data: pd.DataFrame) -> Future:
+        """
+        Queue raw listing rows for explanation.
+
+        Returns:
+            Future resolving to an object array with one entry per row of `data`:
+            a list of (source feature, contribution) pairs, or None for rows
+            removed during cleaning
+        """
+        result = Future()
+        if self.cache is None:
+            work = self._pool.submit(_explain_rows, data, self.top_k)
+            work.add_done_callback(lambda done: self._finish(done, result, len(data)))
+            return result
+
+        bundle_id = self.bundle.bundle_id
+        keys = listing_fingerprints(data)
+        reasons, missed = self.cache.lookup(keys, bundle_id)
+        if not len(missed):
+            result.set_result(reasons)
+            return result
+
+        # Repeats within the batch are explained once
+        miss_keys, first, inverse = np.unique(keys[missed], return_index=True, return_inverse=True)
+        work = self._pool.submit(_explain_rows, data.iloc[missed[first]], self.top_k)
+
+        def merge(computed: np.ndarray) -> np.ndarray:
+            self.cache.store(miss_keys, computed, bundle_id)
+            reasons[missed] = computed[inverse]
+            return reasons
+
+        work.add_done_callback(lambda done: self._finish(done, result, len(first), merge))
+        return result
+
+    def _finish(self, work: Future, result: Future, rows: int, merge=None):
+        """Pass a worker's result (or error) on to the caller's future."""
+        if work.exception() is not None:
+            result.set_exception(work.exception())
+            return
+        with self._lock:
+            self.rows_explained += rows
+        computed = work.result()
+        result.set_result(merge(computed) if merge is not None else computed)
+
+    def explain(self, data: pd.DataFrame) -> np.ndarray:
+        """Blocking form of `submit`."""
+        return self.submit(data).result()
+
+    def stats(self) -> dict:
+        """Rows sent to the workers, plus cache statistics when the cache is on."""
+        stats = {"rows_explained": self.rows_explained}
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
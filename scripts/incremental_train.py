@@ -0,0 +1,199 @@
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.model_selection import train_test_split
+from Data_Cleaning_Pipeline import CleaningState
+from Data_Encoding_Pipeline import EncodingPipeline
+from ingest import read_listings
+from model_bundle import ModelBundle
+from model_run import ROW_ID
+
+
+def unseen_categories(bundle: ModelBundle, cleaned: pd.DataFrame, top: int = 10) -> dict:
+    """
+    Categorical values in `cleaned` that the bundle's fixed vocabulary does not know.
+
+    One-hot bundles encode them as all-zero rows and native bundles as missing,
+    so a growing share here is the signal that a full refit is due.
+
+    Returns:
+        {column: {"rows": count, "share": fraction of rows, "values": {value: count}}}
+        for every categorical column with at least one unseen value
+    """
+    if bundle.encoding == "native":
+        vocab = bundle.native_categories
+    else:
+        vocab = {col: pd.Index(cats) for col, cats in zip(bundle.metadata["cat_cols"], bundle.ohe.categories_)}
+
+    drift = {}
+    for col, known in vocab.items():
+        if col not in cleaned.columns:
+            continue
+        values = cleaned[col].dropna()
+        unseen = values[~values.isin(known)]
+        if len(unseen):
+            counts = unseen.astype(str).value_counts()
+            drift[col] = {
+                "rows": int(len(unseen)),
+                "share": len(unseen) / max(len(cleaned), 1),
+                "values": {k: int(v) for k, v in counts.head(top).items()},
+            }
+    return drift
+
+
+def _accuracy(model_or_bundle, X, y) -> float:
+    return float((np.asarray(model_or_bundle.predict(X)) == np.asarray(y)).mean()) if len(y) else float("nan")
+
+
+def _full_refit(history: pd.DataFrame, new_train: pd.DataFrame, holdout_clean: pd.DataFrame,
+                bundle: ModelBundle) -> dict:
+    """Refit cleaning statistics, encoder and model from scratch on history plus the new rows."""
+    start = time.perf_counter()
+    cleaning_state = CleaningState()
+    cleaned = cleaning_state.fit_transform(pd.concat([history, new_train], ignore_index=True))
+    encoder = EncodingPipeline(verbose=False, native_categorical=bundle.encoding == "native")
+    encoded = encoder.fit(cleaned).transform(cleaned)
+    y = encoded.pop("property_type")
+    model = LGBMClassifier(**bundle.params)
+    fit_kwargs = {"categorical_feature": encoder.cat_cols_} if bundle.encoding == "native" else {}
+    model.fit(encoded, y, **fit_kwargs)
+    seconds = time.perf_counter() - start
+
+    X_hold = encoder.transform(holdout_clean)
+    y_hold = X_hold.pop("property_type")
+    return {
+        "seconds": seconds,
+        "rows": len(encoded),
+        "accuracy": _accuracy(model, X_hold.reindex(columns=encoded.columns), y_hold),
+    }
+
+
+def update_bundle(bundle_dir: str, new_path: str, out_dir: Optional[str] = None, n_new_trees: int = 50,
+                  holdout: float = 0.2, history_path: Optional[str] = None, csv_engine: str = "c",
+                  random_state: int = 42) -> dict:
+    """
+    Continue boosting an existing bundle's model on a new drop of listings.
+
+    The bundle's cleaning statistics, scaler, one-hot / native vocabulary and
+    label classes stay fixed, so the new trees see features encoded exactly as
+    the old ones did. Values outside the vocabulary are counted and reported,
+    not added. The new bundle records its parent bundle id and version, so a
+    chain of monthly updates can be traced back to the last full refit.
+
+    Args:
+        bundle_dir: Bundle to start from
+        new_path: Raw MLS CSV with the new, labelled listings
+        out_dir: Where to write the updated bundle (default: replace `bundle_dir`)
+        n_new_trees: Boosting rounds added on top of the existing trees
+        holdout: Share of the new rows kept out of training to measure accuracy
+        history_path: Raw CSV the bundle was trained on; when given, a full refit on
+            history plus the new rows is timed and scored for comparison
+        csv_engine: CSV parser passed to `read_listings`
+        random_state: Seed for the holdout split
+
+    Returns:
+        Report dict with row counts, trees, timings, holdout accuracy before and
+        after the update (and of the full refit), vocabulary drift and the new bundle id
+    """
+    bundle = ModelBundle(bundle_dir)
+    if bundle.cleaning_state is None:
+        raise ValueError(f"{bundle_dir} has no frozen cleaning state; retrain it in full before updating")
+    classes = list(bundle.label_encoder.classes_)
+
+    start = time.perf_counter()
+    raw = read_listings(new_path, engine=csv_engine)
+    # Row ids link holdout rows back to the raw file, so the full refit can leave them out too
+    cleaned = bundle.cleaning_state.transform(raw.assign(**{ROW_ID: np.arange(len(raw))}))
+    drift = unseen_categories(bundle, cleaned)
+
+    # Label classes are part of the fixed vocabulary too
+    known = cleaned["property_type"].astype(str).str.strip().str.lower().isin(classes)
+    dropped_labels = int((~known).sum())
+    cleaned = cleaned[known.to_numpy()].reset_index(drop=True)
+
+    train_clean, hold_clean = train_test_split(
+        cleaned, test_size=holdout, random_state=random_state, stratify=cleaned["property_type"]
+    ) if holdout > 0 else (cleaned, cleaned.iloc[:0])
+    holdout_ids = hold_clean.pop(ROW_ID).to_numpy()
+    train_clean = train_clean.drop(columns=ROW_ID)
+
+    encoder = bundle.build_encoder()
+    X_train = encoder.transform(train_clean)
+    y_train = X_train.pop("property_type")
+    missing_classes = sorted(set(range(len(classes))) - set(y_train))
+    if missing_classes:
+        raise ValueError(
+            f"New listings contain no '{[classes[i] for i in missing_classes]}' rows; "
+            "warm-starting needs every class, run a full refit instead"
+        )
+    X_train = bundle.align_features(X_train)
+    prepare_seconds = time.perf_counter() - start
+
+    X_hold = encoder.transform(hold_clean)
+    y_hold = X_hold.pop("property_type")
+    X_hold = bundle.align_features(X_hold)
+    accuracy_before = _accuracy(bundle, X_hold, y_hold)
+
+    start = time.perf_counter()
+    model = LGBMClassifier(**{**bundle.params, "n_estimators": n_new_trees})
+    fit_kwargs = {"categorical_feature": bundle.metadata["cat_cols"]} if bundle.encoding == "native" else {}
+    model.fit(X_train, y_train, init_model=bundle.booster, **fit_kwargs)
+    fit_seconds = time.perf_counter() - start
+
+    per_round = bundle.booster.num_model_per_iteration()
+    base_trees = bundle.booster.num_trees() // per_round
+    total_trees = model.booster_.num_trees() // per_round
+    parent = bundle.metadata.get("lineage", {})
+    lineage = {
+        "parent_bundle_id": bundle.bundle_id,
+        "version": parent.get("version", 0) + 1,
+        "last_full_refit": parent.get("last_full_refit", bundle.bundle_id),
+        "update": "warm_start",
+        "input": str(new_path),
+        "rows": len(X_train),
+        "base_trees": base_trees,
+        "added_trees": total_trees - base_trees,
+        "vocabulary": "fixed",
+        "unseen_categories": drift,
+    }
+    # Keep the original hyperparameters (not n_estimators=n_new_trees) and any tuning record for the next full refit
+    metadata = {"params": bundle.params, "lineage": lineage}
+    if "tuning" in bundle.metadata:
+        metadata["tuning"] = bundle.metadata["tuning"]
+    updated = ModelBundle.save(
+        out_dir or bundle_dir,
+        model,
+        encoder,
+        bundle.cleaning_state,
+        feature_names=bundle.feature_names,
+        dtypes=bundle.dtypes,
+        metadata=metadata,
+    )
+
+    report = {
+        "bundle_id": updated.bundle_id,
+        "parent_bundle_id": bundle.bundle_id,
+        "version": lineage["version"],
+        "new_rows": len(raw),
+        "train_rows": len(X_train),
+        "holdout_rows": len(X_hold),
+        "dropped_unknown_labels": dropped_labels,
+        "base_trees": base_trees,
+        "added_trees": lineage["added_trees"],
+        "prepare_seconds": prepare_seconds,
+        "fit_seconds": fit_seconds,
+        "seconds": prepare_seconds + fit_seconds,
+        "accuracy_before": accuracy_before,
+        "accuracy_after": _accuracy(updated, X_hold, y_hold),
+        "unseen_categories": drift,
+    }
+    if history_path is not None:
+        history = read_listings(history_path, engine=csv_engine)
+        full = _full_refit(history, raw.drop(index=holdout_ids), hold_clean, bundle)
+        report["full_refit"] = full
+        report["time_saved_seconds"] = full["seconds"] - report["seconds"]
+        report["speedup"] = full["seconds"] / report["seconds"]
+    return report
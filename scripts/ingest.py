@@ -0,0 +1,122 @@
+import warnings
+from typing import Iterator, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Raw MLS columns read by `clean_and_engineer_features`; the other export columns are dropped in its step 1.
+# Text fields stay strings: cleaning strips '$', ',' and '.00' itself, and 'BD'/'Area' can hold text such as '3 bd'.
+TEXT_COLUMNS = ("Type", "Prop. Cond.", "City", "Area", "BD", "List Price", "Price", "HOA Dues")
+# Numeric fields are parsed straight to float64; integer-like ones are cast to Int64 during cleaning.
+NUMERIC_COLUMNS = ("Zip", "Baths", "# Levels", "Apx Sqft", "DOM", "Yr. Built", "# Garage", "# Fireplaces")
+
+SCHEMA = {**{col: "object" for col in TEXT_COLUMNS}, **{col: "float64" for col in NUMERIC_COLUMNS}}
+MODEL_COLUMNS = tuple(SCHEMA)
+
+ENGINES = ("c", "pyarrow")
+
+
+def _header(source) -> list:
+    """Column names of a CSV file or seekable buffer, leaving buffers rewound."""
+    columns = pd.read_csv(source, nrows=0).columns.tolist()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return columns
+
+
+def _select(header: list, extra_columns: Sequence[str], all_columns: bool) -> list:
+    if all_columns:
+        return header
+    wanted = set(MODEL_COLUMNS) | set(extra_columns)
+    return [col for col in header if col in wanted]
+
+
+def _dtypes(usecols: list, typed_numeric: bool) -> dict:
+    """Declared dtypes for the selected schema columns; numeric ones are inferred when `typed_numeric` is off."""
+    return {
+        col: dtype for col, dtype in SCHEMA.items()
+        if col in usecols and (typed_numeric or col not in NUMERIC_COLUMNS)
+    }
+
+
+def _normalize_missing(df: pd.DataFrame, engine: str) -> pd.DataFrame:
+    """Use NaN for missing text, as the C parser does; the Arrow parser yields None."""
+    if engine == "pyarrow":
+        for col in df.columns:
+            if df[col].dtype == object:
+                values = df[col].to_numpy(copy=True)
+                values[pd.isna(values)] = np.nan
+                df[col] = values
+    return df
+
+
+def _read(source, usecols: list, engine: str, typed_numeric: bool, **kwargs):
+    return pd.read_csv(source, usecols=usecols, dtype=_dtypes(usecols, typed_numeric), engine=engine, **kwargs)
+
+
+def read_listings(source, engine: str = "c", chunksize: Optional[int] = None,
+                  extra_columns: Sequence[str] = (), all_columns: bool = False
+                  ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Read a raw MLS export with the declared schema.
+
+    Only the columns the cleaning pipeline uses are parsed (plus `extra_columns`),
+    text fields as strings and numeric fields directly as float64, so nothing is
+    spent on columns that cleaning throws away or on per-column type inference.
+    The result can be passed to `clean_and_engineer_features` unchanged.
+
+    A numeric column holding text (a hand-edited export) fails the float64 parse;
+    the read is then repeated with numeric types inferred, as plain `pd.read_csv` does.
+
+    Args:
+        source: Path or seekable file-like object (e.g. a Streamlit upload)
+        engine: 'c' (pandas' parser) or 'pyarrow' (multithreaded Arrow parser; whole-file reads only)
+        chunksize: Rows per chunk; when set, an iterator of DataFrames is returned
+        extra_columns: Further raw columns to keep, e.g. 'MLS#' or 'Address' to identify rows
+        all_columns: Keep every column of the file, e.g. to write rows back out unchanged; numeric
+            types are then inferred as plain `pd.read_csv` does, so integers are not written back as floats
+
+    Returns:
+        DataFrame, or an iterator of DataFrames when `chunksize` is set
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown CSV engine '{engine}' (expected one of {ENGINES})")
+    if chunksize is not None and engine != "c":
+        raise ValueError("Chunked reading needs the 'c' engine; the Arrow parser reads whole files")
+
+    usecols = _select(_header(source), extra_columns, all_columns)
+    if chunksize is not None:
+        return _iter_chunks(source, usecols, chunksize, typed_numeric=not all_columns)
+    if all_columns:
+        return _normalize_missing(_read(source, usecols, engine, typed_numeric=False), engine)
+
+    try:
+        return _normalize_missing(_read(source, usecols, engine, typed_numeric=True), engine)
+    except ValueError as exc:
+        warnings.warn(f"Numeric column holds text ({exc}); re-reading with inferred numeric types")
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return _normalize_missing(_read(source, usecols, engine, typed_numeric=False), engine)
+
+
+def _iter_chunks(source, usecols: list, chunksize: int, typed_numeric: bool = True) -> Iterator[pd.DataFrame]:
+    """Typed chunks; if a numeric column holds text, resume after the last good chunk with inferred types."""
+    rows_done = 0
+    try:
+        with _read(source, usecols, "c", typed_numeric=typed_numeric, chunksize=chunksize) as reader:
+            for chunk in reader:
+                rows_done += len(chunk)
+                yield chunk
+        return
+    except ValueError as exc:
+        warnings.warn(f"Numeric column holds text ({exc}); reading the rest with inferred numeric types")
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with _read(source, usecols, "c", typed_numeric=False, chunksize=chunksize,
+               skiprows=range(1, rows_done + 1)) as reader:
+        for chunk in reader:
+            # Keep the running index the typed reader would have produced
+            chunk.index += rows_done
+            yield chunk
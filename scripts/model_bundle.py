@@ -0,0 +1,407 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+import time
+import uuid
+from functools import cached_property
+from pathlib import Path
+from typing import Optional
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from scipy import sparse
+import sklearn
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder, StandardScaler
+from Data_Cleaning_Pipeline import CleaningState
+from Data_Encoding_Pipeline import EncodingPipeline
+from tree_engine import TreeEnsemble
+
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _json_safe(value):
+    """Convert numpy scalars and NaN into plain JSON values."""
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class ModelBundle:
+    """
+    Versioned, single-directory model bundle replacing the separate
+    `model_artifacts.pkl`, `ohe.pkl`, `scaler.pkl` and `label_encoder.pkl` files.
+
+    Layout:
+    - manifest.json: format version, bundle id, per-file SHA-256 checksums and
+      all small metadata (feature order, dtypes, classes, OHE or native categories, HOA medians)
+    - booster.txt: LightGBM model text
+    - scaler_mean.npy / scaler_scale.npy / scaler_var.npy: memory-mapped scaler statistics
+    - forest_*.npy: the booster flattened for the NumPy prediction backend (memory-mapped)
+
+    Only the manifest is read on construction; every other file is checked
+    against its checksum and loaded on first use. Because the encoder, scaler
+    and model are written together under one bundle id, a stale combination
+    cannot be loaded.
+    """
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = Path(path)
+        self.verify = verify
+        manifest_path = self.path / MANIFEST
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"Model bundle manifest not found: {manifest_path}")
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported bundle format {self.manifest.get('format_version')} "
+                f"(expected {FORMAT_VERSION}): {self.path}"
+            )
+        self.metadata = self.manifest["metadata"]
+
+    # ---------- file access ----------
+    def _mapped(self, name: str) -> mmap.mmap:
+        """
+        Map a bundle file read-only after checking it against the manifest.
+
+        The checksum is computed over the mapped bytes the component is then
+        loaded from, so each file is read from disk once.
+        """
+        if name not in self.manifest["files"]:
+            raise KeyError(f"'{name}' is not part of bundle {self.path}")
+        path = self.path / name
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.verify and hashlib.sha256(mapped).hexdigest() != self.manifest["files"][name]["sha256"]:
+            raise RuntimeError(f"Checksum mismatch for {path}; the bundle is corrupt or was modified")
+        return mapped
+
+    def _array(self, name: str) -> np.ndarray:
+        """Read-only array backed by the verified mapping of a .npy file."""
+        mapped = self._mapped(name)
+        version = np.lib.format.read_magic(mapped)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(mapped)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(mapped)
+        else:
+            raise ValueError(f"Unsupported .npy format {version} in {self.path / name}")
+        array = np.frombuffer(mapped, dtype=dtype, count=int(np.prod(shape)), offset=mapped.tell())
+        return array.reshape(shape, order="F" if fortran_order else "C")
+
+    # ---------- metadata ----------
+    @property
+    def bundle_id(self) -> str:
+        return self.manifest["bundle_id"]
+
+    @property
+    def feature_names(self) -> list:
+        return self.metadata["feature_names"]
+
+    @property
+    def dtypes(self) -> dict:
+        return self.metadata["dtypes"]
+
+    @property
+    def params(self) -> dict:
+        return self.metadata["params"]
+
+    @property
+    def tuned_params(self) -> dict:
+        """Best hyperparameters tune.py recorded for this bundle."""
+        if "tuning" not in self.metadata:
+            raise ValueError(f"Bundle {self.path} has no tuning record; run tune.py on it first")
+        return self.metadata["tuning"]["best_params"]
+
+    @property
+    def encoding(self) -> str:
+        """'onehot' or 'native' (LightGBM native categorical codes)."""
+        return self.metadata.get("encoding", "onehot")
+
+    # ---------- lazily loaded components ----------
+    @cached_property
+    def booster(self) -> lgb.Booster:
+        # Parsing from a string is noticeably faster than model_file for the same text
+        with self._mapped("booster.txt") as mapped:
+            return lgb.Booster(model_str=str(mapped, "utf-8"))
+
+    @cached_property
+    def tree_engine(self) -> TreeEnsemble:
+        """NumPy prediction backend; bundles written before it existed flatten the booster on load."""
+        if "forest" not in self.metadata:
+            return TreeEnsemble.from_booster(self.booster)
+        arrays = {name: self._array(f"forest_{name}.npy") for name in TreeEnsemble.ARRAYS}
+        return TreeEnsemble(arrays, **self.metadata["forest"])
+
+    @cached_property
+    def scaler(self) -> Optional[StandardScaler]:
+        numeric_cols = self.metadata["numeric_cols"]
+        if not numeric_cols:
+            return None
+        scaler = StandardScaler()
+        scaler.feature_names_in_ = np.array(numeric_cols, dtype=object)
+        scaler.n_features_in_ = len(numeric_cols)
+        scaler.n_samples_seen_ = self.metadata["scaler_n_samples_seen"]
+        scaler.mean_ = self._array("scaler_mean.npy")
+        scaler.scale_ = self._array("scaler_scale.npy")
+        scaler.var_ = self._array("scaler_var.npy")
+        return scaler
+
+    @cached_property
+    def ohe(self) -> Optional[OneHotEncoder]:
+        cat_cols = self.metadata["cat_cols"]
+        if self.encoding != "onehot" or not cat_cols:
+            return None
+        categories = [np.array(c["values"], dtype=c["dtype"]) for c in self.metadata["ohe_categories"]]
+        ohe = OneHotEncoder(
+            categories=categories,
+            handle_unknown="ignore",
+            sparse_output=False,
+            dtype=np.dtype(self.metadata["ohe_dtype"]),
+        )
+        # Fitting with explicit categories only records them, so one row is enough; going through
+        # the public API keeps the encoder valid across sklearn releases
+        return ohe.fit(pd.DataFrame({col: cats[:1] for col, cats in zip(cat_cols, categories)}))
+
+    @cached_property
+    def native_categories(self) -> Optional[dict]:
+        """Training vocabulary per categorical column, for native categorical bundles."""
+        if self.encoding != "native":
+            return None
+        return {
+            col: pd.Index(c["values"], dtype=c["dtype"])
+            for col, c in zip(self.metadata["cat_cols"], self.metadata["native_categories"])
+        }
+
+    @cached_property
+    def label_encoder(self) -> LabelEncoder:
+        le = LabelEncoder()
+        le.classes_ = np.array(self.metadata["label_classes"], dtype=object)
+        return le
+
+    @cached_property
+    def cleaning_state(self) -> Optional[CleaningState]:
+        if self.metadata["hoa_medians"] is None:   # converted from artifacts without one
+            return None
+        state = CleaningState()
+        state.hoa_medians_ = {
+            k: np.nan if v is None else v for k, v in self.metadata["hoa_medians"].items()
+        }
+        return state
+
+    def build_encoder(self, sparse_output: bool = False, label_encode: bool = True) -> EncodingPipeline:
+        """
+        Assemble a fitted EncodingPipeline from the bundle's components.
+
+        Args:
+            sparse_output: Return CSR model input from `transform` (one-hot bundles only)
+            label_encode: Also label-encode `property_type` when present
+
+        Returns:
+            EncodingPipeline ready for `transform`
+        """
+        encoder = EncodingPipeline(
+            verbose=False,
+            sparse_output=sparse_output,
+            native_categorical=self.encoding == "native",
+        )
+        encoder.le_ = self.label_encoder if label_encode else None
+        encoder.ohe_ = self.ohe
+        encoder.scaler_ = self.scaler
+        encoder.cat_cols_ = self.metadata["cat_cols"]
+        encoder.categories_ = self.native_categories
+        encoder.feature_names_out_ = self.feature_names
+        return encoder
+
+    # ---------- inference ----------
+    def align_features(self, X):
+        """Reorder columns and cast dtypes to match training; CSR and array input is already in model order."""
+        if sparse.issparse(X) or isinstance(X, np.ndarray):
+            return X
+        X = X.reindex(columns=self.feature_names)
+        for col, dtype in self.dtypes.items():
+            X[col] = X[col].astype(dtype, errors="ignore")
+        return X
+
+    def to_array(self, X) -> np.ndarray:
+        """C-contiguous float32 model input in feature order, as the NumPy backend evaluates it."""
+        if sparse.issparse(X):
+            return X.astype(np.float32).toarray()
+        if isinstance(X, pd.DataFrame):
+            return X.reindex(columns=self.feature_names).to_numpy(dtype=np.float32, na_value=np.nan)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict_proba(self, X, num_threads: Optional[int] = None, backend: str = "lightgbm") -> np.ndarray:
+        """
+        Class probabilities from LightGBM or from the flattened NumPy engine.
+
+        Args:
+            X: Model input (aligned DataFrame, CSR matrix or array in feature order)
+            num_threads: LightGBM prediction threads (LightGBM backend only)
+            backend: 'lightgbm' or 'numpy'
+        """
+        if backend == "numpy":
+            return self.tree_engine.predict_proba(self.to_array(X))
+        if backend != "lightgbm":
+            raise ValueError(f"Unknown prediction backend '{backend}' (expected 'lightgbm' or 'numpy')")
+        kwargs = {} if num_threads is None else {"num_threads": num_threads}
+        return self.booster.predict(X, **kwargs)
+
+    def predict(self, X, num_threads: Optional[int] = None, backend: str = "lightgbm") -> np.ndarray:
+        """Predict encoded class indices, matching `LGBMClassifier.predict`."""
+        proba = self.predict_proba(X, num_threads=num_threads, backend=backend)
+        classes = np.asarray(self.metadata["model_classes"])
+        if proba.ndim == 1:   # binary objective returns P(class 1)
+            return classes[(proba > 0.5).astype(int)]
+        return classes[np.argmax(proba, axis=1)]
+
+    # ---------- writing ----------
+    def update_metadata(self, **entries) -> None:
+        """
+        Add or replace top-level metadata entries (e.g. tuning results) in place.
+
+        Only the manifest is rewritten, atomically; model files, checksums and the
+        bundle id are unchanged, so use this for records about the bundle, never
+        for anything that changes how it predicts.
+        """
+        self.manifest["metadata"].update(_json_safe(entries))
+        self.metadata = self.manifest["metadata"]
+        tmp = self.path / f".{MANIFEST}.tmp-{uuid.uuid4().hex[:8]}"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.path / MANIFEST)
+
+    @staticmethod
+    def save(path: str, model, encoder, cleaning_state: Optional[CleaningState],
+             feature_names: list, dtypes: dict, metadata: Optional[dict] = None) -> "ModelBundle":
+        """
+        Write a new bundle atomically, replacing any existing bundle at `path`.
+
+        Args:
+            path: Bundle directory
+            model: Fitted LGBMClassifier
+            encoder: Fitted EncodingPipeline (uses `ohe_`, `scaler_` and `le_`)
+            cleaning_state: Fitted CleaningState, or None
+            feature_names: Model input columns in training order
+            dtypes: Model input dtypes by column
+            metadata: Extra JSON-serializable entries to record in the manifest
+
+        Returns:
+            The written bundle, opened for reading
+        """
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.tmp-{uuid.uuid4().hex[:8]}")
+        tmp.mkdir(parents=True)
+
+        model.booster_.save_model(str(tmp / "booster.txt"))
+        forest = TreeEnsemble.from_booster(model.booster_)
+        forest.save(tmp)
+
+        scaler, ohe = encoder.scaler_, encoder.ohe_
+        native = getattr(encoder, "native_categorical", False)
+        if scaler is not None:
+            np.save(tmp / "scaler_mean.npy", np.ascontiguousarray(scaler.mean_))
+            np.save(tmp / "scaler_scale.npy", np.ascontiguousarray(scaler.scale_))
+            np.save(tmp / "scaler_var.npy", np.ascontiguousarray(scaler.var_))
+
+        meta = {
+            "sklearn_version": sklearn.__version__,
+            "lightgbm_version": lgb.__version__,
+            "feature_names": list(feature_names),
+            "dtypes": {col: str(dtype) for col, dtype in dtypes.items()},
+            "model_classes": _json_safe(model.classes_),
+            "params": _json_safe(model.get_params()),
+            "label_classes": _json_safe(encoder.le_.classes_) if encoder.le_ is not None else None,
+            "numeric_cols": scaler.feature_names_in_.tolist() if scaler is not None else [],
+            "scaler_n_samples_seen": _json_safe(scaler.n_samples_seen_) if scaler is not None else None,
+            "encoding": "native" if native else "onehot",
+            "cat_cols": ohe.feature_names_in_.tolist() if ohe is not None else list(getattr(encoder, "cat_cols_", None) or []),
+            "ohe_dtype": np.dtype(ohe.dtype).name if ohe is not None else None,
+            "ohe_categories": [
+                {"dtype": cats.dtype.name, "values": _json_safe(cats.tolist())} for cats in ohe.categories_
+            ] if ohe is not None else [],
+            "native_categories": [
+                {"dtype": cats.dtype.name, "values": _json_safe(cats.tolist())} for cats in encoder.categories_.values()
+            ] if native else [],
+            "hoa_medians": _json_safe(cleaning_state.hoa_medians_) if cleaning_state is not None else None,
+            "forest": forest.meta,
+        }
+        meta.update(metadata or {})
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "bundle_id": uuid.uuid4().hex,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "files": {
+                f.name: {"sha256": _sha256(f), "bytes": f.stat().st_size}
+                for f in sorted(tmp.iterdir())
+            },
+            "metadata": meta,
+        }
+        with open(tmp / MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the whole directory so readers never see a half-written bundle
+        old = path.with_name(f"{path.name}.old-{uuid.uuid4().hex[:8]}")
+        if path.exists():
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+        return ModelBundle(path)
+
+
+def convert_pickles(pickle_dir: str, bundle_dir: str) -> ModelBundle:
+    """Build a bundle from the legacy four-pickle layout."""
+    pickle_dir = Path(pickle_dir)
+    loaded = {}
+    for name in ("model_artifacts", "ohe", "scaler", "label_encoder"):
+        with open(pickle_dir / f"{name}.pkl", "rb") as f:
+            loaded[name] = pickle.load(f)
+
+    class _Encoder:
+        ohe_ = loaded["ohe"]
+        scaler_ = loaded["scaler"]
+        le_ = loaded["label_encoder"]
+
+    artifacts = loaded["model_artifacts"]
+    return ModelBundle.save(
+        bundle_dir,
+        artifacts["model"],
+        _Encoder,
+        artifacts.get("cleaning_state"),
+        artifacts["feature_names"],
+        artifacts["dtypes"],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert legacy pickles into a model bundle")
+    parser.add_argument("pickle_dir", help="Directory with model_artifacts.pkl, ohe.pkl, scaler.pkl, label_encoder.pkl")
+    parser.add_argument("bundle_dir", help="Destination bundle directory")
+    args = parser.parse_args()
+
+    bundle = convert_pickles(args.pickle_dir, args.bundle_dir)
+    print(f"Wrote bundle {bundle.bundle_id} to {bundle.path}")
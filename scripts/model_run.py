@@ -1,10 +1,47 @@
 # Calude optimization
+import numpy as np
 import pandas as pd
-import pickle
+from scipy import sparse
 from Data_Cleaning_Pipeline import clean_and_engineer_features
 from Data_Encoding_Pipeline import EncodingPipeline
-from pathlib import Path
-from typing import Tuple, Optional
+from model_bundle import ModelBundle
+from prediction_cache import PredictionCache, listing_fingerprints
+from profiling import NULL_PROFILER, StepProfiler
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Optional, Union
+
+
+ROW_ID = "_row_id"  # Tracks raw rows through cleaning, which resets the index
+
+# Per-process cleaning state and encoder, set once by the pool initializer
+_WORKER = {}
+
+
+def _init_worker(cleaning_state, encoder, profile=False, compact=False):
+    _WORKER["cleaning_state"] = cleaning_state
+    _WORKER["encoder"] = encoder
+    _WORKER["profile"] = profile
+    _WORKER["compact"] = compact
+
+
+def _clean_and_encode_batch(data: pd.DataFrame, cleaning_state, encoder, profiler=NULL_PROFILER,
+                            compact: bool = False):
+    """Clean and encode a row-id-tagged batch; returns (features, surviving row ids)."""
+    cleaned = clean_and_engineer_features(data, state=cleaning_state, profiler=profiler, compact=compact)
+    row_ids = cleaned.pop(ROW_ID).to_numpy()
+    profiler.step("encode", cleaned)
+    X = encoder.transform_array(cleaned) if compact else encoder.transform(cleaned)
+    profiler.finish(X)
+    return X, row_ids
+
+
+def _clean_and_encode_shard(shard: pd.DataFrame):
+    """Clean and encode one row shard inside a worker process; step records go back with the result."""
+    profile = _WORKER["profile"]
+    profiler = StepProfiler(trace_memory=profile == "memory") if profile else NULL_PROFILER
+    X, row_ids = _clean_and_encode_batch(shard, _WORKER["cleaning_state"], _WORKER["encoder"], profiler,
+                                         _WORKER["compact"])
+    return X, row_ids, list(profiler.records)
 
 
 class RunModel:
@@ -14,37 +51,189 @@ class RunModel:
     """
     
     CATEGORICAL_FEATURES = ["prop_cond", "city"]
+    ROW_ID = ROW_ID
     
-    def __init__(self, model_dir: str = "."):
+    def __init__(self, model_dir: str = ".", n_jobs: int = 1, num_threads: Optional[int] = None,
+                 sparse: bool = False, backend: str = "lightgbm", profile: Union[bool, str] = False,
+                 compact: bool = False, cache: Union[int, PredictionCache, None] = None):
         """
         Initialize the model and load all required artifacts.
         
         Args:
-            model_dir: Directory containing model artifacts (default: current directory)
+            model_dir: Model bundle directory written by model_train.py (default: current directory)
+            n_jobs: Worker processes for cleaning and encoding; rows are split into
+                n_jobs shards and reassembled in input order (default: 1, no pool)
+            num_threads: LightGBM prediction threads (default: LightGBM's own default)
+            sparse: Keep the one-hot block sparse and feed LightGBM a CSR matrix
+                instead of a dense frame (default: False)
+            backend: 'lightgbm', or 'numpy' to evaluate the flattened trees on a
+                float32 array, which avoids LightGBM's pandas overhead on small batches
+            profile: Record per-step time, rows and column changes of cleaning,
+                encoding and prediction; read them with `profile_report()`.
+                'memory' also records each step's peak memory (tracemalloc,
+                noticeably slower)
+            compact: Clean integer features to Int32 and encode straight into one
+                C-contiguous float32 array, which both backends take as-is
+                (no per-column alignment, no DataFrame at the model boundary)
+            cache: Size of an LRU prediction cache, or a PredictionCache to share
+                between runners; listings seen before (same model-relevant fields)
+                skip cleaning, encoding and prediction. Needs a bundle with a
+                frozen cleaning state. Read hit rates with `cache.stats()`
         """
-        model_dir = Path(model_dir)
+        # Only the manifest is read here; components load on first use
+        self.bundle = ModelBundle(model_dir)
+        if sparse and self.bundle.encoding != "onehot":
+            raise ValueError(f"sparse mode needs a one-hot bundle; {model_dir} uses '{self.bundle.encoding}' encoding")
+        self.sparse = sparse
+        if compact and sparse:
+            raise ValueError("compact and sparse modes are exclusive; pick one model-input layout")
+        self.compact = compact
+        if backend not in ("lightgbm", "numpy"):
+            raise ValueError(f"Unknown prediction backend '{backend}' (expected 'lightgbm' or 'numpy')")
+        self.backend = backend
+        self.ohe = self.bundle.ohe
+        self.scaler = self.bundle.scaler
+        self.label_encoder = self.bundle.label_encoder
+        self.encoder = self._build_encoder()
+        if compact:    # resolve output positions and lookup tables now, not on the first batch
+            self.encoder.compile()
+
+        # Frozen cleaning statistics; older artifacts fall back to per-batch statistics
+        self.cleaning_state = self.bundle.cleaning_state
+
+        if isinstance(cache, int):
+            cache = PredictionCache(cache) if cache > 0 else None
+        if cache is not None and self.cleaning_state is None:
+            # Per-batch statistics make a row's prediction depend on its batch
+            raise ValueError(f"prediction caching needs a frozen cleaning state; {model_dir} has none")
+        self.cache = cache
         
-        # Load all artifacts at once with error handling
-        self.model_artifacts = self._load_artifact(model_dir / "model_artifacts.pkl")
-        self.ohe = self._load_artifact(model_dir / "ohe.pkl")
-        self.scaler = self._load_artifact(model_dir / "scaler.pkl")
-        self.label_encoder = self._load_artifact(model_dir / "label_encoder.pkl") 
+        self.n_jobs = n_jobs
+        self.num_threads = num_threads
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        # Step records accumulate over every batch until `profiler.reset()`
+        if profile not in (False, True, "memory"):
+            raise ValueError(f"profile must be True, False or 'memory', got {profile!r}")
+        self.profile = profile
+        self.profiler = StepProfiler(trace_memory=profile == "memory") if profile else NULL_PROFILER
         
         # Cache for processed data
         self.X: Optional[pd.DataFrame] = None
         self.y: Optional[pd.Series] = None
     
-    @staticmethod
-    def _load_artifact(filepath: Path):
-        """Load a single artifact with error handling."""
-        try:
-            with open(filepath, 'rb') as f:
-                return pickle.load(f)
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Required artifact not found: {filepath}")
-        except Exception as e:
-            raise RuntimeError(f"Error loading {filepath}: {str(e)}")
-    
+    def _build_encoder(self) -> EncodingPipeline:
+        """Create an EncodingPipeline from the fitted encoders and scaler."""
+        return self.bundle.build_encoder(sparse_output=self.sparse)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the worker pool on first use; workers receive the encoder only once."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(self.cleaning_state, self.encoder, self.profile, self.compact),
+            )
+        return self._pool
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _clean_and_encode(self, data: pd.DataFrame):
+        """
+        Clean and encode a raw batch, serially or across the worker pool.
+
+        Parallel output equals serial output exactly when a fitted cleaning
+        state is available, since every row is then cleaned independently.
+
+        Returns:
+            Tuple of (encoded features, positions of the surviving raw rows);
+            features are a DataFrame, a CSR matrix in sparse mode or a
+            float32 array in compact mode
+        """
+        tagged = data.assign(**{self.ROW_ID: np.arange(len(data))})
+
+        if self.n_jobs > 1 and len(tagged) >= self.n_jobs:
+            shards = [tagged.iloc[idx] for idx in np.array_split(np.arange(len(tagged)), self.n_jobs)]
+            parts = list(self._get_pool().map(_clean_and_encode_shard, shards))
+            if self.sparse:
+                X = sparse.vstack([X for X, _, _ in parts], format="csr")
+            elif self.compact:
+                X = np.concatenate([X for X, _, _ in parts])
+            else:
+                X = pd.concat([X for X, _, _ in parts], ignore_index=True)
+            row_ids = np.concatenate([ids for _, ids, _ in parts])
+            if self.profiler.enabled:
+                for _, _, records in parts:
+                    self.profiler.extend(records)
+        else:
+            X, row_ids = _clean_and_encode_batch(tagged, self.cleaning_state, self.encoder, self.profiler,
+                                                 self.compact)
+
+        return X, row_ids
+
+    def _model_predict(self, X) -> np.ndarray:
+        """Run the model on aligned features, honouring `num_threads`."""
+        if X.shape[0] == 0:    # every row was filtered out during cleaning
+            return np.empty(0, dtype="int64")
+        self.profiler.step("predict", X)
+        pred = self.bundle.predict(X, num_threads=self.num_threads, backend=self.backend)
+        self.profiler.finish(pred)
+        return pred
+
+    def _score_rows(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predicted labels for a raw batch, consulting the prediction cache if there is one.
+
+        Only cache misses are cleaned, encoded and predicted, each distinct
+        listing once; the results are cached and merged back in input order.
+
+        Returns:
+            Tuple of (positions of the rows that survive cleaning, their labels)
+        """
+        if self.cache is None:
+            X, row_ids = self._clean_and_encode(data)
+            pred = self._model_predict(self._align_features(X))
+            return row_ids, self.label_encoder.inverse_transform(pred)
+
+        keys = listing_fingerprints(data)
+        labels, missed = self.cache.lookup(keys, self.bundle.bundle_id)
+        if len(missed):
+            # Repeats within the batch are scored once
+            miss_keys, first, inverse = np.unique(keys[missed], return_index=True, return_inverse=True)
+            todo = missed[first]
+            X, row_ids = self._clean_and_encode(data.iloc[todo])
+            pred = self._model_predict(self._align_features(X))
+            computed = np.empty(len(todo), dtype=object)    # None: removed during cleaning
+            computed[row_ids] = self.label_encoder.inverse_transform(pred)
+            self.cache.store(miss_keys, computed, self.bundle.bundle_id)
+            labels[missed] = computed[inverse]
+
+        row_ids = np.flatnonzero(pd.notna(labels))
+        return row_ids, labels[row_ids]
+
+    def profile_report(self) -> pd.DataFrame:
+        """
+        Per-step totals over every batch scored since the profiler was last reset.
+
+        Returns:
+            DataFrame indexed by step (the numbered cleaning steps, then 'encode'
+            and 'predict'), with a peak_memory_mb column under `profile='memory'`;
+            empty when the runner was created without `profile`
+        """
+        if not self.profiler.enabled:
+            return pd.DataFrame()
+        return self.profiler.summary()
+
+    def _align_features(self, X):
+        """Reorder columns and cast dtypes to match the trained model."""
+        if self.backend == "numpy":   # one float32 conversion replaces the per-column casts
+            return self.bundle.to_array(X)
+        return self.bundle.align_features(X)
+
     def preprocess(self, X: pd.DataFrame) -> pd.DataFrame:
         """
         Preprocess the input data through all transformation steps.
@@ -55,19 +244,10 @@ class RunModel:
         Returns:
             Tuple of (X, y) - features and target variable
         """
-        # Apply preprocessing pipeline
+        # Apply preprocessing pipeline and encode categorical features,
+        # keeping the raw rows that survived cleaning, in output order
         self.raw = X
-        preprocessed = clean_and_engineer_features(X)
-        self.preprocessed = preprocessed
-
-        # Initializing encoder and loading encoders and scaler
-        encoder = EncodingPipeline()
-        encoder.le_ = self.label_encoder
-        encoder.ohe_ = self.ohe
-        encoder.scaler_ = self.scaler
-
-        # Encode categorical features
-        X_clean = encoder.transform(preprocessed)
+        X_clean, self.row_ids = self._clean_and_encode(X)
 
         # Cache processed data
         self.X_clean = X_clean
@@ -87,30 +267,20 @@ class RunModel:
         if X is not None:
             self.X = X
         
-        model = self.model_artifacts["model"]
-        cat_features = self.model_artifacts["categorical_features"]
-        num_features = self.model_artifacts["numeric_features"]
-        feature_order = self.model_artifacts["feature_names"]
-
-        # Reordering columns to match model and encoder order
-        X = X.reindex(columns=feature_order)
-
-        # Ensuring each feature has correct dtype to match with model training
-        for col, dtype in self.model_artifacts["dtypes"].items():
-            X[col] = X[col].astype(dtype, errors="ignore")
-
-        self.X = X
+        # Reordering columns and casting dtypes to match model training
+        self.X = self._align_features(X)
 
         # Get prediction probabilities
-        pred = model.predict(self.X)
+        pred = self._model_predict(self.X)
         
         # Create results dataframe with proper class labels
         pred_labels = self.label_encoder.inverse_transform(pred)
 
-        # Combining raw features with predictions
-        self.raw['Predicted Type'] = pred_labels
+        # Combining surviving raw rows with predictions
+        result = self.raw.iloc[self.row_ids].copy()
+        result['Predicted Type'] = pred_labels
         
-        return self.raw
+        return result
     
     def predict_new(self, data: pd.DataFrame) -> pd.DataFrame:
         """
@@ -122,5 +292,29 @@ class RunModel:
         Returns:
             DataFrame with prediction probabilities
         """
-        self.preprocess(data)
-        return self.predict()
+        if self.cache is not None:
+            # Cached rows never reach the encoder, so there is no full X to keep
+            self.raw = data
+            self.row_ids, labels = self._score_rows(data)
+            result = data.iloc[self.row_ids].copy()
+            result['Predicted Type'] = labels
+            return result
+        return self.predict(self.preprocess(data))
+
+    def score(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Preprocess and predict a batch without caching intermediate frames.
+
+        Unlike `predict_new`, nothing is kept on the instance, so this is the
+        method to call repeatedly on chunks of a large file.
+
+        Args:
+            data: Raw input dataframe
+            
+        Returns:
+            Rows of `data` that survive cleaning, with a 'Predicted Type' column
+        """
+        row_ids, labels = self._score_rows(data)
+        scored = data.iloc[row_ids].copy()
+        scored["Predicted Type"] = labels
+        return scored
@@ -1,22 +1,112 @@
-import pandas as pd
-import numpy as np
-import re
+import argparse
+import json
+import sys
 from lightgbm import LGBMClassifier
-from sklearn.preprocessing import StandardScaler, LabelEncoder, OneHotEncoder
-from Data_Cleaning_Pipeline import clean_and_engineer_features
+from Data_Cleaning_Pipeline import CleaningState
 from Data_Encoding_Pipeline import EncodingPipeline
 import pickle
+from model_bundle import ModelBundle
+from dataset_cache import DatasetCache
+from ingest import read_listings
+from profiling import StepProfiler
+from incremental_train import update_bundle
 
-df = pd.read_csv("../sample_data/raw_minus_sample.csv")
+parser = argparse.ArgumentParser(description="Train the deployment model and write the model bundle")
+parser.add_argument("--encoding", choices=["onehot", "native"], default="onehot",
+                    help="One-hot encode categoricals, or pass integer codes to LightGBM's native categorical splits")
+parser.add_argument("--no-cache", action="store_true", help="Always re-clean and re-encode the training data")
+parser.add_argument("--cache-dir", default="../.cache/datasets", help="Cleaned/encoded dataset cache directory")
+parser.add_argument("--cache-max-gb", type=float, default=2.0, help="Dataset cache size budget")
+parser.add_argument("--profile", action="store_true",
+                    help="Print per-step time, rows and column changes of cleaning and encoding")
+parser.add_argument("--profile-memory", action="store_true",
+                    help="Profile as --profile does, also recording each step's peak memory (slower)")
+parser.add_argument("--csv-engine", choices=["c", "pyarrow"], default="c", help="CSV parser for the raw training file")
+parser.add_argument("--params", choices=["pickle", "tuned"], default="pickle",
+                    help="Hyperparameters from pickle/model.pkl, or the best params tune.py recorded in --bundle-dir")
+parser.add_argument("--incremental", metavar="NEW_CSV", default=None,
+                    help="Continue boosting the existing bundle on new listings instead of a full refit")
+parser.add_argument("--bundle-dir", default="../pickle/model_bundle",
+                    help="Bundle to write, or to update in incremental mode")
+parser.add_argument("--new-trees", type=int, default=50, help="Boosting rounds added per update (incremental mode)")
+parser.add_argument("--holdout", type=float, default=0.2,
+                    help="Share of new listings held out to measure accuracy (incremental mode)")
+parser.add_argument("--compare-full", action="store_true",
+                    help="Also time and score a full refit on the history plus the new listings (incremental mode)")
+args = parser.parse_args()
 
-df = clean_and_engineer_features(df.drop("Unnamed: 0", axis=1))
+DATA_PATH = "../sample_data/raw_minus_sample.csv"
 
-# Initializing encoder
-e_pipe = EncodingPipeline()
-e_pipe.fit(df) # Fitting encoder
+if args.incremental:
+    # Encoder, scaler, vocabulary and cleaning statistics stay fixed; only trees are added
+    report = update_bundle(
+        args.bundle_dir,
+        args.incremental,
+        n_new_trees=args.new_trees,
+        holdout=args.holdout,
+        history_path=DATA_PATH if args.compare_full else None,
+        csv_engine=args.csv_engine,
+    )
+    print(f"Bundle {report['parent_bundle_id'][:12]} -> {report['bundle_id'][:12]} (version {report['version']}): "
+          f"{report['base_trees']} + {report['added_trees']} trees on {report['train_rows']:,} new rows")
+    print(f"Update time:       {report['seconds']:.2f}s (fit {report['fit_seconds']:.2f}s)")
+    print(f"Holdout accuracy:  {report['accuracy_before']:.4f} before -> {report['accuracy_after']:.4f} after")
+    if "full_refit" in report:
+        full = report["full_refit"]
+        print(f"Full refit:        {full['seconds']:.2f}s on {full['rows']:,} rows, accuracy {full['accuracy']:.4f} "
+              f"({report['speedup']:.1f}x slower, {report['time_saved_seconds']:.2f}s saved)")
+    if report["unseen_categories"]:
+        print("Values outside the fixed vocabulary (encoded as unseen):")
+        print(json.dumps(report["unseen_categories"], indent=2))
+    sys.exit(0)
 
-# Transforming data
-df = e_pipe.transform(df)
+# The bundle being replaced: its tuning record is carried over and it becomes the new bundle's parent
+try:
+    previous = ModelBundle(args.bundle_dir)
+except FileNotFoundError:
+    previous = None
+tuning = previous.metadata.get("tuning") if previous is not None else None
+# Checked before any cleaning or training starts
+tuned_params = None
+if args.params == "tuned":
+    if previous is None:
+        raise ValueError(f"--params tuned needs a bundle tuned by tune.py; {args.bundle_dir} has none")
+    tuned_params = previous.tuned_params
+
+# Reusing cleaned/encoded data when neither the input file nor the pipeline code changed
+cache = None if args.no_cache else DatasetCache(args.cache_dir, max_bytes=int(args.cache_max_gb * 1024 ** 3))
+cache_key = cache.key(DATA_PATH, encoding=args.encoding) if cache is not None else None
+cached = cache.get(cache_key) if cache is not None else None
+
+if cached is not None:
+    print(f"Using cached cleaned/encoded data ({cache_key[:12]})")
+    cleaning_state = cached["artifacts"]["cleaning_state"]
+    e_pipe = cached["artifacts"]["encoder"]
+    df = cached["encoded"]
+else:
+    # Parsing only the columns cleaning uses, with declared dtypes (the index column is skipped too)
+    df = read_listings(DATA_PATH, engine=args.csv_engine)
+
+    # Learning cleaning statistics (HOA medians) once and cleaning training data
+    profiler = StepProfiler(trace_memory=args.profile_memory) if args.profile or args.profile_memory else None
+    cleaning_state = CleaningState()
+    cleaned = cleaning_state.fit_transform(df, profiler=profiler)
+
+    # Initializing encoder
+    e_pipe = EncodingPipeline(native_categorical=args.encoding == "native")
+    if profiler is not None:
+        profiler.step("encode", cleaned)
+    e_pipe.fit(cleaned) # Fitting encoder
+
+    # Transforming data
+    df = e_pipe.transform(cleaned)
+    if profiler is not None:
+        profiler.finish(df)
+        print(profiler.summary().to_string())
+
+    if cache is not None:
+        cache.put(cache_key, cleaned, df, {"cleaning_state": cleaning_state, "encoder": e_pipe},
+                  meta={"input": DATA_PATH, "encoding": args.encoding})
 
 # Separating features and target
 X, y = df.drop("property_type", axis=1), df["property_type"]
@@ -27,30 +117,37 @@ with open("../pickle/model.pkl", 'rb') as f:
 
 # Extracting trained model hyper paramteres
 params = model.get_params()
+if tuned_params is not None:
+    params.update(tuned_params)
 
 # Initializing model with parameters
 model_deploy = LGBMClassifier(**params)
 
-model_deploy.fit(X, y)
+if args.encoding == "native":
+    # Category codes are split on natively instead of one column per category
+    model_deploy.fit(X, y, categorical_feature=e_pipe.cat_cols_)
+else:
+    model_deploy.fit(X, y)
 
-# During training - save everything needed
-model_artifacts = {
-    'model': model_deploy,
-    'feature_names': X.columns.tolist(),
-    'categorical_features': e_pipe.ohe_.get_feature_names_out().tolist(),
-    'numeric_features': e_pipe.scaler_.feature_names_in_.tolist(),  # if applicable
-    'dtypes': X.dtypes.to_dict()
+# During training - save everything needed in a single versioned bundle
+# (model, encoders, scaler and cleaning statistics are always written together)
+# A full refit restarts the version count that incremental updates advance
+lineage = {
+    "parent_bundle_id": previous.bundle_id if previous is not None else None,
+    "version": 0,
+    "update": "full_refit",
+    "input": DATA_PATH,
+    "rows": len(X),
 }
-
-with open('../pickle/model_artifacts.pkl', 'wb') as f:
-    pickle.dump(model_artifacts, f)
-
-# Saving encoders and scaler
-with open("../pickle/ohe.pkl", "wb") as f:
-    pickle.dump(e_pipe.ohe_, f)
-
-with open("../pickle/label_encoder.pkl", "wb") as f:
-    pickle.dump(e_pipe.le_, f)
-
-with open("../pickle/scaler.pkl", "wb") as f:
-    pickle.dump(e_pipe.scaler_, f)
+metadata = {"lineage": lineage}
+if tuning is not None:
+    metadata["tuning"] = tuning
+ModelBundle.save(
+    args.bundle_dir,
+    model_deploy,
+    e_pipe,
+    cleaning_state,  # reused at inference so scoring is batch-independent
+    feature_names=X.columns.tolist(),
+    dtypes=X.dtypes.to_dict(),
+    metadata=metadata,
+)
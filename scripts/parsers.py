@@ -0,0 +1,186 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+# Step 20 groups; any other (or malformed) zip prefix is 'other'
+ZIP_PREFIX_GROUPS = {
+    "972": "urban_portland",
+    "970": "suburban_west_south",
+    "971": "suburban_northwest",
+}
+
+_HOA_NOISE = re.compile(r"(?i)\$|,|usd|/mo|per\s*month|monthly")
+_HOA_NUMBER = re.compile(r"(-?\d+(?:\.\d+)?)")
+
+
+def _by_unique(values, parse):
+    """
+    Apply ``parse`` to the distinct values of ``values`` only and broadcast back.
+
+    MLS fields repeat heavily (a few hundred areas and zip codes, bath counts
+    in steps of .1, many identical prices), so the string work runs over the
+    distinct values instead of every row. Missing values are kept as a value
+    of their own, so ``parse`` sees them exactly as a full-column chain would.
+
+    Parameters:
+    -----------
+    values : pandas.Series
+        Raw column
+    parse : callable
+        Maps a Series of distinct values to a Series of results, position by position
+
+    Returns:
+    --------
+    pandas.Series
+        One result per row of ``values``, on its index
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    parsed = parse(pd.Series(uniques, dtype=object))
+    return parsed.take(codes).set_axis(values.index)
+
+
+# ---------- step 3: area ----------
+def area_chain(values):
+    """Reference chain for step 3 (one pass per string operation)."""
+    return (
+        values
+        .astype(str)
+        .str.replace("$", " ", regex=False)
+        .str.strip()
+        .str.normalize('NFKC')
+        .str.replace(".00", "", regex=False)
+    )
+
+
+def parse_area(values):
+    """Step 3 in one pass per distinct value: same strings as ``area_chain``."""
+    return _by_unique(values, lambda u: pd.Series(
+        [unicodedata.normalize("NFKC", str(v).replace("$", " ").strip()).replace(".00", "") for v in u],
+        dtype=object,
+    ))
+
+
+# ---------- step 4 (+ steps 6 and 12): prices ----------
+def price_chain(values):
+    """Reference chain for step 4; still text, lowercased in step 6 and parsed in step 12."""
+    return (
+        values
+        .astype(str)
+        .str.replace("$", "", regex=False)
+        .str.replace(",", "", regex=False)
+        .str.replace(".00", "", regex=False)
+    )
+
+
+def parse_price(values):
+    """
+    Raw price text straight to numbers.
+
+    Fuses step 4's replacements, step 6's lowercasing and step 12's
+    ``pd.to_numeric(errors='coerce')`` per distinct value, so the values
+    reaching the integer cast in step 12 are those of the three-step chain.
+    """
+    return _by_unique(values, lambda u: pd.to_numeric(pd.Series(
+        [str(v).replace("$", "").replace(",", "").replace(".00", "").lower() for v in u],
+        dtype=object,
+    ), errors="coerce"))
+
+
+# ---------- step 8: HOA dues ----------
+def hoa_chain(values):
+    """Reference chain for step 8's numeric parse (regex replace, regex extract, to_numeric)."""
+    return (
+        values.astype(str)
+        .str.replace(r'(?i)\$|,|usd|/mo|per\s*month|monthly', '', regex=True)
+        .str.extract(r'(-?\d+(?:\.\d+)?)', expand=False)
+        .pipe(pd.to_numeric, errors='coerce')
+    )
+
+
+def _first_number(text):
+    match = _HOA_NUMBER.search(_HOA_NOISE.sub("", text))
+    return match.group(1) if match else np.nan
+
+
+def parse_hoa(values):
+    """Step 8's parse with both regexes applied once per distinct value."""
+    return _by_unique(values, lambda u: pd.to_numeric(
+        pd.Series([_first_number(str(v)) for v in u], dtype=object), errors="coerce"
+    ))
+
+
+# ---------- step 11: bathrooms ----------
+def bath_chain(values):
+    """Reference chain for step 11: (full, half) from the text either side of the first '.'."""
+    bath_split = values.astype(str).str.split('.', expand=True)
+    full = pd.to_numeric(bath_split[0], errors='coerce')
+    half = pd.to_numeric(bath_split[1], errors='coerce').fillna(0)
+    return full, half
+
+
+def split_baths(values):
+    """
+    Step 11 per distinct value; returns ``(full, half)`` like ``bath_chain``.
+
+    Unlike the chain, a column with no '.' anywhere gives zero half baths
+    instead of a KeyError.
+    """
+    def parse(u):
+        parts = [str(v).split(".") for v in u]
+        full = pd.to_numeric(pd.Series([p[0] for p in parts], dtype=object), errors="coerce")
+        half = pd.to_numeric(pd.Series([p[1] if len(p) > 1 else np.nan for p in parts], dtype=object),
+                             errors="coerce").fillna(0)
+        return pd.DataFrame({"full": full, "half": half})
+
+    split = _by_unique(values, parse)
+    return split["full"], split["half"]
+
+
+# ---------- step 15: zip code ----------
+def zip_chain(values, int_dtype="Int64"):
+    """Reference chain for step 15: rounded integer zip, zero-padded to five digits, as a category."""
+    zip_num = pd.to_numeric(values, errors="coerce").round()
+    if int_dtype == "Int32" and zip_num.abs().max() > np.iinfo(np.int32).max:
+        int_dtype = "Int64"
+    return zip_num.astype(int_dtype).astype("string").str.zfill(5).astype("category")
+
+
+def normalize_zip(values, int_dtype="Int64"):
+    """Step 15 per distinct value (the chain itself runs on the distinct values)."""
+    return _by_unique(values, lambda u: zip_chain(u, int_dtype).astype("string")).astype("category")
+
+
+# ---------- step 20: zip prefix groups ----------
+def zip_group_chain(zip_codes):
+    """Reference chain for step 20: per-row prefix strings and a Python classifier."""
+    zip_numeric = pd.to_numeric(zip_codes, errors='coerce')
+    zip_prefix = zip_numeric.dropna().astype(int).astype(str).str[:3]
+
+    def classify_zip_prefix(prefix):
+        if pd.isna(prefix):
+            return 'other'
+        return ZIP_PREFIX_GROUPS.get(prefix, 'other')
+
+    # Assigned back by index, so rows without a zip code stay missing
+    return zip_prefix.apply(classify_zip_prefix).reindex(zip_codes.index).astype('category')
+
+
+def zip_prefix_groups(zip_codes):
+    """
+    Step 20 as a lookup table over the zip categories.
+
+    Each category is classified once through ``ZIP_PREFIX_GROUPS``; rows take
+    their group by category code. Rows without a (numeric) zip code stay missing.
+    """
+    zip_codes = zip_codes.astype("category")
+    numeric = pd.to_numeric(pd.Series(zip_codes.cat.categories, dtype=object), errors="coerce")
+    table = np.array(
+        [np.nan if pd.isna(n) else ZIP_PREFIX_GROUPS.get(str(int(n))[:3], "other") for n in numeric] + [np.nan],
+        dtype=object,
+    )
+    # Code -1 (missing) picks the trailing NaN
+    groups = table[zip_codes.cat.codes.to_numpy()]
+    return pd.Series(groups, index=zip_codes.index, dtype=object).astype("category")
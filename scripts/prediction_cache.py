@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from ingest import MODEL_COLUMNS, NUMERIC_COLUMNS
+
+
+# Text columns that cleaning strips of surrounding whitespace before anything else reads them
+STRIPPED_COLUMNS = ("Type", "City")
+# Stands in for missing text, so a missing value never hashes like the string 'nan'
+_NULL = "\x00<NA>"
+_MISSING = object()
+
+
+def _normalized(values: pd.Series, col: str) -> pd.Series:
+    """
+    Canonical form of one raw column for hashing.
+
+    Only differences that cleaning itself erases are removed (letter case, and
+    surrounding whitespace in `STRIPPED_COLUMNS`); anything else stays distinct.
+    Normalizing too little costs a cache miss, too much would return a wrong prediction.
+    """
+    if col in NUMERIC_COLUMNS and pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    text = values.astype(object)
+    if pd.api.types.infer_dtype(text, skipna=True) in ("string", "mixed", "mixed-integer"):
+        lowered = text.str.lower()
+        if col in STRIPPED_COLUMNS:
+            lowered = lowered.str.strip()
+        # Non-string cells (numbers in a text column) keep their own value
+        text = lowered.where(lowered.notna(), text)
+    return text.where(text.notna(), _NULL)
+
+
+def listing_fingerprints(data: pd.DataFrame) -> np.ndarray:
+    """
+    Stable 64-bit hash of each row's model-relevant fields (`ingest.MODEL_COLUMNS`).
+
+    Identifiers such as 'MLS#' and columns cleaning drops are ignored, so a
+    listing re-sent with only a status or date change keeps its fingerprint.
+    Hashes are the same across processes and runs.
+
+    Returns:
+        uint64 array with one fingerprint per row of `data`
+    """
+    columns = {
+        col: _normalized(data[col], col) if col in data.columns else pd.Series(_NULL, index=data.index)
+        for col in MODEL_COLUMNS
+    }
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+class PredictionCache:
+    """
+    Bounded LRU map from listing fingerprint to predicted label.
+
+    Rows that cleaning removes are cached too (as None), so they are not
+    re-cleaned either. Entries belong to one model bundle: a lookup for a
+    different bundle id clears the cache first, so a retrained model never
+    serves its predecessor's predictions. Safe to share between threads.
+
+    Args:
+        max_size: Largest number of fingerprints kept; the least recently used are evicted
+    """
+
+    def __init__(self, max_size: int = 100_000):
+        if max_size < 1:
+            raise ValueError(f"max_size must be at least 1, got {max_size}")
+        self.max_size = max_size
+        self.bundle_id: Optional[str] = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def lookup(self, keys: np.ndarray, bundle_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cached labels for `keys`, scored by bundle `bundle_id`.
+
+        Returns:
+            Tuple of (object array of labels, None where the row was removed in
+            cleaning or is not cached; positions of the keys that missed)
+        """
+        labels = np.empty(len(keys), dtype=object)
+        missed = []
+        with self._lock:
+            if bundle_id != self.bundle_id:
+                if self._entries:
+                    self.invalidations += 1
+                    self._entries.clear()
+                self.bundle_id = bundle_id
+            entries = self._entries
+            for i, key in enumerate(keys.tolist()):
+                label = entries.get(key, _MISSING)
+                if label is _MISSING:
+                    missed.append(i)
+                else:
+                    entries.move_to_end(key)
+                    labels[i] = label
+            self.hits += len(keys) - len(missed)
+            self.misses += len(missed)
+        return labels, np.asarray(missed, dtype=np.intp)
+
+    def store(self, keys: np.ndarray, labels, bundle_id: str):
+        """Cache `labels` (None for rows removed in cleaning) under `keys`, evicting the oldest entries."""
+        with self._lock:
+            if bundle_id != self.bundle_id:    # the cache moved on to another bundle meanwhile
+                return
+            entries = self._entries
+            for key, label in zip(keys.tolist(), labels):
+                entries[key] = label
+                entries.move_to_end(key)
+            overflow = len(entries) - self.max_size
+            for _ in range(max(overflow, 0)):
+                entries.popitem(last=False)
+            self.evictions += max(overflow, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bundle_id": self.bundle_id,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -1,43 +1,57 @@
 import pandas as pd
 import re
+from validation import MLS_SCHEMA, missing_columns, validate
+
+# Values the legacy model cannot do without, and the defaults filled in for the optional ones
+REQUIRED_VALUES = {
+    "Zip": "Please include zip code(s)",
+    "Area": "Please include area value",
+    "BD": "Please include number of bedrooms",
+    "Baths": "Please include number of baths (0.1 for each partial bathroom)",
+    "Apx Sqft": "Please include approximate square footage",
+    "Yr. Built": "Please include property year built",
+}
+DEFAULT_VALUES = {
+    "Prop. Cond.": ("OTHER", "WARNING: Submitting missing values for property condition. \nThis may negatively affect prediction accuracy"),
+    "# Levels": ("1", "WARNING: Missing number of levels values. \nThis may negatively affect prediction accuracy"),
+    "HOA Dues": ("0", "WARNING: Missing hoa dues values. \nThis may negatively affect prediction accuracy"),
+    "# Garage": ("0", "WARNING: Missing number of garage values can negatively affect model accuracy"),
+    "# Fireplaces": ("0", "WARNING: Missing number of fireplaces can negatively affect model accuracy"),
+}
 
 # data preprocessing function
 def preprocessor(data: pd.DataFrame)->pd.DataFrame:
-    # Making sure feature shape is correct
-    if data.shape[1] != 28:
-        raise ValueError(f"Input is missing data. Number of features should be 25. Shape {data.shape}")
-    
-    # Standaridizing column name format
-    data.columns = [re.sub(r"\.","", re.sub(r" ", "_", str(x).lower())) for x in data.columns]
-    
-    # Making sure features are correct 
-    col_names = ['mls#', 'type', 'prop_cat', 'prop_cond', 'tax', 'address', 'city',
-       'zip', 'area', 'bd', 'baths', '#_levels', 'apx_sqft', 'price_sqft',
-       'sld_price_sqft', 'lot_size', 'pend_date', 'dom', 'cdom', 'list_date',
-       'list_price', 'sold_date', 'price', 'yr_built', 'hoa_dues', '#_garage',
-       '#_fireplaces', 'terms']
-    unknown_cols =  set(col_names) - set(data.columns)
-    if unknown_cols:
-        raise ValueError(f"Input data columns not recognized: Input cols \nExpected:{col_names}\nData Cols: {data.columns}")    
-
-    # Filtering columns
-    try:
-        # column names to keep
-        keep = ["prop_cond", "type", "city", "zip", "area", "bd", "baths", "#_levels", "apx_sqft", "yr_built", "hoa_dues", "#_garage", "#_fireplaces"]
-        data = data[keep] 
-    except Exception as e:
-        print(f"Error filtering data: {e}")
+    # Making sure every MLS export column is present
+    missing = missing_columns(data.columns, required_only=False)
+    if missing:
+        raise ValueError(f"Input data is missing columns: {missing}\nExpected: {list(MLS_SCHEMA)}")
 
-    # Keeping desires target property types
-    prop_types = ["ATTACHD", "DETACHD", "CONDO"]
-    data = data[data["type"].isin(prop_types)]
-    
-    # Keeping rows with desired cities
-    cities = ["Portland", "Beaverton", "Hillsboro", "Lake Oswego", "West Linn"]
-    data = data[data["city"].isin(cities)]
+    # Keeping the property types and cities the model is trained on (the schema's vocabularies)
+    keep_rows = pd.Series(True, index=data.index)
+    for col in ("Type", "City"):
+        spec = MLS_SCHEMA[col]
+        keep_rows &= spec.normalize(data[col]).isin(spec.allowed)
+    data = data[keep_rows]
 
     # Dropping missing sqft rows
-    data = data.dropna(subset="apx_sqft", axis=0)
+    data = data.dropna(subset="Apx Sqft", axis=0)
+
+    # Checking every remaining column in one pass
+    report = validate(data)
+    for col, message in REQUIRED_VALUES.items():
+        if report.columns[col]["nulls"]:
+            raise ValueError(message)
+
+    data = data.copy()
+    for col, (default, message) in DEFAULT_VALUES.items():
+        if report.columns[col]["nulls"]:
+            print(message)
+            data[col] = data[col].fillna(default)
+
+    # Standaridizing column name format and keeping the model's columns
+    data.columns = [re.sub(r"\.","", re.sub(r" ", "_", str(x).lower())) for x in data.columns]
+    keep = ["prop_cond", "type", "city", "zip", "area", "bd", "baths", "#_levels", "apx_sqft", "yr_built", "hoa_dues", "#_garage", "#_fireplaces"]
+    data = data[keep]
 
     # Consolidating prop_cond unique values 
     data["prop_cond"] = data["prop_cond"].replace(
@@ -45,53 +59,6 @@ def preprocessor(data: pd.DataFrame)->pd.DataFrame:
     "OTHER"
 )
 
-        # Checking for significant feature missing values
-    prop_cond_values = ["RESALE", "REMOD", "APPROX", "NEW", "FIXER", "RESTORD"]
-    unknown_cond = set(data["prop_cond"]) - set(prop_cond_values)
-    if unknown_cond:
-        print("WARNING: Submitting missing values for property condition. \nThis may negatively affect prediction accuracy")
-        data["prop_cond"] = data["prop_cond"].fillna("OTHER")
-    
-    # Cities model is trained on
-    cities = ["Portland", "Beaverton", "Hillsboro", "Lake Oswego", "West Linn"]
-    unknown_cities = set(data["city"]) - set(cities)
-    if unknown_cities:                              
-        raise ValueError(f"City not recognized. Unrecognized cities: {unknown_cities}")
-
-    if data["zip"].isna().any():
-        raise ValueError("Please include zip code(s)") 
-    
-    if data["area"].isna().any():
-        raise ValueError("Please include area value")
-        
-    if data["bd"].isna().any():
-        raise ValueError("Please include number of bedrooms")
-    
-    if data["baths"].isna().any():
-        raise ValueError("Please include number of baths (0.1 for each partial bathroom)")
-        
-    if data["#_levels"].isna().any():
-        print("WARNING: Missing number of levels values. \nThis may negatively affect prediction accuracy")
-        data["#_levels"] = data["#_levels"].fillna('1')
-    
-    if data["apx_sqft"].isna().any():
-        raise ValueError("Please include approximate square footage")
-    
-    if data["yr_built"].isna().any():
-        raise ValueError("Please include property year built")
-
-    if data["hoa_dues"].isna().any():
-        print("WARNING: Missing hoa dues values. \nThis may negatively affect prediction accuracy")
-        data["hoa_dues"] = data["hoa_dues"].fillna('0')
-    
-    if data["#_garage"].isna().any():
-        print("WARNING: Missing number of gaarage values can negatively affect model accuracy")
-        data["#_garage"] = data["#_garage"].fillna('0')
-
-    if data["#_fireplaces"].isna().any():
-        print("WARNING: Missing number of fireplaces can negatively affect model accuracy")
-        data["#_fireplaces"] = data["#_fireplaces"].fillna('0')
-    
     # Converting dtypes to appropriate types
     cat = ["prop_cond", "type", "city", "area"]
     flt = "baths"
@@ -0,0 +1,162 @@
+import time
+import tracemalloc
+from typing import Optional, Sequence
+
+import pandas as pd
+
+
+class NullProfiler:
+    """Profiler stand-in used when instrumentation is off; every hook is a no-op."""
+
+    enabled = False
+    records = ()
+
+    def step(self, name: str, data) -> None:
+        pass
+
+    def finish(self, data) -> None:
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def _groups(data, watch: Sequence[str]) -> Optional[set]:
+    """Normalized distinct values of the first watched column present in `data`."""
+    if not isinstance(data, pd.DataFrame):
+        return None
+    for col in watch:
+        if col in data.columns:
+            values = pd.Series(pd.unique(data[col].dropna().astype(str)))
+            return set(values.str.strip().str.lower())
+    return None
+
+
+class StepProfiler:
+    """
+    Record wall time, memory, rows and column changes of each pipeline step.
+
+    Steps are delimited by calling `step(name, data)` at the start of each one
+    with the frame as it stands; the call closes the previous step, treating
+    `data` as its output. `finish(data)` closes the last step. Profiling work
+    (row counts, dtype snapshots) happens outside the timed region.
+
+    Records accumulate across runs, so one profiler can follow many batches;
+    `summary()` totals them per step.
+
+    Args:
+        trace_memory: Record each step's peak traced memory above its starting
+            point (starts tracemalloc if needed; adds noticeable overhead)
+        watch: Candidate column names (raw and cleaned) whose distinct values are
+            tracked, so a step that removes every row of a city is reported
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory: bool = False, watch: Sequence[str] = ("City", "city")):
+        self.trace_memory = trace_memory
+        self.watch = tuple(watch)
+        self.records = []
+        self._open = None
+        self._started_tracing = False
+
+    def _snapshot(self, data) -> dict:
+        return {
+            "rows": data.shape[0],
+            # None for arrays and sparse matrices, whose columns have no names to compare
+            "dtypes": data.dtypes.to_dict() if isinstance(data, pd.DataFrame) else None,
+            "groups": _groups(data, self.watch) if self.watch else None,
+        }
+
+    def step(self, name: str, data) -> None:
+        self._close(data)
+        snapshot = self._snapshot(data)
+        memory = None
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+        self._open = (name, snapshot, memory, time.perf_counter())
+
+    def finish(self, data) -> None:
+        self._close(data)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _close(self, data) -> None:
+        if self._open is None:
+            return
+        end = time.perf_counter()
+        name, before, memory, start = self._open
+        self._open = None
+        peak = tracemalloc.get_traced_memory()[1] if memory is not None else None
+        after = self._snapshot(data)
+
+        record = {
+            "step": name,
+            "seconds": end - start,
+            "rows_in": before["rows"],
+            "rows_out": after["rows"],
+            "rows_dropped": before["rows"] - after["rows"],
+            "columns_added": [],
+            "columns_removed": [],
+            "dtypes_changed": [],
+        }
+        if before["dtypes"] is not None and after["dtypes"] is not None:
+            record["columns_added"] = [c for c in after["dtypes"] if c not in before["dtypes"]]
+            record["columns_removed"] = [c for c in before["dtypes"] if c not in after["dtypes"]]
+            record["dtypes_changed"] = [
+                c for c, dtype in after["dtypes"].items() if c in before["dtypes"] and before["dtypes"][c] != dtype
+            ]
+        elif after["dtypes"] is None and len(data.shape) == 2:
+            # Encoded output: record its width instead of a column diff
+            record["columns_out"] = data.shape[1]
+        if peak is not None:
+            record["peak_memory_mb"] = (peak - memory) / 1e6
+        if before["groups"] is not None and after["groups"] is not None:
+            record["groups_lost"] = sorted(before["groups"] - after["groups"])
+        self.records.append(record)
+
+    def extend(self, records: Sequence[dict]) -> None:
+        """Add records collected elsewhere, e.g. by worker processes."""
+        self.records.extend(records)
+
+    def reset(self) -> None:
+        self.records = []
+        self._open = None
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per recorded step, in execution order."""
+        return pd.DataFrame(self.records)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Per-step totals over all recorded runs, in pipeline order.
+
+        Returns:
+            DataFrame indexed by step with calls, seconds, rows in/out/dropped,
+            share of total time, max peak memory (if traced) and every watched
+            group a step removed completely in any run
+        """
+        frame = self.to_frame()
+        if frame.empty:
+            return frame
+        grouped = frame.groupby("step", sort=False)
+        summary = grouped.agg(
+            calls=("seconds", "size"),
+            seconds=("seconds", "sum"),
+            rows_in=("rows_in", "sum"),
+            rows_out=("rows_out", "sum"),
+            rows_dropped=("rows_dropped", "sum"),
+        )
+        summary["time_share"] = summary["seconds"] / summary["seconds"].sum()
+        if "peak_memory_mb" in frame:
+            summary["peak_memory_mb"] = grouped["peak_memory_mb"].max()
+        if "groups_lost" in frame:
+            summary["groups_lost"] = grouped["groups_lost"].agg(
+                lambda lists: sorted({g for lost in lists.dropna() for g in lost})
+            )
+        return summary
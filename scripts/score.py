@@ -0,0 +1,174 @@
+import argparse
+import json
+import time
+from collections import deque
+from pathlib import Path
+
+from explain import ExplanationService, format_reasons
+from ingest import MODEL_COLUMNS, read_listings
+from model_bundle import ModelBundle
+from model_run import RunModel
+from validation import ValidationReport
+
+
+def _write_explanations(pending: deque, path: Path, wait: bool = False) -> int:
+    """Append finished explanations in submission order; with `wait`, block until all are written."""
+    rows = 0
+    while pending and (wait or pending[0][1].done()):
+        explained, future = pending.popleft()
+        explained["Top Reasons"] = [format_reasons(reasons) for reasons in future.result()]
+        explained.to_csv(path, mode="a", header=not path.exists(), index=False)
+        rows += len(explained)
+    return rows
+
+
+def score_csv(input_path: str, output_path: str, model_dir: str = "../pickle/model_bundle",
+              chunksize: int = 50_000, n_jobs: int = 1, num_threads: int = None,
+              sparse: bool = False, backend: str = "lightgbm", model_columns: bool = False,
+              compact: bool = False, cache_size: int = 0, validate: bool = True, strict: bool = False,
+              explain_top_k: int = 0, explain_output: str = None, explain_workers: int = 1) -> dict:
+    """
+    Stream a raw MLS CSV through cleaning, encoding and prediction in fixed-size chunks.
+
+    Predictions are appended to `output_path` as each chunk finishes, so peak
+    memory depends on `chunksize` rather than on the size of the input file.
+
+    Args:
+        input_path: Raw MLS CSV to score
+        output_path: CSV to write; scored rows keep their raw columns plus 'Predicted Type'
+        model_dir: Model bundle directory
+        chunksize: Number of raw rows read per chunk
+        n_jobs: Worker processes used to clean and encode each chunk
+        num_threads: LightGBM prediction threads
+        sparse: Feed LightGBM a CSR matrix instead of a dense one-hot frame
+        backend: 'lightgbm' or 'numpy' (flattened trees evaluated on float32 arrays)
+        model_columns: Parse and write only 'MLS#' and the columns the model uses
+            instead of every raw column
+        compact: Int32 cleaning and a single float32 model-input array (see RunModel)
+        cache_size: Listings kept in the LRU prediction cache (0 disables it), so
+            listings repeated across chunks are scored once
+        validate: Build a data-quality report (see `validation.ValidationReport`)
+            from the chunks as they are scored, without another pass over the file
+        strict: Stop before writing anything if the file lacks a column the model needs
+        explain_top_k: Reasons per scored row to write to `explain_output` (0: no explanations).
+            They are computed by background workers (see `explain.ExplanationService`)
+            while scoring goes on, and written in the same row order as the predictions
+        explain_output: CSV for the explanations ('MLS#', 'Predicted Type', 'Top Reasons')
+        explain_workers: Worker processes computing explanations
+
+    Returns:
+        Summary dict with rows read, scored and dropped, elapsed seconds and rows/sec,
+        plus cache statistics when the cache is on, the validation report when it is
+        built and explanation counts and timing when explanations are written
+    """
+    if explain_top_k and explain_output is None:
+        raise ValueError("explain_top_k needs an explain_output path")
+    explainer = None
+    if explain_top_k:
+        # Without frozen cleaning statistics a row's reasons depend on its chunk, so they are not cached
+        cache = 100_000 if ModelBundle(model_dir).cleaning_state is not None else None
+        explainer = ExplanationService(model_dir, top_k=explain_top_k, n_workers=explain_workers, cache=cache)
+        explain_path = Path(explain_output)
+        explain_path.unlink(missing_ok=True)
+    pending, rows_explained = deque(), 0
+    output_path = Path(output_path)
+    output_path.unlink(missing_ok=True)
+
+    report = ValidationReport() if validate or strict else None
+    rows_read = rows_scored = 0
+    runner = None
+    try:
+        runner = RunModel(model_dir, n_jobs=n_jobs, num_threads=num_threads, sparse=sparse, backend=backend,
+                          compact=compact, cache=cache_size)
+        start = time.perf_counter()
+        chunks = read_listings(input_path, chunksize=chunksize, extra_columns=("MLS#",),
+                               all_columns=not model_columns)
+        for i, chunk in enumerate(chunks):
+            if report is not None:
+                report.add(chunk)
+                if strict and i == 0:
+                    report.raise_for_errors()
+            scored = runner.score(chunk)
+            scored.to_csv(output_path, mode="a", header=i == 0, index=False)
+            rows_read += len(chunk)
+            rows_scored += len(scored)
+            if explainer is not None:
+                # Workers only need the columns cleaning reads
+                model_input = scored[[col for col in MODEL_COLUMNS if col in scored.columns]]
+                labels = scored[[col for col in ("MLS#", "Predicted Type") if col in scored.columns]].copy()
+                pending.append((labels, explainer.submit(model_input)))
+                rows_explained += _write_explanations(pending, explain_path)
+        elapsed = time.perf_counter() - start
+        runner.close()
+        if explainer is not None:
+            rows_explained += _write_explanations(pending, explain_path, wait=True)
+            explain_elapsed = time.perf_counter() - start
+    finally:
+        # Worker pools are shut down on errors too; close() is safe to call twice
+        if runner is not None:
+            runner.close()
+        if explainer is not None:
+            explainer.close()
+
+    summary = {
+        "rows_read": rows_read,
+        "rows_scored": rows_scored,
+        "rows_dropped": rows_read - rows_scored,
+        "seconds": elapsed,
+        "rows_per_sec": rows_read / elapsed if elapsed > 0 else 0.0,
+    }
+    if runner.cache is not None:
+        summary["cache"] = runner.cache.stats()
+    if validate:
+        summary["validation"] = report.to_dict()
+    if explainer is not None:
+        summary["explanations"] = {**explainer.stats(), "rows_written": rows_explained,
+                                   "seconds": explain_elapsed}
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a large MLS CSV in chunks")
+    parser.add_argument("input", help="Raw MLS CSV to score")
+    parser.add_argument("output", help="Destination CSV for predictions")
+    parser.add_argument("--model-dir", default="../pickle/model_bundle", help="Model bundle directory")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Rows per chunk")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Worker processes for cleaning and encoding")
+    parser.add_argument("--num-threads", type=int, default=None, help="LightGBM prediction threads")
+    parser.add_argument("--sparse", action="store_true", help="Use the sparse one-hot encoding path")
+    parser.add_argument("--backend", choices=["lightgbm", "numpy"], default="lightgbm", help="Prediction backend")
+    parser.add_argument("--model-columns", action="store_true",
+                        help="Read and write only MLS# and the model's input columns")
+    parser.add_argument("--compact", action="store_true", help="Encode into one float32 array (less memory)")
+    parser.add_argument("--cache-size", type=int, default=0, help="LRU prediction cache entries (0: off)")
+    parser.add_argument("--no-validate", action="store_true", help="Skip the data-quality report")
+    parser.add_argument("--strict", action="store_true", help="Fail if a column the model needs is missing")
+    parser.add_argument("--report", default=None, help="Write the data-quality report to this JSON file")
+    parser.add_argument("--explain", type=int, default=0, metavar="K",
+                        help="Write the top K reasons of each prediction to --explain-output")
+    parser.add_argument("--explain-output", default=None, help="Destination CSV for explanations")
+    parser.add_argument("--explain-workers", type=int, default=1, help="Worker processes for explanations")
+    args = parser.parse_args()
+
+    summary = score_csv(args.input, args.output, args.model_dir, args.chunksize, args.n_jobs, args.num_threads,
+                         args.sparse, args.backend, args.model_columns, args.compact,
+                         args.cache_size, validate=not args.no_validate, strict=args.strict,
+                         explain_top_k=args.explain, explain_output=args.explain_output,
+                         explain_workers=args.explain_workers)
+    print(f"Rows read:    {summary['rows_read']:,}")
+    print(f"Rows scored:  {summary['rows_scored']:,}")
+    print(f"Rows dropped: {summary['rows_dropped']:,}")
+    print(f"Elapsed:      {summary['seconds']:.2f}s ({summary['rows_per_sec']:,.0f} rows/sec)")
+    if "cache" in summary:
+        cache = summary["cache"]
+        print(f"Cache:        {cache['hit_rate']:.1%} hits, {cache['evictions']:,} evictions")
+    if "explanations" in summary:
+        explanations = summary["explanations"]
+        print(f"Explained:    {explanations['rows_written']:,} rows, all written after "
+              f"{explanations['seconds']:.2f}s")
+    if "validation" in summary:
+        for issue in summary["validation"]["issues"]:
+            print(f"{issue['severity'].upper()}: {issue['message']}")
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(summary["validation"], f, indent=2)
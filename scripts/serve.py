@@ -0,0 +1,295 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+from model_run import RunModel
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Metrics:
+    """Thread-safe request counters, latency histogram and batch-size statistics."""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = self.errors = self.rows = self.rows_scored = 0
+        self.batches = self.batch_rows = self.max_batch_rows = 0
+        self.batch_seconds = 0.0
+        self.latency_counts = [0] * (len(self.buckets_ms) + 1)
+        self.latency_sum_ms = 0.0
+
+    def observe_request(self, latency_ms: float, rows: int, error: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.rows += rows
+            self.errors += int(error)
+            self.latency_sum_ms += latency_ms
+            self.latency_counts[int(np.searchsorted(self.buckets_ms, latency_ms))] += 1
+
+    def observe_batch(self, rows: int, rows_scored: int, seconds: float):
+        with self._lock:
+            self.batches += 1
+            self.batch_rows += rows
+            self.rows_scored += rows_scored
+            self.max_batch_rows = max(self.max_batch_rows, rows)
+            self.batch_seconds += seconds
+
+    def _quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding quantile `q` (inf if it falls in the open bucket)."""
+        target = q * self.requests
+        seen = 0
+        for bound, count in zip(self.buckets_ms + (float("inf"),), self.latency_counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            uptime = time.time() - self.started
+            buckets = [f"le_{b}" for b in self.buckets_ms] + ["le_inf"]
+            return {
+                "uptime_seconds": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "rows": self.rows,
+                "rows_scored": self.rows_scored,
+                "requests_per_sec": self.requests / uptime if uptime > 0 else 0.0,
+                "rows_per_sec": self.rows / uptime if uptime > 0 else 0.0,
+                "latency_ms": {
+                    "histogram": dict(zip(buckets, self.latency_counts)),
+                    "mean": self.latency_sum_ms / self.requests if self.requests else 0.0,
+                    "p50": self._quantile(0.50) if self.requests else 0.0,
+                    "p95": self._quantile(0.95) if self.requests else 0.0,
+                    "p99": self._quantile(0.99) if self.requests else 0.0,
+                },
+                "batches": {
+                    "count": self.batches,
+                    "mean_rows": self.batch_rows / self.batches if self.batches else 0.0,
+                    "max_rows": self.max_batch_rows,
+                    "mean_ms": self.batch_seconds * 1000 / self.batches if self.batches else 0.0,
+                },
+            }
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent scoring requests into batches for one RunModel.
+
+    A single worker thread takes the first waiting request, then keeps adding
+    requests until the batch holds `max_batch_size` rows or `max_wait_ms` has
+    passed since the first one arrived. The combined frame goes through
+    `RunModel.score` once, and each request gets back the predictions for its
+    own rows (None for rows removed during cleaning).
+    """
+
+    def __init__(self, runner: RunModel, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 metrics: Metrics = None):
+        self.runner = runner
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or Metrics()
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, records: list) -> Future:
+        """Queue raw listing records; the future resolves to one prediction (or None) per record."""
+        future = Future()
+        self._queue.put((pd.DataFrame.from_records(records), future))
+        return future
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.runner.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch, rows = [first], len(first[0])
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            self._score(batch)
+
+    def _score(self, batch: list):
+        frames = [frame for frame, _ in batch]
+        start = time.perf_counter()
+        try:
+            scored = self.runner.score(pd.concat(frames, ignore_index=True))
+        except Exception as exc:
+            if len(batch) > 1:    # isolate the failing request instead of failing the whole batch
+                for item in batch:
+                    self._score([item])
+            else:
+                batch[0][1].set_exception(exc)
+            return
+
+        # `score` keeps the combined frame's positional index for surviving rows
+        predictions = [None] * sum(len(f) for f in frames)
+        for position, label in zip(scored.index, scored["Predicted Type"]):
+            predictions[position] = label
+        self.metrics.observe_batch(len(predictions), len(scored), time.perf_counter() - start)
+
+        offset = 0
+        for frame, future in batch:
+            future.set_result(predictions[offset:offset + len(frame)])
+            offset += len(frame)
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128    # bursts of concurrent clients; the default (5) triggers connect retries
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    """JSON endpoints: POST /predict, GET /metrics, GET /health."""
+
+    server_version = "PropertyTypeScorer/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "bundle_id": self.server.batcher.runner.bundle.bundle_id})
+        elif self.path == "/metrics":
+            snapshot = self.server.batcher.metrics.snapshot()
+            cache = self.server.batcher.runner.cache
+            if cache is not None:
+                snapshot["cache"] = cache.stats()
+            self._send_json(200, snapshot)
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        start = time.perf_counter()
+        metrics = self.server.batcher.metrics
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+            if isinstance(payload, dict) and "records" in payload:
+                payload = payload["records"]
+            records = [payload] if isinstance(payload, dict) else payload
+            if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+                raise ValueError("Body must be a listing object, a list of listing objects, or {\"records\": [...]}")
+            if len(records) > self.server.max_records:
+                raise ValueError(f"At most {self.server.max_records} records per request")
+        except ValueError as exc:    # includes json.JSONDecodeError
+            metrics.observe_request((time.perf_counter() - start) * 1000, 0, error=True)
+            self._send_json(400, {"error": str(exc)})
+            return
+
+        try:
+            predictions = self.server.batcher.submit(records).result(timeout=self.server.timeout_s)
+        except Exception as exc:
+            metrics.observe_request((time.perf_counter() - start) * 1000, len(records), error=True)
+            self._send_json(500, {"error": f"{type(exc).__name__}: {exc}"})
+            return
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        metrics.observe_request(latency_ms, len(records))
+        self._send_json(200, {"predictions": predictions, "latency_ms": latency_ms})
+
+
+def make_server(model_dir: str = "../pickle/model_bundle", host: str = "127.0.0.1", port: int = 8000,
+                max_batch_size: int = 64, max_wait_ms: float = 5.0, backend: str = "numpy",
+                num_threads: int = None, max_records: int = 1000, timeout_s: float = 30.0,
+                verbose: bool = False, compact: bool = True, cache_size: int = 0) -> ScoringServer:
+    """
+    Build the scoring server; artifacts are loaded once, before the first request.
+
+    Args:
+        model_dir: Model bundle directory
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        max_batch_size: Rows at which a micro-batch is scored without waiting further
+        max_wait_ms: Longest time the first request of a batch waits for others
+        backend: Prediction backend passed to RunModel ('numpy' or 'lightgbm')
+        num_threads: LightGBM prediction threads (lightgbm backend only)
+        max_records: Largest number of listings accepted in one request
+        timeout_s: Seconds a request waits for its batch before failing
+        verbose: Log every request to stderr
+        compact: Encode batches straight into a float32 array (see RunModel)
+        cache_size: Listings kept in the LRU prediction cache (0 disables it); hit,
+            miss and eviction counts are reported under 'cache' in GET /metrics
+
+    Returns:
+        ScoringServer; call `serve_forever()` to start and `shutdown()` to stop
+    """
+    runner = RunModel(model_dir, num_threads=num_threads, backend=backend, compact=compact, cache=cache_size)
+    # Parse the model now rather than on the first request
+    if backend == "numpy":
+        runner.bundle.tree_engine
+    else:
+        runner.bundle.booster
+
+    server = ScoringServer((host, port), ScoringHandler)
+    server.batcher = MicroBatcher(runner, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    server.max_records = max_records
+    server.timeout_s = timeout_s
+    server.verbose = verbose
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve property type predictions over HTTP")
+    parser.add_argument("--model-dir", default="../pickle/model_bundle", help="Model bundle directory")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Rows per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Micro-batch collection window")
+    parser.add_argument("--backend", choices=["numpy", "lightgbm"], default="numpy", help="Prediction backend")
+    parser.add_argument("--num-threads", type=int, default=None, help="LightGBM prediction threads")
+    parser.add_argument("--no-compact", action="store_true", help="Encode batches through DataFrames instead")
+    parser.add_argument("--cache-size", type=int, default=0, help="LRU prediction cache entries (0: off)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = make_server(args.model_dir, args.host, args.port, args.max_batch_size, args.max_wait_ms,
+                         args.backend, args.num_threads, verbose=args.verbose, compact=not args.no_compact,
+                         cache_size=args.cache_size)
+    print(f"Serving on http://{args.host}:{server.server_port} (POST /predict, GET /metrics, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
@@ -0,0 +1,131 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Share of rows given each kind of dirty value on top of what the sample already holds
+# (the sample itself has '$141' areas and '"$736,366"' prices, which resampling keeps)
+DIRTY_RATES = {
+    "bd_bedrooms": 0.02,       # 'BD' as '3 bd'; cleaning drops these rows
+    "dollar_area": 0.05,       # 'Area' as '$141.00'
+    "hoa_text": 0.05,          # 'HOA Dues' as '$1,200/mo' or '350 USD monthly'
+    "missing_hoa": 0.05,       # 'HOA Dues' empty; imputed from the property type median
+    "missing_sqft": 0.02,      # 'Apx Sqft' empty; cleaning drops these rows
+    "missing_optional": 0.03,  # 'Prop. Cond.', '# Levels', '# Fireplaces' and 'Zip' empty
+    "garage_outlier": 0.005,   # '# Garage' == 14; cleaning drops these rows
+    "messy_text": 0.03,        # 'City' / 'Type' with stray whitespace and capitals
+}
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def _dirty(df: pd.DataFrame, rng: np.random.Generator, rates: dict) -> pd.DataFrame:
+    """Overwrite random cells with the dirty values real MLS exports contain."""
+    n = len(df)
+
+    def pick(name):
+        return rng.random(n) < rates.get(name, 0.0)
+
+    for col in ("BD", "Area", "HOA Dues", "City", "Type"):
+        df[col] = df[col].astype(object)
+
+    bd = pick("bd_bedrooms")
+    df.loc[bd, "BD"] = df.loc[bd, "BD"].astype(str) + " bd"
+    area = pick("dollar_area")
+    df.loc[area, "Area"] = "$" + df.loc[area, "Area"].astype(str).str.lstrip("$") + ".00"
+    hoa = pick("hoa_text")
+    df.loc[hoa, "HOA Dues"] = np.where(rng.random(hoa.sum()) < 0.5, "$1,200/mo", "350 USD monthly")
+    df.loc[pick("missing_hoa"), "HOA Dues"] = np.nan
+    df.loc[pick("missing_sqft"), "Apx Sqft"] = np.nan
+    for col in ("Prop. Cond.", "# Levels", "# Fireplaces", "Zip"):
+        df.loc[pick("missing_optional"), col] = np.nan
+    df.loc[pick("garage_outlier"), "# Garage"] = 14
+    city = pick("messy_text")
+    df.loc[city, "City"] = " " + df.loc[city, "City"].str.upper() + " "
+    kind = pick("messy_text")
+    df.loc[kind, "Type"] = " " + df.loc[kind, "Type"].str.title()
+    return df
+
+
+def generate_listings(n_rows: int, source="../Dataset.csv", dirty: bool = True, rates: dict = None,
+                      random_state: int = 42, first_id: int = 0) -> pd.DataFrame:
+    """
+    Bootstrap raw MLS rows from the sample dataset.
+
+    Rows are resampled with replacement, so the sample's own dirty values come
+    along; `dirty` adds the other kinds listed in DIRTY_RATES. Every row gets a
+    unique 'MLS#' so generated files can be used where listings are keyed by id.
+
+    Args:
+        n_rows: Number of rows to generate
+        source: Sample CSV path or an already loaded raw DataFrame
+        dirty: Inject extra dirty values at `rates`
+        rates: Per-kind dirty rates overriding DIRTY_RATES
+        random_state: Seed; the same seed and source give the same rows
+        first_id: Number of the first generated MLS# (for writing in chunks)
+
+    Returns:
+        DataFrame with the raw MLS columns and `n_rows` rows
+    """
+    sample = pd.read_csv(source) if not isinstance(source, pd.DataFrame) else source
+    rng = np.random.default_rng(random_state)
+    df = sample.iloc[rng.integers(0, len(sample), n_rows)].reset_index(drop=True)
+    df["MLS#"] = [f"SY{i:09d}" for i in range(first_id, first_id + n_rows)]
+    if dirty:
+        df = _dirty(df, rng, {**DIRTY_RATES, **(rates or {})})
+    return df
+
+
+def listings_path(directory, n_rows: int, dirty: bool = True, random_state: int = 42) -> Path:
+    """
+    Where generated listings of this size and settings are kept, e.g. 'listings_10000.csv'.
+
+    The name records everything that changes the file's contents, so the CLI
+    and the pipeline benchmark find (and reuse) the same files.
+    """
+    suffix = ("" if dirty else "_clean") + ("" if random_state == 42 else f"_seed{random_state}")
+    return Path(directory) / f"listings_{n_rows}{suffix}.csv"
+
+
+def write_listings_csv(path, n_rows: int, source="../Dataset.csv", chunk_rows: int = 500_000,
+                       dirty: bool = True, random_state: int = 42) -> Path:
+    """
+    Write `n_rows` generated listings to CSV in chunks, so 10M-row files fit in memory.
+
+    Each chunk is seeded from `random_state` and its position, so a given size
+    and seed always produce the same file.
+
+    Returns:
+        Path of the written CSV
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sample = pd.read_csv(source)
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        chunk = generate_listings(min(chunk_rows, n_rows - start), sample, dirty=dirty,
+                                  random_state=random_state + i, first_id=start)
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+
+def parse_size(size: str) -> int:
+    """Row count from a size label ('10k', '1m') or a plain integer."""
+    return SIZES.get(size.lower()) or int(size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic raw MLS CSVs by bootstrapping the sample")
+    parser.add_argument("sizes", nargs="+", help="Row counts or labels: 10k, 100k, 1m, 10m")
+    parser.add_argument("--source", default="../Dataset.csv", help="Sample CSV to bootstrap from")
+    parser.add_argument("--out-dir", default="../.cache/synthetic", help="Directory for the generated CSVs")
+    parser.add_argument("--clean", action="store_true", help="Only resample; do not inject extra dirty values")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        n_rows = parse_size(size)
+        path = write_listings_csv(listings_path(args.out_dir, n_rows, not args.clean, args.seed), n_rows,
+                                  args.source, dirty=not args.clean, random_state=args.seed)
+        print(f"{n_rows:,} rows -> {path}")
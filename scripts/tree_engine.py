@@ -0,0 +1,293 @@
+import numpy as np
+from pathlib import Path
+
+
+# LightGBM treats |x| <= kZeroThreshold as zero for missing_type "Zero"
+_ZERO_THRESHOLD = 1e-35
+_MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+
+
+def _float32_threshold(threshold: np.ndarray) -> np.ndarray:
+    """Largest float32 <= each float64 threshold, so `x <= t` is unchanged for float32 x."""
+    t32 = threshold.astype(np.float32)
+    above = t32.astype(np.float64) > threshold
+    t32[above] = np.nextafter(t32[above], np.float32(-np.inf))
+    return t32
+
+
+class TreeEnsemble:
+    """
+    Flattened NumPy copy of a LightGBM booster for fast small-batch prediction.
+
+    Internal nodes of all trees are rows in a set of parallel arrays; children
+    are node indices, or `~leaf` for leaves, as in LightGBM's own model format.
+    Leaves are numbered left to right within each tree.
+
+    Trees with at most 64 leaves are scored QuickScorer-style: every split of
+    every tree is tested at once, each split that sends a row right clears the
+    bits of its left-subtree leaves, and the exit leaf is the lowest bit left
+    in the tree's mask. This is a few dense array operations per batch with no
+    per-level Python loop. Larger trees fall back to advancing (row, tree)
+    pairs one level at a time. Split semantics follow LightGBM's
+    `NumericalDecision`/`CategoricalDecision`, including default directions
+    for missing values.
+
+    Input is evaluated as a C-contiguous float32 array in model feature order.
+    LightGBM itself compares features as doubles, so results on float32 input
+    are identical to `Booster.predict` on the same float32 array, and differ
+    from float64 input only for values that round across a split threshold.
+    """
+
+    ARRAYS = (
+        "roots",         # int32 (n_trees,): root node of each tree (~leaf for single-leaf trees)
+        "feature",       # int32 (n_nodes,): split feature
+        "threshold",     # float64 (n_nodes,): numeric split threshold (NaN for categorical splits)
+        "left",          # int32 (n_nodes,): left child, ~leaf for leaves
+        "right",         # int32 (n_nodes,): right child, ~leaf for leaves
+        "default_left",  # bool (n_nodes,): direction of missing values
+        "missing",       # int8 (n_nodes,): 0 None, 1 Zero, 2 NaN
+        "cat_index",     # int32 (n_nodes,): row in cat_table, -1 for numeric splits
+        "cat_table",     # bool (n_cat_nodes, max_category + 1): categories sent left
+        "leaf_value",    # float64 (n_leaves,)
+        "left_leaves",   # int32 (n_nodes, 2): [start, stop) leaf ids of the left subtree
+        "tree_nodes",    # int32 (n_trees + 1,): internal nodes of tree t are tree_nodes[t]:tree_nodes[t + 1]
+        "tree_leaves",   # int32 (n_trees + 1,): leaves of tree t are tree_leaves[t]:tree_leaves[t + 1]
+    )
+
+    def __init__(self, arrays: dict, num_class: int, objective: str):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.num_class = num_class
+        self.objective = objective
+        self.has_categorical = self.cat_table.shape[0] > 0
+
+        # Derived lookup tables, rebuilt on load rather than stored
+        self._children = np.stack([self.left, self.right], axis=1).ravel()
+        self._threshold32 = _float32_threshold(np.asarray(self.threshold))
+        self._has_zero_missing = bool((self.missing == 1).any())
+        # NaN is treated as 0.0 unless missing_type is NaN, and 0.0 under
+        # missing_type "Zero" takes the default direction
+        self._nan_right = np.where(self.missing == 0, ~(self.threshold >= 0), ~self.default_left)
+        self._use_bitmask = self.roots.shape[0] > 0 and int(np.diff(self.tree_leaves).max()) <= 64
+        if self._use_bitmask:
+            self._build_bitmask_layout()
+
+    @property
+    def meta(self) -> dict:
+        return {"num_class": self.num_class, "objective": self.objective}
+
+    # ---------- export ----------
+    @classmethod
+    def from_booster(cls, booster) -> "TreeEnsemble":
+        """Flatten a trained `lightgbm.Booster` (gbdt, no linear trees)."""
+        dump = booster.dump_model()
+        if any(tree.get("is_linear") for tree in dump["tree_info"]):
+            raise ValueError("Linear trees are not supported by the NumPy engine")
+        if dump.get("average_output"):
+            raise ValueError("Averaged (random forest) boosters are not supported by the NumPy engine")
+
+        nodes = {name: [] for name in ("feature", "threshold", "left", "right", "default_left", "missing",
+                                       "cat_index")}
+        leaf_values, cat_sets, roots, left_leaves = [], [], [], []
+        tree_nodes, tree_leaves = [0], [0]
+
+        def add(node: dict) -> int:
+            if "leaf_value" in node:
+                leaf_values.append(node["leaf_value"])
+                return ~(len(leaf_values) - 1)
+
+            idx = len(nodes["feature"])
+            for values in nodes.values():
+                values.append(0)
+            left_leaves.append([len(leaf_values), 0])
+            nodes["feature"][idx] = node["split_feature"]
+            nodes["default_left"][idx] = node["default_left"]
+            nodes["missing"][idx] = _MISSING_TYPES[node["missing_type"]]
+            if node["decision_type"] == "==":
+                nodes["cat_index"][idx] = len(cat_sets)
+                cat_sets.append([int(c) for c in str(node["threshold"]).split("||")])
+                nodes["threshold"][idx] = np.nan
+            else:
+                nodes["cat_index"][idx] = -1
+                nodes["threshold"][idx] = node["threshold"]
+            nodes["left"][idx] = add(node["left_child"])
+            left_leaves[idx][1] = len(leaf_values)
+            nodes["right"][idx] = add(node["right_child"])
+            return idx
+
+        for tree in dump["tree_info"]:
+            roots.append(add(tree["tree_structure"]))
+            tree_nodes.append(len(nodes["feature"]))
+            tree_leaves.append(len(leaf_values))
+
+        max_category = max((max(s) for s in cat_sets), default=-1)
+        cat_table = np.zeros((len(cat_sets), max_category + 1), dtype=bool)
+        for i, cats in enumerate(cat_sets):
+            cat_table[i, cats] = True
+
+        arrays = {
+            "roots": np.asarray(roots, dtype=np.int32),
+            "feature": np.asarray(nodes["feature"], dtype=np.int32),
+            "threshold": np.asarray(nodes["threshold"], dtype=np.float64),
+            "left": np.asarray(nodes["left"], dtype=np.int32),
+            "right": np.asarray(nodes["right"], dtype=np.int32),
+            "default_left": np.asarray(nodes["default_left"], dtype=bool),
+            "missing": np.asarray(nodes["missing"], dtype=np.int8),
+            "cat_index": np.asarray(nodes["cat_index"], dtype=np.int32),
+            "cat_table": cat_table,
+            "leaf_value": np.asarray(leaf_values, dtype=np.float64),
+            "left_leaves": np.asarray(left_leaves, dtype=np.int32).reshape(-1, 2),
+            "tree_nodes": np.asarray(tree_nodes, dtype=np.int32),
+            "tree_leaves": np.asarray(tree_leaves, dtype=np.int32),
+        }
+        return cls(arrays, num_class=dump["num_class"], objective=dump["objective"])
+
+    def save(self, directory: str, prefix: str = "forest_") -> list:
+        """Write one .npy file per array (memory-mappable); returns the file names."""
+        names = []
+        for name in self.ARRAYS:
+            fname = f"{prefix}{name}.npy"
+            np.save(Path(directory) / fname, np.ascontiguousarray(getattr(self, name)))
+            names.append(fname)
+        return names
+
+    def _build_bitmask_layout(self):
+        """Lay splits out as a (tree, slot) grid padded to the largest tree, with per-split leaf masks."""
+        n_trees = self.roots.shape[0]
+        counts = np.diff(self.tree_nodes)
+        width = max(int(counts.max()), 1)
+        tree_of_node = np.repeat(np.arange(n_trees), counts)
+        slot = tree_of_node * width + (np.arange(self.feature.shape[0]) - self.tree_nodes[tree_of_node])
+        mask_dtype = np.uint32 if int(np.diff(self.tree_leaves).max()) <= 32 else np.uint64
+
+        # Padding slots compare +inf and clear nothing, so they never affect the exit leaf
+        self._qs_shape = (n_trees, width)
+        self._qs_feature = np.zeros(n_trees * width, dtype=np.int32)
+        self._qs_threshold = np.full(n_trees * width, np.inf, dtype=np.float32)
+        self._qs_nan_right = np.zeros(n_trees * width, dtype=bool)
+        self._qs_feature[slot] = self.feature
+        self._qs_threshold[slot] = self._threshold32
+        self._qs_nan_right[slot] = self._nan_right
+
+        # Slots needing more than a threshold test
+        zero_nodes = np.flatnonzero(self.missing == 1)
+        self._qs_zero_slots = slot[zero_nodes]
+        self._qs_zero_right = ~self.default_left[zero_nodes]
+        cat_nodes = np.flatnonzero(self.cat_index >= 0)
+        self._qs_cat_slots = slot[cat_nodes]
+        self._qs_cat_row = self.cat_index[cat_nodes]
+
+        # Leaves a split rules out when it sends the row right: its left subtree
+        start = (self.left_leaves[:, 0] - self.tree_leaves[tree_of_node]).astype(np.uint64)
+        size = (self.left_leaves[:, 1] - self.left_leaves[:, 0]).astype(np.uint64)
+        self._qs_bits = np.zeros(n_trees * width, dtype=mask_dtype)
+        self._qs_bits[slot] = (((np.uint64(1) << size) - np.uint64(1)) << start).astype(mask_dtype)
+        self._qs_leaf_start = self.tree_leaves[:-1].astype(np.int64)
+
+    # ---------- inference ----------
+    def predict_raw(self, X, block_rows: int = None) -> np.ndarray:
+        """
+        Raw scores (sum of leaf values), shape (n_rows, num_class) or (n_rows,) for one class.
+
+        Args:
+            X: Features in model order; converted to a C-contiguous float32 array
+            block_rows: Rows evaluated at once, bounding the work arrays
+                (default: about 256k splits per block, or 8192 rows for large trees)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self._use_bitmask:
+            score_block = self._raw_block_bitmask
+            block_rows = block_rows or max(1, 2 ** 18 // self._qs_feature.shape[0])
+        else:
+            score_block = self._raw_block
+            block_rows = block_rows or 8192
+
+        n_rows = X.shape[0]
+        raw = np.zeros((n_rows, self.num_class), dtype=np.float64)
+        for start in range(0, n_rows, block_rows):
+            raw[start:start + block_rows] = score_block(X[start:start + block_rows])
+        return raw[:, 0] if self.num_class == 1 else raw
+
+    def _raw_block_bitmask(self, X: np.ndarray) -> np.ndarray:
+        n_rows = X.shape[0]
+        x = X[:, self._qs_feature]
+        go_right = x > self._qs_threshold    # False for NaN, fixed below
+        nan = np.isnan(x)
+        if nan.any():
+            go_right[nan] = np.broadcast_to(self._qs_nan_right, x.shape)[nan]
+        if self._qs_zero_slots.size:
+            # missing_type "Zero": zeros take the default direction
+            cols = self._qs_zero_slots
+            zero = np.abs(x[:, cols]) <= _ZERO_THRESHOLD
+            go_right[:, cols] = np.where(zero, self._qs_zero_right, go_right[:, cols])
+        if self._qs_cat_slots.size:
+            # CategoricalDecision: NaN, negative and unseen categories go right
+            cols = self._qs_cat_slots
+            codes = np.nan_to_num(x[:, cols], nan=-1).astype(np.int64)
+            valid = (codes >= 0) & (codes < self.cat_table.shape[1])
+            in_set = self.cat_table[self._qs_cat_row, np.where(valid, codes, 0)]
+            go_right[:, cols] = ~(in_set & valid)
+
+        cleared = np.bitwise_or.reduce((self._qs_bits * go_right).reshape(n_rows, *self._qs_shape), axis=2)
+        remaining = ~cleared
+        lowest = remaining & (~remaining + remaining.dtype.type(1))
+        leaf = np.log2(lowest.astype(np.float64)).astype(np.int64) + self._qs_leaf_start
+
+        # Trees are stored iteration-major: tree t belongs to class t % num_class
+        return self.leaf_value[leaf].reshape(n_rows, -1, self.num_class).sum(axis=1)
+
+    def _raw_block(self, X: np.ndarray) -> np.ndarray:
+        n_rows, n_features = X.shape
+        n_trees = self.roots.shape[0]
+        X_flat = X.ravel()
+        has_nan = bool(np.isnan(X_flat).any())
+
+        # One entry per unfinished (row, tree) pair; pairs drop out as they reach a leaf
+        pair = np.arange(n_rows * n_trees)
+        row_offset = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        node = np.tile(self.roots, n_rows)
+        leaf = np.empty(n_rows * n_trees, dtype=np.int32)
+
+        while True:
+            done = node < 0
+            if done.any():
+                leaf[pair[done]] = ~node[done]
+                active = ~done
+                pair, row_offset, node = pair[active], row_offset[active], node[active]
+                if not pair.size:
+                    break
+
+            x = X_flat[row_offset + self.feature[node]]
+            go_right = x > self._threshold32[node]    # False for NaN, fixed below
+            if has_nan:
+                nan = np.isnan(x)
+                go_right[nan] = self._nan_right[node[nan]]
+            if self._has_zero_missing:
+                zero = (self.missing[node] == 1) & (np.abs(x) <= _ZERO_THRESHOLD)
+                go_right[zero] = ~self.default_left[node[zero]]
+            if self.has_categorical:
+                # CategoricalDecision: NaN, negative and unseen categories go right
+                cat_row = self.cat_index[node]
+                is_cat = cat_row >= 0
+                if is_cat.any():
+                    codes = np.where(np.isnan(x), -1, x).astype(np.int64)
+                    valid = is_cat & (codes >= 0) & (codes < self.cat_table.shape[1])
+                    go_right[is_cat] = True
+                    go_right[valid] = ~self.cat_table[cat_row[valid], codes[valid]]
+
+            node = self._children[2 * node + go_right]
+
+        # Trees are stored iteration-major: tree t belongs to class t % num_class
+        return self.leaf_value[leaf].reshape(n_rows, -1, self.num_class).sum(axis=1)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, matching `Booster.predict` for binary and multiclass objectives."""
+        raw = self.predict_raw(X)
+        if self.num_class == 1:
+            if not self.objective.startswith("binary"):
+                return raw
+            sigmoid = float(self.objective.split("sigmoid:")[1].split()[0]) if "sigmoid:" in self.objective else 1.0
+            return 1.0 / (1.0 + np.exp(-sigmoid * raw))
+        raw = raw - raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
@@ -0,0 +1,313 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import optuna
+from optuna.storages import JournalFileStorage, JournalStorage
+from sklearn.model_selection import StratifiedKFold
+from Data_Cleaning_Pipeline import CleaningState
+from Data_Encoding_Pipeline import EncodingPipeline
+from dataset_cache import _file_sha256, pipeline_fingerprint
+from ingest import read_listings
+from model_bundle import ModelBundle
+
+
+# LightGBM aliases matching LGBMClassifier's argument names, so best params drop into model_train.py
+SEARCH_SPACE = {
+    "learning_rate": ("float", 0.01, 0.3, True),
+    "num_leaves": ("int", 8, 256, True),
+    "min_child_samples": ("int", 5, 200, True),
+    "colsample_bytree": ("float", 0.4, 1.0, False),
+    "subsample": ("float", 0.5, 1.0, False),
+    "reg_alpha": ("float", 1e-8, 10.0, True),
+    "reg_lambda": ("float", 1e-8, 10.0, True),
+}
+
+FOLD_META = "folds.json"
+# Bumped when folds.json gains fields, so older cache entries are rebuilt rather than misread
+FOLD_FORMAT = 2
+
+# Per-process fold Datasets, built once and reused by every trial the process runs
+_FOLDS = {}
+
+
+def fold_key(data_path: str, n_folds: int, encoding: str, seed: int) -> str:
+    """Cache key for encoded folds: input file, pipeline code and split settings."""
+    parts = {
+        "input_sha256": _file_sha256(data_path),
+        "pipeline": pipeline_fingerprint(),
+        "n_folds": n_folds,
+        "encoding": encoding,
+        "seed": seed,
+        "format": FOLD_FORMAT,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def build_folds(data_path: str, cache_dir: str = "../.cache/tune", n_folds: int = 5, encoding: str = "onehot",
+                seed: int = 42, csv_engine: str = "c") -> Path:
+    """
+    Clean and encode every cross-validation fold once and store the matrices as .npy files.
+
+    Each fold fits its own cleaning statistics and encoder on its training rows
+    only, so validation scores carry no leakage from the held-out rows. Matrices
+    are float32 C-contiguous arrays (`EncodingPipeline.transform_array`) that
+    trial processes memory-map instead of re-running the pipeline.
+
+    Returns:
+        Directory holding fold{k}_{X,y}_{train,valid}.npy and folds.json; an
+        existing directory for the same key is reused as-is
+    """
+    key = fold_key(data_path, n_folds, encoding, seed)
+    entry = Path(cache_dir) / key
+    if (entry / FOLD_META).exists():
+        return entry
+
+    raw = read_listings(data_path, engine=csv_engine)
+    labels = raw["Type"].astype(str).str.strip().str.lower()
+    tmp = Path(cache_dir) / f".{key}.tmp-{uuid.uuid4().hex[:8]}"
+    tmp.mkdir(parents=True)
+
+    folds = []
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for k, (train_idx, valid_idx) in enumerate(splitter.split(raw, labels)):
+        cleaning_state = CleaningState()
+        train = cleaning_state.fit_transform(raw.iloc[train_idx])
+        valid = cleaning_state.transform(raw.iloc[valid_idx])
+        encoder = EncodingPipeline(verbose=False, native_categorical=encoding == "native").fit(train)
+        # Validation labels the fold's training rows never saw cannot be scored
+        valid = valid[valid["property_type"].astype(str).isin(encoder.prop_classes_)]
+
+        for part, frame in (("train", train), ("valid", valid)):
+            y = encoder.le_.transform(encoder._norm_labels(frame["property_type"]).fillna("nan"))
+            np.save(tmp / f"fold{k}_X_{part}.npy", encoder.transform_array(frame))
+            np.save(tmp / f"fold{k}_y_{part}.npy", y.astype(np.int32))
+        folds.append({
+            "feature_names": encoder.feature_names_out_,
+            "categorical": [encoder.feature_names_out_.index(c) for c in encoder.cat_cols_]
+            if encoding == "native" else [],
+            "num_class": len(encoder.prop_classes_),
+            "classes": encoder.prop_classes_,
+            "train_rows": len(train),
+            "valid_rows": len(valid),
+        })
+
+    with open(tmp / FOLD_META, "w") as f:
+        json.dump({"input": str(data_path), "encoding": encoding, "seed": seed, "folds": folds}, f, indent=2)
+    if entry.exists():
+        shutil.rmtree(entry)
+    os.replace(tmp, entry)
+    return entry
+
+
+def _load_folds(fold_dir: str) -> list:
+    """Memory-map the cached folds and construct LightGBM Datasets once per process."""
+    fold_dir = str(fold_dir)
+    if fold_dir not in _FOLDS:
+        with open(Path(fold_dir) / FOLD_META) as f:
+            meta = json.load(f)
+        datasets = []
+        for k, info in enumerate(meta["folds"]):
+            arrays = {
+                name: np.load(Path(fold_dir) / f"fold{k}_{name}.npy", mmap_mode="r")
+                for name in ("X_train", "y_train", "X_valid", "y_valid")
+            }
+            # Pre-filtering would freeze min_child_samples into the binned data; trials vary it
+            dtrain = lgb.Dataset(
+                arrays["X_train"], arrays["y_train"], feature_name=info["feature_names"],
+                categorical_feature=info["categorical"] or "auto",
+                params={"feature_pre_filter": False, "verbose": -1}, free_raw_data=False,
+            ).construct()
+            dvalid = lgb.Dataset(arrays["X_valid"], arrays["y_valid"], reference=dtrain).construct()
+            datasets.append((dtrain, dvalid, arrays["X_valid"], arrays["y_valid"], info))
+        _FOLDS[fold_dir] = datasets
+    return _FOLDS[fold_dir]
+
+
+def suggest_params(trial: optuna.Trial) -> dict:
+    params = {}
+    for name, (kind, low, high, log) in SEARCH_SPACE.items():
+        suggest = trial.suggest_int if kind == "int" else trial.suggest_float
+        params[name] = suggest(name, low, high, log=log)
+    params["subsample_freq"] = 1 if params["subsample"] < 1.0 else 0
+    return params
+
+
+def make_objective(fold_dir: str, max_rounds: int, early_stopping_rounds: int, num_threads: int):
+    """
+    Mean validation log-loss over the cached folds.
+
+    Each fold trains with early stopping; after each fold the running mean is
+    reported so the pruner can stop a trial that is already worse than the
+    median of earlier trials at the same fold.
+    """
+    def objective(trial: optuna.Trial) -> float:
+        # Trial params differ from the ones the cached Datasets were built with, by design
+        warnings.filterwarnings("ignore", message="Overriding the parameters from Reference Dataset")
+        folds = _load_folds(fold_dir)
+        params = suggest_params(trial)
+        num_class = folds[0][4]["num_class"]
+        base = {
+            "objective": "multiclass" if num_class > 2 else "binary",
+            "metric": "multi_logloss" if num_class > 2 else "binary_logloss",
+            "verbose": -1,
+            "num_threads": num_threads,
+            "seed": trial.number,
+        }
+        if num_class > 2:
+            base["num_class"] = num_class
+
+        losses, rounds, accuracies = [], [], []
+        for k, (dtrain, dvalid, X_valid, y_valid, _) in enumerate(folds):
+            booster = lgb.train(
+                {**base, **params}, dtrain, num_boost_round=max_rounds, valid_sets=[dvalid],
+                callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)],
+            )
+            losses.append(booster.best_score["valid_0"][base["metric"]])
+            rounds.append(booster.best_iteration)
+            proba = booster.predict(X_valid, num_iteration=booster.best_iteration)
+            pred = proba.argmax(axis=1) if proba.ndim == 2 else (proba > 0.5).astype(int)
+            accuracies.append(float((pred == y_valid).mean()))
+
+            trial.report(float(np.mean(losses)), k)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
+        trial.set_user_attr("n_estimators", int(round(np.mean(rounds))))
+        trial.set_user_attr("accuracy", float(np.mean(accuracies)))
+        return float(np.mean(losses))
+
+    return objective
+
+
+def _storage(journal_path: str) -> JournalStorage:
+    Path(journal_path).parent.mkdir(parents=True, exist_ok=True)
+    warnings.filterwarnings("ignore", category=optuna.exceptions.ExperimentalWarning)
+    return JournalStorage(JournalFileStorage(str(journal_path)))
+
+
+def _run_worker(journal_path: str, study_name: str, fold_dir: str, n_trials: int, seed: int,
+                max_rounds: int, early_stopping_rounds: int, num_threads: int, timeout) -> int:
+    """Run `n_trials` trials of the shared study in this process; returns trials finished."""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=study_name, storage=_storage(journal_path),
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1),
+    )
+    study.optimize(make_objective(fold_dir, max_rounds, early_stopping_rounds, num_threads),
+                   n_trials=n_trials, timeout=timeout)
+    return n_trials
+
+
+def tune(data_path: str, n_trials: int = 50, n_jobs: int = 1, n_folds: int = 5, encoding: str = "onehot",
+         cache_dir: str = "../.cache/tune", study_name: str = None, max_rounds: int = 2000,
+         early_stopping_rounds: int = 50, timeout: float = None, seed: int = 42, csv_engine: str = "c") -> dict:
+    """
+    Search LightGBM hyperparameters with Optuna across worker processes.
+
+    Folds are built and cached once (see `build_folds`). Trials share one study
+    through a journal file, so any number of processes (or repeated runs with the
+    same study name) add to the same search; each worker gets an equal share of
+    `n_trials` and `cpu_count // n_jobs` LightGBM threads.
+
+    Args:
+        data_path: Labelled raw MLS CSV
+        n_trials: Trials to run in this call, across all workers
+        n_jobs: Worker processes
+        n_folds: Cross-validation folds
+        encoding: 'onehot' or 'native'
+        cache_dir: Directory for cached folds and the study journal
+        study_name: Study to create or resume (default: derived from the fold key)
+        max_rounds: Boosting round cap per fold; early stopping usually ends sooner
+        early_stopping_rounds: Rounds without validation improvement before stopping
+        timeout: Seconds after which each worker stops starting new trials
+        seed: Seed for the fold split and the samplers
+        csv_engine: CSV parser passed to `read_listings`
+
+    Returns:
+        Dict with sklearn-style best params (including n_estimators), best log-loss,
+        mean fold accuracy, trial counts and timings
+    """
+    start = time.perf_counter()
+    fold_dir = build_folds(data_path, cache_dir, n_folds, encoding, seed, csv_engine)
+    fold_seconds = time.perf_counter() - start
+
+    study_name = study_name or f"lgbm-{encoding}-{fold_dir.name[:12]}"
+    journal_path = str(Path(cache_dir) / "journal.log")
+    optuna.create_study(study_name=study_name, storage=_storage(journal_path), direction="minimize",
+                        load_if_exists=True)
+
+    n_jobs = max(1, min(n_jobs, n_trials))
+    num_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+    shares = [n_trials // n_jobs + (i < n_trials % n_jobs) for i in range(n_jobs)]
+    worker_args = [
+        (journal_path, study_name, str(fold_dir), share, seed + i, max_rounds, early_stopping_rounds,
+         num_threads, timeout)
+        for i, share in enumerate(shares)
+    ]
+    start = time.perf_counter()
+    if n_jobs == 1:
+        _run_worker(*worker_args[0])
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            list(pool.map(_run_worker, *zip(*worker_args)))
+    search_seconds = time.perf_counter() - start
+
+    study = optuna.load_study(study_name=study_name, storage=_storage(journal_path))
+    states = [t.state for t in study.trials]
+    best = study.best_trial
+    best_params = {**best.params, "n_estimators": best.user_attrs["n_estimators"],
+                   "subsample_freq": 1 if best.params["subsample"] < 1.0 else 0}
+    return {
+        "study_name": study_name,
+        "journal": journal_path,
+        "input": str(data_path),
+        "encoding": encoding,
+        "n_folds": n_folds,
+        "best_params": best_params,
+        "best_logloss": best.value,
+        "best_accuracy": best.user_attrs["accuracy"],
+        "best_trial": best.number,
+        "trials_complete": states.count(optuna.trial.TrialState.COMPLETE),
+        "trials_pruned": states.count(optuna.trial.TrialState.PRUNED),
+        "fold_seconds": fold_seconds,
+        "search_seconds": search_seconds,
+        "completed": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune LightGBM hyperparameters with cached folds and pruning")
+    parser.add_argument("--data", default="../sample_data/raw_minus_sample.csv", help="Labelled raw MLS CSV")
+    parser.add_argument("--bundle-dir", default="../pickle/model_bundle", help="Bundle to record the best params in")
+    parser.add_argument("--no-write", action="store_true", help="Print the result without touching the bundle")
+    parser.add_argument("--n-trials", type=int, default=50, help="Trials to run, across all workers")
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--encoding", choices=["onehot", "native"], default="onehot", help="Categorical encoding")
+    parser.add_argument("--cache-dir", default="../.cache/tune", help="Cached folds and study journal")
+    parser.add_argument("--study-name", default=None, help="Study to create or resume")
+    parser.add_argument("--max-rounds", type=int, default=2000, help="Boosting round cap per fold")
+    parser.add_argument("--early-stopping", type=int, default=50, help="Early stopping rounds")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-worker time limit in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for folds and samplers")
+    args = parser.parse_args()
+
+    result = tune(args.data, args.n_trials, args.n_jobs, args.folds, args.encoding, args.cache_dir,
+                  args.study_name, args.max_rounds, args.early_stopping, args.timeout, args.seed)
+    print(json.dumps(result, indent=2))
+
+    if not args.no_write:
+        # model_train.py --params tuned picks these up for the next training run
+        ModelBundle(args.bundle_dir).update_metadata(tuning=result)
+        print(f"Best params written to {args.bundle_dir}")
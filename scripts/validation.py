@@ -0,0 +1,313 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import parsers
+from Data_Cleaning_Pipeline import REMOVED_CITIES, REMOVED_PROPERTY_TYPES
+from ingest import read_listings
+
+
+# What a missing (or unparseable) value means for the row
+DROPPED = "dropped"     # cleaning removes the row
+IMPUTED = "imputed"     # cleaning fills in a default
+KEPT = "kept"           # the model sees a missing feature
+IGNORED = "ignored"     # the model does not use the column
+
+SEVERITIES = ("error", "warning", "notice")
+_NULL_SEVERITY = {DROPPED: "warning", IMPUTED: "notice", KEPT: "notice"}
+_EXAMPLES = 5
+
+
+class ColumnSpec:
+    """
+    Declarative rules for one raw MLS column.
+
+    Args:
+        kind: How values are parsed: 'text', 'id', 'category', 'number', 'price',
+            'hoa', 'baths' or 'bedrooms' (see `PARSE_CHECKS`)
+        required: The model needs the column; a file without it is an error
+        when_missing: Effect of a missing or unparseable value (DROPPED, IMPUTED, KEPT or IGNORED)
+        allowed: Values the model knows, after lowercasing (and stripping when `strip` is set)
+        removed: Values whose rows cleaning removes on purpose, normalized the same way
+        strip: Strip surrounding whitespace before comparing, as cleaning does for this column
+    """
+
+    def __init__(self, kind: str = "text", required: bool = False, when_missing: str = IGNORED,
+                 allowed: Optional[Iterable[str]] = None, removed: Iterable[str] = (), strip: bool = False):
+        if kind not in PARSE_CHECKS and kind not in ("text", "id", "category"):
+            raise ValueError(f"Unknown column kind '{kind}'")
+        self.kind = kind
+        self.required = required
+        self.when_missing = when_missing
+        self.allowed = None if allowed is None else frozenset(allowed)
+        self.removed = frozenset(removed)
+        self.strip = strip
+
+    @property
+    def checks_values(self) -> bool:
+        # Parse failures in columns the model ignores change nothing, so they are not looked for
+        parsed = self.kind in PARSE_CHECKS and self.when_missing != IGNORED
+        return parsed or self.allowed is not None or bool(self.removed)
+
+    def normalize(self, values: pd.Series) -> pd.Series:
+        """Values as `allowed` and `removed` are written: lowercased, and stripped when `strip` is set."""
+        normalized = values.astype(str).str.lower()
+        return normalized.str.strip() if self.strip else normalized
+
+
+def _numbers(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values, errors="coerce")
+
+
+def _bedrooms(values: pd.Series) -> pd.Series:
+    # '3 bd' text is a removal (step 10), not a parse failure
+    return _numbers(values).where(~values.astype(str).str.contains(r"\bbd\b", case=False), 0)
+
+
+# Parse of each value kind, as cleaning does it; a missing result for a present value is a parse failure
+PARSE_CHECKS = {
+    "number": _numbers,
+    "price": parsers.parse_price,
+    "hoa": parsers.parse_hoa,
+    "baths": lambda values: parsers.split_baths(values)[0],
+    "bedrooms": _bedrooms,
+}
+
+# The 28 columns of an MLS export; vocabularies are those cleaning and the model know
+MLS_SCHEMA = {
+    "MLS#": ColumnSpec("id"),
+    "Type": ColumnSpec("category", allowed=("attachd", "condo", "detachd"),
+                       removed=REMOVED_PROPERTY_TYPES, strip=True),
+    "Prop. Cat.": ColumnSpec("text"),
+    "Prop. Cond.": ColumnSpec("category", required=True, when_missing=IMPUTED,
+                              allowed=("approx", "existng", "fixer", "new", "proposd", "reghist", "remod",
+                                       "resale", "restord", "undrcon", "unknown")),
+    "Tax": ColumnSpec("number"),
+    "Address": ColumnSpec("text"),
+    "City": ColumnSpec("category", required=True, when_missing=KEPT,
+                       allowed=("beaverton", "hillsboro", "lake oswego", "portland", "west linn"),
+                       removed=REMOVED_CITIES, strip=True),
+    "Zip": ColumnSpec("number", required=True, when_missing=KEPT),
+    "Area": ColumnSpec("text", required=True, when_missing=KEPT),
+    "BD": ColumnSpec("bedrooms", required=True, when_missing=KEPT),
+    "Baths": ColumnSpec("baths", required=True, when_missing=KEPT),
+    "# Levels": ColumnSpec("number", required=True, when_missing=IMPUTED),
+    "Apx Sqft": ColumnSpec("number", required=True, when_missing=DROPPED),
+    "Price SqFt": ColumnSpec("number"),
+    "Sld Price Sqft": ColumnSpec("number"),
+    "Lot Size": ColumnSpec("text"),
+    "Pend. Date": ColumnSpec("text"),
+    "DOM": ColumnSpec("number", required=True, when_missing=KEPT),
+    "CDOM": ColumnSpec("number"),
+    "List Date": ColumnSpec("text"),
+    "List Price": ColumnSpec("price", required=True, when_missing=KEPT),
+    "Sold Date": ColumnSpec("text"),
+    "Price": ColumnSpec("price", required=True, when_missing=KEPT),
+    "Yr. Built": ColumnSpec("number", required=True, when_missing=KEPT),
+    "HOA Dues": ColumnSpec("hoa", required=True, when_missing=IMPUTED),
+    "# Garage": ColumnSpec("number", required=True, when_missing=KEPT),
+    "# Fireplaces": ColumnSpec("number", required=True, when_missing=IMPUTED),
+    "Terms": ColumnSpec("text"),
+}
+
+
+def missing_columns(columns: Iterable[str], schema: Dict[str, ColumnSpec] = MLS_SCHEMA,
+                    required_only: bool = True) -> List[str]:
+    """Schema columns absent from `columns`, in schema order (only the required ones by default)."""
+    present = set(columns)
+    return [col for col, spec in schema.items() if col not in present and (spec.required or not required_only)]
+
+
+class ValidationReport:
+    """
+    Data-quality counts for an MLS file, accumulated chunk by chunk.
+
+    `add` makes one vectorized pass over each column of a chunk: an
+    `isna().sum()` for columns without value rules, otherwise a single
+    `pd.factorize` that yields the null count too, after which vocabulary and
+    parse checks run on the distinct values only and are weighted back by
+    their counts. Feeding it the chunks a scorer already
+    reads makes validation cost no extra scan of the file.
+
+    Args:
+        schema: Column name -> ColumnSpec (default: `MLS_SCHEMA`)
+    """
+
+    def __init__(self, schema: Dict[str, ColumnSpec] = MLS_SCHEMA):
+        self.schema = schema
+        self.rows = 0
+        self.header: Optional[List[str]] = None
+        self.columns = {
+            col: {"nulls": 0, "parse_failures": 0, "parse_examples": [], "removed": {}, "out_of_vocabulary": {}}
+            for col in schema
+        }
+
+    def check_header(self, columns: Iterable[str]):
+        """Record the file's columns; `add` does this on the first chunk when it was not called."""
+        self.header = list(columns)
+
+    @property
+    def missing_columns(self) -> List[str]:
+        return missing_columns(self.header or [], self.schema)
+
+    @property
+    def unexpected_columns(self) -> List[str]:
+        return [col for col in self.header or [] if col not in self.schema]
+
+    def add(self, chunk: pd.DataFrame) -> "ValidationReport":
+        """Count nulls, removed and out-of-vocabulary values and parse failures in one chunk."""
+        if self.header is None:
+            self.check_header(chunk.columns)
+        self.rows += len(chunk)
+
+        for col in (col for col in self.schema if col in chunk.columns):
+            stats, spec = self.columns[col], self.schema[col]
+            values = chunk[col]
+            if not spec.checks_values or (spec.kind in ("number", "baths") and
+                                          pd.api.types.is_numeric_dtype(values)):
+                # Nothing to check but nulls (numbers parsed by the reader cannot fail)
+                stats["nulls"] += int(values.isna().sum())
+                continue
+
+            codes, uniques = pd.factorize(values)
+            stats["nulls"] += int((codes < 0).sum())
+            if not len(uniques):
+                continue
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            uniques = pd.Series(uniques, dtype=object)
+
+            if spec.kind in PARSE_CHECKS and spec.when_missing != IGNORED:
+                failed = PARSE_CHECKS[spec.kind](uniques).isna().to_numpy()
+                stats["parse_failures"] += int(counts[failed].sum())
+                examples = stats["parse_examples"]
+                examples.extend(v for v in uniques[failed].head(_EXAMPLES - len(examples)) if v not in examples)
+                if spec.kind == "bedrooms":
+                    text = uniques.astype(str).str.contains(r"\bbd\b", case=False).to_numpy()
+                    self._count(stats["removed"], uniques[text].astype(str), counts[text])
+
+            if spec.allowed is not None or spec.removed:
+                normalized = spec.normalize(uniques)
+                removed = normalized.isin(spec.removed).to_numpy()
+                self._count(stats["removed"], normalized[removed], counts[removed])
+                if spec.allowed is not None:
+                    unknown = ~removed & ~normalized.isin(spec.allowed).to_numpy()
+                    self._count(stats["out_of_vocabulary"], normalized[unknown], counts[unknown])
+        return self
+
+    @staticmethod
+    def _count(totals: dict, values: pd.Series, counts: np.ndarray):
+        # Raw values that normalize alike (' PORTLAND ', 'Portland') share one entry
+        for value, count in zip(values.tolist(), counts.tolist()):
+            totals[value] = totals.get(value, 0) + count
+
+    def issues(self) -> List[dict]:
+        """
+        Every finding, most severe first.
+
+        Returns:
+            List of dicts with 'column', 'check' ('missing_column', 'nulls',
+            'parse_failures', 'removed' or 'out_of_vocabulary'), 'severity'
+            ('error', 'warning' or 'notice'), 'rows' and a readable 'message'
+        """
+        found = [
+            {"column": col, "check": "missing_column", "severity": "error", "rows": self.rows,
+             "message": f"Column '{col}' is missing; the model needs it"}
+            for col in self.missing_columns
+        ]
+        for col, stats in self.columns.items():
+            spec = self.schema[col]
+            if self.header is not None and col not in self.header:
+                continue
+            effect = {DROPPED: "these rows are removed", IMPUTED: "a default value is filled in",
+                      KEPT: "this can reduce prediction accuracy"}.get(spec.when_missing)
+            if effect is not None and stats["nulls"]:
+                found.append({"column": col, "check": "nulls", "severity": _NULL_SEVERITY[spec.when_missing],
+                              "rows": stats["nulls"],
+                              "message": f"{stats['nulls']:,} rows have no '{col}' value; {effect}"})
+            if effect is not None and stats["parse_failures"]:
+                examples = ", ".join(repr(v) for v in stats["parse_examples"])
+                found.append({"column": col, "check": "parse_failures",
+                              "severity": _NULL_SEVERITY[spec.when_missing], "rows": stats["parse_failures"],
+                              "message": f"{stats['parse_failures']:,} '{col}' values could not be read "
+                                         f"(e.g. {examples}); {effect}"})
+            if stats["removed"]:
+                rows = sum(stats["removed"].values())
+                found.append({"column": col, "check": "removed", "severity": "warning", "rows": rows,
+                              "message": f"{rows:,} rows are removed for their '{col}' value: "
+                                         f"{self._top(stats['removed'])}"})
+            if stats["out_of_vocabulary"]:
+                rows = sum(stats["out_of_vocabulary"].values())
+                found.append({"column": col, "check": "out_of_vocabulary", "severity": "warning", "rows": rows,
+                              "message": f"{rows:,} rows have a '{col}' value the model does not know: "
+                                         f"{self._top(stats['out_of_vocabulary'])}"})
+        return sorted(found, key=lambda issue: SEVERITIES.index(issue["severity"]))
+
+    @staticmethod
+    def _top(counts: dict, n: int = 10) -> str:
+        top = sorted(counts.items(), key=lambda item: -item[1])
+        text = ", ".join(f"{value} ({count:,})" for value, count in top[:n])
+        return text + (f" and {len(top) - n} more" if len(top) > n else "")
+
+    @property
+    def errors(self) -> List[dict]:
+        return [issue for issue in self.issues() if issue["severity"] == "error"]
+
+    def raise_for_errors(self):
+        """Raise ValueError listing every error-level issue, if there are any."""
+        errors = self.errors
+        if errors:
+            raise ValueError("Input failed validation:\n" + "\n".join(issue["message"] for issue in errors))
+
+    def summary(self) -> pd.DataFrame:
+        """One row per schema column present in the file: null, parse-failure, removed and unknown-value counts."""
+        rows = {
+            col: {"nulls": stats["nulls"], "parse_failures": stats["parse_failures"],
+                  "removed": sum(stats["removed"].values()),
+                  "out_of_vocabulary": sum(stats["out_of_vocabulary"].values())}
+            for col, stats in self.columns.items() if self.header is None or col in self.header
+        }
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def to_dict(self) -> dict:
+        """JSON-serializable report: row count, header problems, per-column counts and issues."""
+        return {
+            "rows": self.rows,
+            "missing_columns": self.missing_columns,
+            "unexpected_columns": self.unexpected_columns,
+            "columns": {
+                col: {**stats, "parse_examples": [str(v) for v in stats["parse_examples"]]}
+                for col, stats in self.columns.items() if self.header is None or col in self.header
+            },
+            "issues": self.issues(),
+        }
+
+
+def validate(data: pd.DataFrame, schema: Dict[str, ColumnSpec] = MLS_SCHEMA) -> ValidationReport:
+    """Validation report for one in-memory frame with raw MLS column names."""
+    return ValidationReport(schema).add(data)
+
+
+def validate_csv(source, chunksize: int = 50_000, schema: Dict[str, ColumnSpec] = MLS_SCHEMA) -> ValidationReport:
+    """
+    Validation report for a raw MLS CSV, read in one chunked scan.
+
+    Only the schema columns are parsed, with the types `ingest.read_listings`
+    gives them, so numeric fields already read as numbers are not checked twice.
+
+    Args:
+        source: Path or seekable file-like object (left rewound)
+        chunksize: Rows per chunk
+        schema: Column name -> ColumnSpec
+
+    Returns:
+        ValidationReport over every row of the file
+    """
+    report = ValidationReport(schema)
+    report.check_header(pd.read_csv(source, nrows=0).columns)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    for chunk in read_listings(source, chunksize=chunksize, extra_columns=tuple(schema)):
+        report.add(chunk)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return report